@@ -0,0 +1,29 @@
+"""
+Celery app used by the pool benchmark.
+
+Registers a task that imitates an LLM-bound job: it awaits a sleep on the
+same per-process worker loop the real tasks use, so pool behaviour matches
+production without calling Groq or Supabase.
+"""
+import os
+
+# The real services are imported through celery_worker; they only need
+# credentials to exist, no connection is opened until first use.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+import asyncio
+import time
+
+from celery_app import celery_app
+from celery_worker import run_async
+
+BENCH_QUEUE = "bench_queue"
+# A second queue the worker also consumes, like linkedin_queue next to transcript_queue
+BENCH_OTHER_QUEUE = "bench_other_queue"
+
+@celery_app.task(name="benchmarks.simulated_completion")
+def simulated_completion(latency: float, sent_at: float):
+    started_at = time.time()
+    run_async(asyncio.sleep(latency))
+    return {"sent_at": sent_at, "started_at": started_at, "finished_at": time.time()}
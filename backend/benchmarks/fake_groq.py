@@ -0,0 +1,121 @@
+"""
+Groq-compatible chat completion server for offline benchmarks.
+
+Answers POST /openai/v1/chat/completions (plain and streamed) after a
+configurable time to first token (plus prompt prefill time, when a prefill
+rate is set), then "generates" tokens at a fixed rate.
+Usage is reported like Groq does: in the body, or in the final chunk's
+x_groq field when streaming.
+
+FAKE_GROQ_MODELS overrides the timing per model and can make a model fail
+some of its requests with a 429 or a 500, to exercise model routing:
+
+    FAKE_GROQ_TTFT=0.3 FAKE_GROQ_TOKENS_PER_SEC=250 python -m uvicorn benchmarks.fake_groq:app --port 8100
+    FAKE_GROQ_MODELS='{"llama-3.1-8b-instant": {"ttft": 0.05, "tokens_per_sec": 1000},
+                       "llama-3.3-70b-versatile": {"rate_limit": 0.3}}' python -m uvicorn ...
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TTFT = float(os.getenv("FAKE_GROQ_TTFT", "0.3"))
+TOKENS_PER_SEC = float(os.getenv("FAKE_GROQ_TOKENS_PER_SEC", "250"))
+OUTPUT_TOKENS = int(os.getenv("FAKE_GROQ_OUTPUT_TOKENS", "300"))
+# Tokens sent per streamed chunk; keeps sleep overhead low at high token rates
+CHUNK_TOKENS = int(os.getenv("FAKE_GROQ_CHUNK_TOKENS", "10"))
+# Prompt tokens processed per second before the first token (0 = prompt length doesn't matter)
+PREFILL_TOKENS_PER_SEC = float(os.getenv("FAKE_GROQ_PREFILL_TOKENS_PER_SEC", "0"))
+# Per model: ttft, tokens_per_sec, prefill_tokens_per_sec, rate_limit and error_rate (fractions of requests)
+MODEL_PROFILES = json.loads(os.getenv("FAKE_GROQ_MODELS", "{}"))
+RETRY_AFTER = os.getenv("FAKE_GROQ_RETRY_AFTER", "2")
+
+app = FastAPI(title="Fake Groq")
+
+def _usage(prompt: str, completion_tokens: int) -> dict:
+    prompt_tokens = max(1, len(prompt) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+def _profile(model: str) -> dict:
+    return {
+        "ttft": TTFT,
+        "tokens_per_sec": TOKENS_PER_SEC,
+        "prefill_tokens_per_sec": PREFILL_TOKENS_PER_SEC,
+        "rate_limit": 0.0,
+        "error_rate": 0.0,
+        **MODEL_PROFILES.get(model, {}),
+    }
+
+def _ttft(profile: dict, prompt: str) -> float:
+    if profile["prefill_tokens_per_sec"] <= 0:
+        return profile["ttft"]
+    return profile["ttft"] + _usage(prompt, 0)["prompt_tokens"] / profile["prefill_tokens_per_sec"]
+
+def _error(status: int, message: str, error_type: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": error_type}}, status_code=status, headers=headers)
+
+def _tokens(count: int):
+    return [f"token{i} " for i in range(count)]
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = "".join(message.get("content", "") for message in body.get("messages", []))
+    completion_tokens = min(OUTPUT_TOKENS, body.get("max_tokens") or OUTPUT_TOKENS)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+    profile = _profile(model)
+
+    if random.random() < profile["rate_limit"]:
+        return _error(429, f"Rate limit reached for model {model}", "tokens", {"retry-after": RETRY_AFTER})
+    if random.random() < profile["error_rate"]:
+        return _error(500, "Internal server error", "internal_server_error")
+
+    if not body.get("stream"):
+        await asyncio.sleep(_ttft(profile, prompt) + completion_tokens / profile["tokens_per_sec"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(_tokens(completion_tokens))},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(prompt, completion_tokens),
+        }
+
+    def chunk(delta: dict, finish_reason=None, **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        await asyncio.sleep(_ttft(profile, prompt))
+        yield chunk({"role": "assistant", "content": ""})
+        tokens = _tokens(completion_tokens)
+        for start in range(0, len(tokens), CHUNK_TOKENS):
+            part = tokens[start:start + CHUNK_TOKENS]
+            await asyncio.sleep(len(part) / profile["tokens_per_sec"])
+            yield chunk({"content": "".join(part)})
+        yield chunk({}, "stop", x_groq={"id": completion_id, "usage": _usage(prompt, completion_tokens)})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,231 @@
+"""
+Offline end-to-end load test.
+
+Starts the fake Groq server, the API (benchmarks.local_api) and real Celery
+workers (benchmarks.local_worker) on a fresh SQLite stand-in for Supabase,
+submits work through the HTTP API and reports throughput, submit-to-complete
+latency and worker utilization. Needs a local Redis; use a database nothing
+else consumes from, e.g. CELERY_BROKER_URL=redis://localhost:6379/15.
+
+    python -m benchmarks.load_test --submissions 500 --concurrency 50 --workers 2 --worker-concurrency 16
+    python -m benchmarks.load_test --rate 20 --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+import httpx
+
+from benchmarks.local_stack import LOCAL_ENV
+
+TABLES = {"transcript": "transcripts", "linkedin": "linkedin_insights"}
+WORDS = "pricing roadmap integration budget onboarding renewal security pilot timeline stakeholder".split()
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def make_payload(kind: str, index: int, words: int) -> dict:
+    text = " ".join(random.choice(WORDS) for _ in range(words))
+    if kind == "transcript":
+        return {
+            "company_name": f"Load Test Co {index}",
+            "attendees": ["Alice", "Bob"],
+            "date": date.today().isoformat(),
+            "transcript_text": f"Call {index}.\nAlice: {text}\nBob: {text[::-1]}",
+        }
+    return {
+        "linkedin_bio": f"Prospect {index}: {text}",
+        "pitch_deck_content": f"Deck {index}: {text[::-1]}",
+    }
+
+# PROCESSES
+def start(command, env) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *command], env=env)
+
+def wait_http(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+def wait_workers(count: int, timeout: float = 60):
+    from celery_app import celery_app
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        replies = celery_app.control.ping(timeout=1)
+        if len([reply for reply in replies if any(name.startswith("loadtest-") for name in reply)]) >= count:
+            return
+    raise RuntimeError("Workers did not come up")
+
+# LOAD GENERATOR
+async def submit_all(args, api_url: str):
+    """POST every submission (closed loop with --concurrency, or open loop at --rate/s)"""
+    submitted = {}  # record id -> (kind, submit start time)
+    submit_latencies = []
+    errors = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    kinds = ["transcript", "linkedin"] if args.kind == "mixed" else [args.kind]
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=60) as client:
+        async def submit(index: int):
+            kind = kinds[index % len(kinds)]
+            async with semaphore:
+                started = time.time()
+                try:
+                    path = "/api/transcripts/" if kind == "transcript" else "/api/linkedin/"
+                    response = await client.post(path, json=make_payload(kind, index, args.words))
+                    response.raise_for_status()
+                    submitted[response.json()["id"]] = (kind, started)
+                    submit_latencies.append(time.time() - started)
+                except Exception as e:
+                    errors.append(str(e))
+
+        pending = []
+        for index in range(args.submissions):
+            pending.append(asyncio.create_task(submit(index)))
+            if args.rate:
+                await asyncio.sleep(1 / args.rate)
+        await asyncio.gather(*pending)
+    return submitted, submit_latencies, errors
+
+def wait_completion(store, submitted: dict, timeout: float):
+    """Poll the stand-in until every submission reached a final state"""
+    deadline = time.time() + timeout
+    while True:
+        timings = {}
+        for kind, table in TABLES.items():
+            ids = [record_id for record_id, (k, _) in submitted.items() if k == kind]
+            timings.update(store.timings(table, ids))
+        done = [row for row in timings.values() if row["status"] in ("completed", "failed")]
+        if len(done) == len(submitted) or time.time() > deadline:
+            return timings
+        time.sleep(0.5)
+
+def report(args, submitted, submit_latencies, errors, timings, submit_wall) -> dict:
+    first_submit = min((started for _, started in submitted.values()), default=time.time())
+    finished = [row for row in timings.values() if row["finished_at"]]
+    completed = [row for row in finished if row["status"] == "completed"]
+    last_finish = max((row["finished_at"] for row in finished), default=first_submit)
+    wall = max(last_finish - first_submit, 1e-9)
+
+    end_to_end = [row["finished_at"] - submitted[record_id][1] for record_id, row in timings.items()
+                  if row["status"] == "completed"]
+    busy = sum(row["finished_at"] - row["processing_at"] for row in finished if row["processing_at"])
+    slots = args.workers * args.worker_concurrency
+
+    return {
+        "submissions": args.submissions,
+        "accepted": len(submitted),
+        "rejected": len(errors),
+        "completed": len(completed),
+        "failed": len(finished) - len(completed),
+        "unfinished": len(submitted) - len(finished),
+        "submissions_per_sec": len(submitted) / max(submit_wall, 1e-9),
+        "completions_per_sec": len(completed) / wall,
+        "submit_p50": percentile(submit_latencies, 50),
+        "submit_p95": percentile(submit_latencies, 95),
+        "latency_p50": percentile(end_to_end, 50),
+        "latency_p95": percentile(end_to_end, 95),
+        "latency_p99": percentile(end_to_end, 99),
+        "worker_utilization": busy / (wall * slots),
+    }
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"\n{'metric':<22}{'value':>12}" + (f"{'baseline':>12}{'change':>10}" if baseline else ""))
+    for key, value in result.items():
+        line = f"{key:<22}{value:>12.3f}" if isinstance(value, float) else f"{key:<22}{str(value):>12}"
+        if baseline and isinstance(value, (int, float)) and baseline.get(key):
+            line += f"{baseline[key]:>12.3f}{(value - baseline[key]) / baseline[key]:>10.1%}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="max in-flight HTTP submissions")
+    parser.add_argument("--rate", type=float, default=0, help="open-loop submissions per second (0 = as fast as allowed)")
+    parser.add_argument("--kind", choices=["transcript", "linkedin", "mixed"], default="mixed")
+    parser.add_argument("--words", type=int, default=400, help="words of synthetic text per submission")
+    parser.add_argument("--workers", type=int, default=1, help="Celery worker processes")
+    parser.add_argument("--pool", default="threads")
+    parser.add_argument("--worker-concurrency", type=int, default=16)
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake Groq time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=250, help="fake Groq generation rate")
+    parser.add_argument("--output-tokens", type=int, default=300, help="fake Groq completion length")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--groq-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=600, help="max seconds to wait for completion")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = {
+        **os.environ,
+        **{key: value for key, value in LOCAL_ENV.items() if key not in os.environ},
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.groq_port}",
+        "LOCAL_SUPABASE_DB": os.path.join(workdir, "local.db"),
+        "FAKE_GROQ_TTFT": str(args.ttft),
+        "FAKE_GROQ_TOKENS_PER_SEC": str(args.tokens_per_sec),
+        "FAKE_GROQ_OUTPUT_TOKENS": str(args.output_tokens),
+    }
+    os.environ.update(env)
+    from benchmarks.local_supabase import LocalSupabaseService
+    store = LocalSupabaseService(env["LOCAL_SUPABASE_DB"])
+
+    processes = [
+        start(["uvicorn", "benchmarks.fake_groq:app", "--port", str(args.groq_port), "--log-level", "warning"], env),
+        start(["uvicorn", "benchmarks.local_api:app", "--port", str(args.api_port), "--log-level", "warning"], env),
+    ]
+    processes += [
+        start(["celery", "-A", "benchmarks.local_worker", "worker", "-P", args.pool, "-c", str(args.worker_concurrency),
+               "-n", f"loadtest-{index}@%h", "--without-gossip", "--without-mingle", "--loglevel=warning"], env)
+        for index in range(args.workers)
+    ]
+    try:
+        api_url = f"http://127.0.0.1:{args.api_port}"
+        wait_http(f"http://127.0.0.1:{args.groq_port}/docs")
+        wait_http(f"{api_url}/health")
+        wait_workers(args.workers)
+
+        print(f"Submitting {args.submissions} {args.kind} jobs ...")
+        started = time.time()
+        submitted, submit_latencies, errors = asyncio.run(submit_all(args, api_url))
+        submit_wall = time.time() - started
+        if errors:
+            print(f"{len(errors)} submissions failed, first error: {errors[0]}")
+
+        timings = wait_completion(store, submitted, args.timeout)
+        result = report(args, submitted, submit_latencies, errors, timings, submit_wall)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
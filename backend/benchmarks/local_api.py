@@ -0,0 +1,10 @@
+"""
+The FastAPI app wired to local stand-ins.
+
+    python -m uvicorn benchmarks.local_api:app --port 8000
+"""
+from benchmarks.local_stack import install
+
+install()
+
+from main import app  # noqa: E402
@@ -0,0 +1,36 @@
+"""
+Point the backend at local stand-ins: the fake Groq server and the SQLite
+Supabase replacement. install() must run before anything imports the
+routers or celery_worker, because they bind the supabase_service singleton
+at import time; benchmarks/local_api.py and benchmarks/local_worker.py do
+exactly that for uvicorn and celery.
+"""
+import os
+import sys
+
+# Defaults for a benchmark run; the load generator passes its own values down
+LOCAL_ENV = {
+    "GROQ_BASE_URL": "http://127.0.0.1:8100",
+    "GROQ_API_KEY": "local-benchmark",
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_ANON_KEY": "local-benchmark",
+    "LOCAL_SUPABASE_DB": "benchmark.db",
+    # Measure the pipeline, not the caches or the Groq quota
+    "LLM_CACHE_ENABLED": "false",
+    "DEDUP_ENABLED": "false",
+    "GROQ_RATE_LIMIT_ENABLED": "false",
+    "WORKER_METRICS_PORT": "0",
+    "METRICS_LOG_STAGES": "false",
+}
+
+def install():
+    for key, value in LOCAL_ENV.items():
+        os.environ.setdefault(key, value)
+
+    bound = [name for name in ("celery_worker", "main", "routers.transcripts", "routers.linkedin") if name in sys.modules]
+    if bound:
+        raise RuntimeError(f"install() must run before importing {', '.join(bound)}")
+
+    import services.supabase_service as supabase_module
+    from benchmarks.local_supabase import LocalSupabaseService
+    supabase_module.supabase_service = LocalSupabaseService(os.environ["LOCAL_SUPABASE_DB"])
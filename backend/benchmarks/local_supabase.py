@@ -0,0 +1,276 @@
+"""
+SQLite stand-in for SupabaseService, for offline benchmarks.
+
+Implements the same public methods on a local database file so the API
+and every worker process share one store. Rows keep their fields as JSON;
+status, company and timing columns are real columns for filtering and for
+the load test's latency/utilization report.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from services.supabase_service import SupabaseService, decode_cursor, encode_cursor
+
+TABLES = {
+    # table -> column the `company` (ilike) listing filter applies to
+    "transcripts": "company_name",
+    "linkedin_insights": "company_linkedin",
+    "task_logs": "task_type",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    status TEXT,
+    company TEXT,
+    data TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    processing_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS {table}_created_idx ON {table} (created_at DESC, id DESC);
+"""
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class LocalSupabaseService(SupabaseService):
+    def __init__(self, path: str):
+        # No PostgREST client: everything below goes to SQLite
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            for table in TABLES:
+                db.executescript(SCHEMA.format(table=table))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.row_factory = sqlite3.Row
+        return db
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)"""
+        if getattr(self._local, "db", None) is None:
+            self._local.db = self._connect()
+        return self._local.db
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(fn, *args)
+
+    async def aclose(self):
+        pass
+
+    # GENERIC ROW HELPERS (run in a thread)
+    @staticmethod
+    def _row(record: sqlite3.Row, columns: str = "*") -> Dict[str, Any]:
+        row = json.loads(record["data"])
+        if columns != "*":
+            row = {column: row.get(column) for column in columns.split(",")}
+        return row
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        created = []
+        submitted_at = time.time()
+        for data in rows:
+            row = {"id": str(uuid.uuid4()), "created_at": _now(), **data}
+            self.db.execute(
+                f"INSERT INTO {table} (id, created_at, status, company, data, submitted_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (row["id"], row["created_at"], row.get("status"), row.get(TABLES[table]), json.dumps(row), submitted_at)
+            )
+            created.append(row)
+        return created
+
+    def _select(self, table: str, row_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+        record = self.db.execute(f"SELECT data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        return self._row(record, columns) if record else None
+
+    def _update(self, table: str, row_id: str, changes: Dict[str, Any], key: str = "id") -> List[Dict[str, Any]]:
+        updated = []
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            records = self.db.execute(f"SELECT id, data FROM {table} WHERE {key} = ?", (row_id,)).fetchall()
+            for record in records:
+                row = {**json.loads(record["data"]), **changes}
+                for column, value in changes.items():
+                    if value == "now()":
+                        row[column] = _now()
+                status = row.get("status")
+                self.db.execute(
+                    f"""UPDATE {table} SET status = ?, data = ?,
+                        processing_at = CASE WHEN ? = 'processing' THEN ? ELSE processing_at END,
+                        finished_at = CASE WHEN ? IN ('completed', 'failed') THEN ? ELSE finished_at END
+                        WHERE id = ?""",
+                    (status, json.dumps(row), status, time.time(), status, time.time(), record["id"])
+                )
+                updated.append(row)
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return updated
+
+    def _update_statuses(self, table: str, row_ids: List[str], status: str) -> int:
+        # Same rule as SupabaseService._update_statuses: completed rows are left alone
+        updated = 0
+        for row_id in row_ids:
+            row = self._select(table, row_id, "status")
+            if row and row["status"] != "completed":
+                updated += len(self._update(table, row_id, {"status": status, "updated_at": "now()"}))
+        return updated
+
+    def _query_page(self, table: str, columns: str, limit: int, cursor: Optional[str],
+                    filters: Dict[str, Any], ilike_filters: Dict[str, Any], created_from: Optional[str],
+                    created_to: Optional[str], count: bool) -> Dict[str, Any]:
+        where, params = [], []
+        if filters.get("status") is not None:
+            where.append("status = ?")
+            params.append(filters["status"])
+        for value in ilike_filters.values():
+            if value is not None:
+                where.append("company LIKE ?")
+                params.append(value)
+        if created_from:
+            where.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            where.append("created_at < ?")
+            params.append(created_to)
+        total = self.db.execute(
+            f"SELECT COUNT(*) FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else ""), params
+        ).fetchone()[0] if count else None
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params += [created_at, created_at, row_id]
+        records = self.db.execute(
+            f"SELECT data FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        rows = [self._row(record) for record in records]
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        items = [self._row(record, columns) for record in records[:limit]]
+        return {"items": items, "total": total, "next_cursor": next_cursor}
+
+    async def _list_page(self, table: str, columns: str, limit: int, cursor: Optional[str],
+                         filters: Dict[str, Any], ilike_filters: Dict[str, Any],
+                         created_from: Optional[str] = None, created_to: Optional[str] = None,
+                         count: bool = True) -> Dict[str, Any]:
+        # Listing, export and pagination in SupabaseService all go through here
+        return await self._run(
+            self._query_page, table, columns, limit, cursor, filters, ilike_filters, created_from, created_to, count
+        )
+
+    def _first(self, rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return rows[0] if rows else None
+
+    # TRANSCRIPT METHODS
+    async def create_transcript(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._first(await self._run(self._insert, "transcripts", [data]))
+
+    async def create_transcripts(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self._insert, "transcripts", rows)
+
+    async def get_transcript_by_id(self, transcript_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._select, "transcripts", transcript_id)
+
+    async def get_transcripts_by_ids(self, transcript_ids: List[str], columns: str = "*") -> List[Dict[str, Any]]:
+        rows = [await self._run(self._select, "transcripts", transcript_id, columns) for transcript_id in transcript_ids]
+        return [row for row in rows if row]
+
+    async def get_transcript_text(self, transcript_id: str) -> Optional[str]:
+        row = await self._run(self._select, "transcripts", transcript_id, "transcript_text")
+        return row["transcript_text"] if row else None
+
+    async def update_transcript_insight(self, transcript_id: str, insight: str) -> Dict[str, Any]:
+        return self._first(await self._run(self._update, "transcripts", transcript_id, {"insight_result": insight}))
+
+    async def update_transcript_status(self, transcript_id: str, status: str) -> Dict[str, Any]:
+        return self._first(await self._run(
+            self._update, "transcripts", transcript_id, {"status": status, "updated_at": "now()"}
+        ))
+
+    async def complete_transcript(self, transcript_id: str, insight: str) -> Dict[str, Any]:
+        return self._first(await self._run(
+            self._update, "transcripts", transcript_id,
+            {"insight_result": insight, "status": "completed", "updated_at": "now()"}
+        ))
+
+    async def update_transcript_statuses(self, transcript_ids: List[str], status: str) -> int:
+        return await self._run(self._update_statuses, "transcripts", transcript_ids, status)
+
+    # LINKEDIN METHODS
+    async def create_linkedin_insight(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._first(await self._run(self._insert, "linkedin_insights", [data]))
+
+    async def create_linkedin_insights(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self._insert, "linkedin_insights", rows)
+
+    async def get_linkedin_insight_by_id(self, insight_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._select, "linkedin_insights", insight_id)
+
+    async def get_linkedin_inputs(self, insight_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._select, "linkedin_insights", insight_id, "linkedin_bio,pitch_deck_content")
+
+    async def update_linkedin_insight(self, insight_id: str, icebreaker_result: str) -> bool:
+        return bool(await self._run(
+            self._update, "linkedin_insights", insight_id, {"icebreaker_result": icebreaker_result}
+        ))
+
+    async def update_linkedin_status(self, insight_id: str, status: str) -> Dict[str, Any]:
+        return self._first(await self._run(
+            self._update, "linkedin_insights", insight_id, {"status": status, "updated_at": "now()"}
+        ))
+
+    async def complete_linkedin_insight(self, insight_id: str, icebreaker_result: str) -> Dict[str, Any]:
+        return self._first(await self._run(
+            self._update, "linkedin_insights", insight_id,
+            {"icebreaker_result": icebreaker_result, "status": "completed", "updated_at": "now()"}
+        ))
+
+    async def update_linkedin_statuses(self, insight_ids: List[str], status: str) -> int:
+        return await self._run(self._update_statuses, "linkedin_insights", insight_ids, status)
+
+    # TASK TRACKING METHODS
+    async def create_task_log(self, task_id: str, task_type: str, record_id: str, status: str = "started") -> Dict[str, Any]:
+        data = {"task_id": task_id, "task_type": task_type, "record_id": record_id, "status": status,
+                "started_at": _now()}
+        return self._first(await self._run(self._insert, "task_logs", [data]))
+
+    async def update_task_log(self, task_id: str, status: str, error_message: str = None) -> bool:
+        changes = {"status": status, "completed_at": "now()"}
+        if error_message:
+            changes["error_message"] = error_message
+        return bool(await self._run(self._update, "task_logs", task_id, changes, "json_extract(data, '$.task_id')"))
+
+    def _upsert_task_logs(self, rows: List[Dict[str, Any]]) -> int:
+        for row in rows:
+            if not self._update("task_logs", row["task_id"], row, "json_extract(data, '$.task_id')"):
+                self._insert("task_logs", [row])
+        return len(rows)
+
+    async def upsert_task_logs(self, rows: List[Dict[str, Any]]) -> int:
+        return await self._run(self._upsert_task_logs, rows)
+
+    # BENCHMARK HELPERS (synchronous, used by the load generator)
+    def timings(self, table: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """status, submitted_at, processing_at and finished_at per row id"""
+        timings = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            records = self.db.execute(
+                f"SELECT id, status, submitted_at, processing_at, finished_at FROM {table} "
+                f"WHERE id IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            timings.update({record["id"]: dict(record) for record in records})
+        return timings
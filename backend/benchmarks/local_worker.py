@@ -0,0 +1,11 @@
+"""
+The Celery app wired to local stand-ins.
+
+    python -m celery -A benchmarks.local_worker worker -P threads -c 16
+"""
+from benchmarks.local_stack import install
+
+install()
+
+from celery_app import celery_app  # noqa: E402
+import celery_worker  # noqa: E402,F401
@@ -0,0 +1,107 @@
+"""
+Compare Celery worker pool configurations on LLM-bound work.
+
+Starts a worker for each configuration, sends a burst of simulated
+completions, then a few interactive ones behind that bulk backlog and a few
+bulk ones on a second queue (to check the queues are served round-robin),
+and reports throughput and latency. Needs the broker Redis from
+CELERY_BROKER_URL.
+
+    python -m benchmarks.pool_benchmark --tasks 200 --latency 2 --configs solo:1 threads:16
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from celery_app import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from benchmarks.bench_tasks import BENCH_OTHER_QUEUE, BENCH_QUEUE, celery_app, simulated_completion
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def start_worker(pool: str, concurrency: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "celery", "-A", "benchmarks.bench_tasks", "worker",
+            "-P", pool, "-c", str(concurrency), "-Q", f"{BENCH_QUEUE},{BENCH_OTHER_QUEUE}",
+            "-n", f"bench-{pool}-{concurrency}@%h",
+            "--without-gossip", "--without-mingle", "--loglevel=warning",
+        ]
+    )
+
+def wait_for_worker(timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if celery_app.control.ping(timeout=1):
+            return
+    raise RuntimeError("Worker did not come up")
+
+def run_config(pool: str, concurrency: int, tasks: int, latency: float, interactive: int, other: int):
+    worker = start_worker(pool, concurrency)
+    try:
+        wait_for_worker()
+
+        started = time.time()
+        bulk = [
+            simulated_completion.apply_async((latency, time.time()), queue=BENCH_QUEUE, priority=PRIORITY_BULK)
+            for _ in range(tasks)
+        ]
+        urgent = [
+            simulated_completion.apply_async((latency, time.time()), queue=BENCH_QUEUE, priority=PRIORITY_INTERACTIVE)
+            for _ in range(interactive)
+        ]
+        other_queue = [
+            simulated_completion.apply_async((latency, time.time()), queue=BENCH_OTHER_QUEUE, priority=PRIORITY_BULK)
+            for _ in range(other)
+        ]
+        bulk_results = [r.get(timeout=tasks * latency + 60) for r in bulk]
+        urgent_results = [r.get(timeout=tasks * latency + 60) for r in urgent]
+        other_results = [r.get(timeout=tasks * latency + 60) for r in other_queue]
+        wall = time.time() - started
+
+        all_results = bulk_results + urgent_results + other_results
+        latencies = [r["finished_at"] - r["sent_at"] for r in all_results]
+        busy = sum(r["finished_at"] - r["started_at"] for r in all_results)
+        urgent_latencies = [r["finished_at"] - r["sent_at"] for r in urgent_results]
+        other_latencies = [r["finished_at"] - r["sent_at"] for r in other_results]
+        return {
+            "config": f"{pool}:{concurrency}",
+            "tasks_per_sec": len(all_results) / wall,
+            "p50": statistics.median(latencies),
+            "p95": percentile(latencies, 95),
+            "interactive_p50": statistics.median(urgent_latencies) if urgent_latencies else 0.0,
+            "other_queue_p50": statistics.median(other_latencies) if other_latencies else 0.0,
+            "utilization": busy / (wall * concurrency),
+        }
+    finally:
+        worker.terminate()
+        worker.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100, help="bulk tasks per configuration")
+    parser.add_argument("--interactive", type=int, default=5, help="high-priority tasks sent after the bulk burst")
+    parser.add_argument("--other", type=int, default=5, help="bulk tasks sent to the second queue after the burst")
+    parser.add_argument("--latency", type=float, default=2.0, help="simulated completion time in seconds")
+    parser.add_argument("--configs", nargs="+", default=["solo:1", "threads:16"], help="pool:concurrency pairs")
+    args = parser.parse_args()
+
+    rows = []
+    for config in args.configs:
+        pool, concurrency = config.split(":")
+        print(f"Running {config} ...")
+        rows.append(run_config(pool, int(concurrency), args.tasks, args.latency, args.interactive, args.other))
+
+    print(f"\n{'config':<14}{'tasks/s':>10}{'p50 s':>10}{'p95 s':>10}{'urgent p50 s':>14}{'2nd queue p50 s':>17}{'util':>8}")
+    for row in rows:
+        print(
+            f"{row['config']:<14}{row['tasks_per_sec']:>10.2f}{row['p50']:>10.2f}{row['p95']:>10.2f}"
+            f"{row['interactive_p50']:>14.2f}{row['other_queue_p50']:>17.2f}{row['utilization']:>8.0%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure what transcript preprocessing saves before the LLM call.
+
+For every transcript in the corpus (benchmarks/sample_transcripts by
+default) reports prompt tokens with and without preprocessing, and the time
+the preprocessing itself takes. With --live it also generates insights both
+ways against GROQ_BASE_URL (e.g. benchmarks/fake_groq.py with
+FAKE_GROQ_PREFILL_TOKENS_PER_SEC set, or the real API) and compares latency.
+
+    python -m benchmarks.preprocess_benchmark
+    python -m benchmarks.preprocess_benchmark --live --repeat 3
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+from services.groq_service import groq_service, TRANSCRIPT_INSIGHT_PROMPT, INSIGHT_FORMAT
+from services.transcript_preprocessor import count_tokens, preprocess_transcript, TOKENIZER
+
+SAMPLE_DIR = Path(__file__).parent / "sample_transcripts"
+
+def prompt_tokens(transcript: str) -> int:
+    return count_tokens(TRANSCRIPT_INSIGHT_PROMPT.format(format=INSIGHT_FORMAT, examples="", transcript=transcript))
+
+def load_corpus(path: Path, scale: int):
+    files = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+    # Repeat each transcript to simulate longer calls
+    return [(file.name, "\n".join([file.read_text(encoding="utf-8")] * scale)) for file in files]
+
+async def timed_generate(transcript: str) -> float:
+    started = time.perf_counter()
+    await groq_service.generate_transcript_insight(transcript, use_cache=False)
+    return time.perf_counter() - started
+
+async def live(corpus, repeat: int):
+    print(f"\n{'transcript':<34}{'raw s':>10}{'compact s':>12}{'saved':>9}")
+    raw_all, compact_all = [], []
+    for name, transcript in corpus:
+        compacted = preprocess_transcript(transcript).text
+        raw = [await timed_generate(transcript) for _ in range(repeat)]
+        compact = [await timed_generate(compacted) for _ in range(repeat)]
+        raw_all.extend(raw)
+        compact_all.extend(compact)
+        raw_s, compact_s = statistics.median(raw), statistics.median(compact)
+        print(f"{name:<34}{raw_s:>10.3f}{compact_s:>12.3f}{1 - compact_s / raw_s:>9.1%}")
+    raw_s, compact_s = statistics.median(raw_all), statistics.median(compact_all)
+    print(f"{'median':<34}{raw_s:>10.3f}{compact_s:>12.3f}{1 - compact_s / raw_s:>9.1%}")
+    await groq_service.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=SAMPLE_DIR, help="directory of .txt transcripts, or one file")
+    parser.add_argument("--scale", type=int, default=1, help="repeat each transcript this many times")
+    parser.add_argument("--live", action="store_true", help="also compare generation latency against GROQ_BASE_URL")
+    parser.add_argument("--repeat", type=int, default=3, help="generations per transcript and mode with --live")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.scale)
+    if not corpus:
+        parser.error(f"No transcripts found in {args.corpus}")
+
+    print(f"Tokenizer: {TOKENIZER}")
+    print(f"{'transcript':<34}{'raw':>8}{'compact':>9}{'saved':>9}{'prep ms':>9}")
+    total_raw = total_compact = 0
+    for name, transcript in corpus:
+        started = time.perf_counter()
+        result = preprocess_transcript(transcript)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        raw, compact = prompt_tokens(transcript), prompt_tokens(result.text)
+        total_raw += raw
+        total_compact += compact
+        print(f"{name:<34}{raw:>8}{compact:>9}{1 - compact / raw:>9.1%}{elapsed_ms:>9.2f}")
+    print(f"{'total':<34}{total_raw:>8}{total_compact:>9}{1 - total_compact / total_raw:>9.1%}")
+
+    if args.live:
+        asyncio.run(live(corpus, args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Exercise model routing offline against the fake Groq server.
+
+Starts benchmarks/fake_groq.py with per-model behaviour (a fast small model,
+a main model that answers some requests with 429s), sends a mix of short and
+long transcripts and LinkedIn bios through GroqService and reports which
+model served each size class, end-to-end latency, and the router's rolling
+per-model stats. Needs a local Redis; use a database nothing else consumes
+from, e.g. CELERY_BROKER_URL=redis://localhost:6379/15.
+
+    python -m benchmarks.router_benchmark --requests 200 --concurrency 20
+    python -m benchmarks.router_benchmark --profiles '{"llama-3.3-70b-versatile": {"error_rate": 0.5}}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+WORDS = "pricing roadmap integration budget onboarding renewal security pilot timeline stakeholder".split()
+
+DEFAULT_PROFILES = {
+    "llama-3.1-8b-instant": {"ttft": 0.05, "tokens_per_sec": 1000},
+    "llama-3.3-70b-versatile": {"ttft": 0.3, "tokens_per_sec": 250, "rate_limit": 0.2},
+    "llama3-70b-8192": {"ttft": 0.4, "tokens_per_sec": 200},
+}
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+def start_fake_groq(port: int, profiles: dict, output_tokens: int) -> subprocess.Popen:
+    env = {**os.environ, "FAKE_GROQ_MODELS": json.dumps(profiles), "FAKE_GROQ_OUTPUT_TOKENS": str(output_tokens)}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_groq:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+def wait_for(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+async def run(args):
+    # Imported after the environment is set up: the services read it at import time
+    from services.groq_service import groq_service
+    from services.model_router import model_router
+    from services.redis_service import redis_service
+
+    await redis_service.client.delete(*[key for model in model_router.all_models for key in model_router._keys(model)])
+
+    # Record which model served each call by watching the router's stats updates
+    served = {}
+    record = model_router.record
+
+    async def tracking_record(model, outcome, latency=0.0, ttft=0.0):
+        if outcome == "success":
+            served[asyncio.current_task()] = model
+        await record(model, outcome, latency, ttft)
+
+    model_router.record = tracking_record
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = defaultdict(list)  # size class -> (latency, model or error)
+
+    async def one(index: int):
+        kind = random.choice(["short transcript", "long transcript", "linkedin"])
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if kind == "linkedin":
+                    await groq_service.generate_linkedin_icebreaker(text(80), text(200), use_cache=False)
+                else:
+                    words = args.short_words if kind == "short transcript" else args.long_words
+                    await groq_service.generate_transcript_insight(text(words), use_cache=False)
+                outcome = served.get(asyncio.current_task(), "?")
+            except Exception as e:
+                outcome = f"error: {type(e).__name__}"
+            results[kind].append((time.perf_counter() - started, outcome))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(one(i)) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{args.requests} requests in {elapsed:.1f}s\n")
+    print(f"{'class':<18}{'n':>5}{'p50 s':>8}{'p95 s':>8}  served by")
+    for kind, rows in sorted(results.items()):
+        latencies = [latency for latency, _ in rows]
+        models = ", ".join(f"{model} x{count}" for model, count in Counter(model for _, model in rows).most_common())
+        print(f"{kind:<18}{len(rows):>5}{percentile(latencies, 50):>8.2f}{percentile(latencies, 95):>8.2f}  {models}")
+
+    print("\nRouter stats:")
+    print(json.dumps(await model_router.get_stats(), indent=2))
+    await groq_service.aclose()
+    await redis_service.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--short-words", type=int, default=300, help="words in a short transcript")
+    parser.add_argument("--long-words", type=int, default=3000, help="words in a long transcript")
+    parser.add_argument("--output-tokens", type=int, default=200, help="fake Groq completion length")
+    parser.add_argument("--profiles", type=json.loads, default={},
+                        help="fake Groq per-model behaviour as JSON, merged over the defaults")
+    parser.add_argument("--groq-port", type=int, default=8100)
+    args = parser.parse_args()
+    args.profiles = {**DEFAULT_PROFILES, **args.profiles}
+
+    main_models = [model for model in args.profiles if model != "llama-3.1-8b-instant"]
+    for key, value in {
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.groq_port}",
+        "GROQ_API_KEY": "local-benchmark",
+        "GROQ_MODELS": ",".join(main_models),
+        "GROQ_FAST_MODELS": "llama-3.1-8b-instant",
+        "LLM_CACHE_ENABLED": "false",
+        # Keep the limiter on (a 429 blocks the model cluster-wide) but with room for the burst
+        "GROQ_RPM_LIMIT": "100000",
+        "GROQ_TPM_LIMIT": "100000000",
+        "METRICS_LOG_STAGES": "false",
+    }.items():
+        os.environ.setdefault(key, value)
+
+    fake_groq = start_fake_groq(args.groq_port, args.profiles, args.output_tokens)
+    try:
+        wait_for(f"http://127.0.0.1:{args.groq_port}/docs")
+        asyncio.run(run(args))
+    finally:
+        fake_groq.terminate()
+        fake_groq.wait()
+
+if __name__ == "__main__":
+    main()
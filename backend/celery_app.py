@@ -1,9 +1,18 @@
 from celery import Celery
+from kombu import Queue
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
 
+IS_WINDOWS = sys.platform.startswith("win")
+
+# Task priorities. With the Redis transport a LOWER number is consumed FIRST.
+PRIORITY_INTERACTIVE = 0  # single submissions from the UI
+PRIORITY_DEFAULT = 3
+PRIORITY_BULK = 6  # batch imports
+
 # Create Celery instance
 celery_app = Celery(
     "ai_workflow",
@@ -13,11 +22,10 @@ celery_app = Celery(
     broker_connection_retry_on_startup=True,
     broker_connection_max_retries=3,
     broker_heartbeat=10,
-    broker_pool_limit=1,
+    broker_pool_limit=int(os.getenv("CELERY_BROKER_POOL_LIMIT", "10")),
     redis_socket_keepalive=True,
 )
 
-# Windows-friendly Celery configuration
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
@@ -25,29 +33,51 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
-    
-    # Remove custom routing - let tasks go to default queue
-    # task_routes={
-    #     "celery_worker.process_transcript_task": "transcript_queue",
-    #     "celery_worker.process_linkedin_task": "linkedin_queue",
-    # },
-    
+    # Events feed the API's queue monitor (services/queue_monitor.py)
+    worker_send_task_events=True,
+    task_send_sent_event=True,
+
+    # One queue per workload so long transcripts can't starve LinkedIn icebreakers.
+    # A worker started without -Q consumes all of them round-robin.
+    task_queues=(
+        Queue("transcript_queue"),
+        Queue("linkedin_queue"),
+        Queue("celery"),
+    ),
+    task_default_queue="celery",
+    task_routes={
+        "celery_worker.process_transcript_task": {"queue": "transcript_queue"},
+        "celery_worker.process_linkedin_task": {"queue": "linkedin_queue"},
+    },
+    task_default_priority=PRIORITY_DEFAULT,
+    # Priority steps order each queue by priority; the queues themselves are
+    # still consumed round-robin (kombu's default queue_order_strategy)
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+    },
+
     worker_prefetch_multiplier=1,
     task_acks_late=True,
     worker_max_tasks_per_child=1000,
-    task_time_limit=300,  # 5 minutes max per task
-    task_soft_time_limit=240,  # 4 minutes soft limit
-    
-    # Windows-specific configurations
-    worker_pool='solo',  # Use solo pool to avoid multiprocessing issues
-    worker_concurrency=1,  # Single worker process
+    task_time_limit=300,  # 5 minutes max per task (prefork/solo only)
+    task_soft_time_limit=240,  # 4 minutes soft limit (prefork/solo only)
+
+    # LLM calls are I/O bound: on Linux run a thread pool so one worker process
+    # keeps many completions in flight on its shared event loop. Windows keeps
+    # the solo pool to avoid multiprocessing issues. benchmarks/pool_benchmark.py
+    # with 1s simulated calls: solo:1 0.9 tasks/s, threads:4 1.6, threads:16 7.4,
+    # threads:32 12.9. 16 stays the default because real calls also share Groq's
+    # rate limits and SUPABASE_MAX_CONCURRENCY (10); raise it when those allow.
+    worker_pool=os.getenv("CELERY_WORKER_POOL", "solo" if IS_WINDOWS else "threads"),
+    worker_concurrency=int(os.getenv("CELERY_WORKER_CONCURRENCY", "1" if IS_WINDOWS else "16")),
     worker_disable_rate_limits=True,
     broker_connection_retry_on_startup=True,
-    
+
     # Important: Use immediate acknowledgment for testing
     task_always_eager=False,  # Set to True for immediate execution during testing
     task_eager_propagates=True,
 )
 
 # Auto-discover tasks
-celery_app.autodiscover_tasks()
\ No newline at end of file
+celery_app.autodiscover_tasks()
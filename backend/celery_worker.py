@@ -1,87 +1,432 @@
 from celery_app import celery_app
-from services.groq_service import groq_service
+from celery.signals import worker_process_shutdown, worker_shutdown, worker_ready
+from services.groq_service import groq_service, GroqRateLimitError
 from services.supabase_service import supabase_service
+from services.redis_service import redis_service
+from services.dedup_service import dedup_service
+from services.stream_service import stream_service
+from services.payload_cache import payload_cache
+from services.task_event_service import task_event_service
+from services.metrics_service import metrics_service, current_trace_id
+from services.similarity_index import similarity_index
+from services.transcript_preprocessor import preprocess_transcript, TOKENIZER
+from services.resilience import llm_circuit, deadline, CircuitOpenError
+from services.checkpoint_service import checkpoint_service, TaskCheckpoint
+from services.write_behind import status_buffer
 import asyncio
+import atexit
+import os
+import random
+import threading
+import time
 import traceback
 from datetime import datetime
 
+# Insights of this many similar past calls are added to the transcript prompt (0 = off)
+SIMILAR_EXAMPLES = int(os.getenv("SIMILAR_EXAMPLES", "0"))
+SIMILAR_EXAMPLES_MIN_SCORE = float(os.getenv("SIMILAR_EXAMPLES_MIN_SCORE", "0.3"))
+SIMILAR_EXAMPLE_MAX_CHARS = int(os.getenv("SIMILAR_EXAMPLE_MAX_CHARS", "1500"))
+# Default for submissions that don't set "preprocess": compact transcripts before the LLM call
+# (off by default; submissions can still opt in)
+TRANSCRIPT_PREPROCESS = os.getenv("TRANSCRIPT_PREPROCESS", "false").lower() == "true"
+
+# Time budget for a task's LLM calls, kept under task_soft_time_limit (240s) so a
+# slow upstream fails the attempt cleanly instead of the task being killed
+TASK_LLM_DEADLINE = float(os.getenv("TASK_LLM_DEADLINE", "200"))
+# Failed attempts are retried after base * 2^attempt seconds (plus jitter)
+TASK_RETRY_BASE_DELAY = float(os.getenv("TASK_RETRY_BASE_DELAY", "5"))
+# While the Groq circuit is open, tasks are parked (retried later without using
+# up an attempt) at most this many times
+CIRCUIT_MAX_PARKS = int(os.getenv("CIRCUIT_MAX_PARKS", "20"))
+
+# One long-lived event loop per worker process. It runs in a background
+# thread so every task (and every pool thread) shares the same loop and the
+# same pooled Groq/Supabase sessions instead of creating a loop per call.
+_worker_loop = None
+_worker_loop_pid = None
+_worker_loop_lock = threading.Lock()
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Return this process's event loop, starting it on first use (or after a fork)"""
+    global _worker_loop, _worker_loop_pid
+    with _worker_loop_lock:
+        if _worker_loop is None or _worker_loop_pid != os.getpid():
+            _worker_loop = asyncio.new_event_loop()
+            _worker_loop_pid = os.getpid()
+            threading.Thread(target=_worker_loop.run_forever, name="worker-event-loop", daemon=True).start()
+        return _worker_loop
+
+def run_async(coro):
+    """Run a coroutine on the worker loop and block until it finishes"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_worker_loop())
+    try:
+        return future.result()
+    except BaseException:
+        # e.g. SoftTimeLimitExceeded - don't leave the coroutine running
+        future.cancel()
+        raise
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_worker_loop(**kwargs):
+    """Write buffered status updates, close pooled sessions and stop the worker loop"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop_pid != os.getpid():
+        return
+    try:
+        run_async(status_buffer.aclose())
+    except Exception as exc:
+        print(f"Error flushing buffered status updates: {str(exc)}")
+    try:
+        run_async(groq_service.aclose())
+        run_async(supabase_service.aclose())
+        run_async(redis_service.aclose())
+    except Exception as exc:
+        print(f"Error closing worker sessions: {str(exc)}")
+    _worker_loop.call_soon_threadsafe(_worker_loop.stop)
+    _worker_loop = None
+
+# Pools that exit without the shutdown signals (e.g. a solo worker interrupted) still flush
+atexit.register(close_worker_loop)
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    """Expose this worker's metrics for Prometheus to scrape"""
+    port = int(os.getenv("WORKER_METRICS_PORT", "9808"))
+    if port:
+        try:
+            metrics_service.start_exporter(port)
+        except OSError as exc:
+            print(f"Metrics exporter not started on :{port}: {str(exc)}")
+
+async def _traced(coro, trace_id: str):
+    """Run a coroutine with the submission's trace id (the worker loop has its own context)"""
+    current_trace_id.set(trace_id)
+    return await coro
+
+def _observe_queue_wait(enqueued_at: float, retries: int):
+    """Broker wait of the first delivery (retries include their countdown, so they are skipped)"""
+    if enqueued_at and not retries:
+        metrics_service.observe_stage("queue_wait", max(0.0, time.time() - enqueued_at))
+
+def _retry_countdown(exc: Exception, retries: int) -> float:
+    """Rate limits only need to wait out the limit; other errors back off exponentially"""
+    if isinstance(exc, GroqRateLimitError):
+        return exc.retry_after
+    delay = TASK_RETRY_BASE_DELAY * (2 ** retries)
+    # Jitter so tasks that failed together don't all come back at once
+    return delay + random.uniform(0, delay / 2)
+
+def _park(task, kind: str, record_id: str, stream: bool, exc: CircuitOpenError, parked: int):
+    """Retry once the circuit may have closed, without using up one of the task's attempts"""
+    countdown = exc.retry_after + random.uniform(0, 5)
+    print(f"[{datetime.now()}] Groq circuit open, parking {kind} task {task.request.id} for {countdown:.0f}s")
+    metrics_service.count_event("task_parked", kind=kind, record_id=record_id, seconds=round(countdown, 1))
+    run_async(status_buffer.set_status(kind, record_id, "pending"))
+    run_async(task_event_service.publish(task.request.id, "parked", kind=kind, record_id=record_id,
+                                         retries=task.request.retries - parked, retry_in=round(countdown, 1)))
+    if stream:
+        run_async(stream_service.publish_retry(task.request.id, str(exc), task.request.retries - parked))
+    return task.retry(kwargs={**task.request.kwargs, "parked": parked + 1}, countdown=countdown,
+                      max_retries=task.request.retries + 1)
+
+async def _start_stream(task_id: str, stream: bool):
+    """Open a token stream for this attempt; returns the chunk callback (or None)"""
+    if not stream:
+        return None
+    await stream_service.reset(task_id)
+    return lambda text: stream_service.publish_chunk(task_id, text)
+
+async def _report_failure(task_id: str, kind: str, record_id: str, stream: bool, exc: Exception,
+                          will_retry: bool, attempt: int):
+    """Tell status subscribers (and the token stream, if any) about a failed attempt"""
+    state = "retrying" if will_retry else "failed"
+    await task_event_service.publish(task_id, state, kind=kind, record_id=record_id, retries=attempt, error=str(exc))
+    if not stream:
+        return
+    if will_retry:
+        await stream_service.publish_retry(task_id, str(exc), attempt)
+    else:
+        await stream_service.publish_error(task_id, str(exc))
+
+async def _load_transcript_text(transcript_id: str, content_hash: str) -> str:
+    """Text for a slim task message: local compressed cache first, then Supabase"""
+    cached = payload_cache.get(content_hash) if content_hash else None
+    if cached:
+        return cached[0]
+    transcript_text = await supabase_service.get_transcript_text(transcript_id)
+    if transcript_text is None:
+        raise Exception(f"Transcript {transcript_id} not found")
+    if content_hash and payload_cache.content_hash(transcript_text) != content_hash:
+        print(f"Warning: transcript {transcript_id} changed since it was enqueued")
+    payload_cache.set(content_hash or payload_cache.content_hash(transcript_text), [transcript_text])
+    return transcript_text
+
+async def _load_linkedin_inputs(insight_id: str, content_hash: str):
+    """Bio and pitch deck for a slim task message: local compressed cache first, then Supabase"""
+    cached = payload_cache.get(content_hash) if content_hash else None
+    if cached:
+        return cached[0], cached[1]
+    record = await supabase_service.get_linkedin_inputs(insight_id)
+    if record is None:
+        raise Exception(f"LinkedIn insight {insight_id} not found")
+    parts = [record["linkedin_bio"], record["pitch_deck_content"]]
+    if content_hash and payload_cache.content_hash(*parts) != content_hash:
+        print(f"Warning: LinkedIn insight {insight_id} changed since it was enqueued")
+    payload_cache.set(content_hash or payload_cache.content_hash(*parts), parts)
+    return parts[0], parts[1]
+
+async def _similar_examples(transcript_id: str, transcript_text: str) -> list:
+    """Insights of the most similar completed calls, for the prompt; failures just mean no examples"""
+    if SIMILAR_EXAMPLES <= 0:
+        return []
+    try:
+        hits = await similarity_index.similar(transcript_id, transcript_text, k=SIMILAR_EXAMPLES,
+                                              min_score=SIMILAR_EXAMPLES_MIN_SCORE)
+        rows = await supabase_service.get_transcripts_by_ids([hit_id for hit_id, _ in hits], columns="id,insight_result")
+    except Exception as exc:
+        print(f"Similar examples unavailable: {str(exc)}")
+        return []
+    insights = {row["id"]: row["insight_result"] for row in rows if row.get("insight_result")}
+    return [insights[hit_id][:SIMILAR_EXAMPLE_MAX_CHARS] for hit_id, _ in hits if hit_id in insights]
+
+def _prompt_transcript(transcript_text: str, preprocess: bool = None) -> str:
+    """The transcript as sent to the LLM: normalized and compacted unless switched off"""
+    if not (TRANSCRIPT_PREPROCESS if preprocess is None else preprocess):
+        return transcript_text
+    with metrics_service.timed("preprocess", kind="transcript"):
+        result = preprocess_transcript(transcript_text)
+    metrics_service.observe_preprocess(result.tokens_before, result.tokens_after, TOKENIZER)
+    return result.text
+
+async def _already_completed(checkpoint: TaskCheckpoint, record_id: str, get_record) -> bool:
+    """Whether an earlier delivery of this task already stored its result"""
+    if checkpoint.stage == "persisted":
+        return True
+    if not checkpoint.resumed or checkpoint.result is not None:
+        return False
+    # The checkpoint may have been lost or never saved: the record itself is the source of truth
+    record = await get_record(record_id)
+    return bool(record) and record.get("status") == "completed"
+
+async def _skip_completed(task_id: str, kind: str, record_id: str, checkpoint: TaskCheckpoint, stream: bool,
+                          retries: int):
+    """Finish a redelivered task whose result is already stored, without touching the record"""
+    print(f"[{datetime.now()}] {kind} {record_id} already completed (key {checkpoint.key}), skipping")
+    metrics_service.count_event("checkpoint_skipped", kind=kind, record_id=record_id)
+    await checkpoint_service.mark_done(checkpoint.key)
+    await status_buffer.discard(kind, record_id)
+    await status_buffer.log_task(task_id, kind, record_id, "completed")
+    await dedup_service.release_record(kind, record_id)
+    await task_event_service.publish(task_id, "completed", kind=kind, record_id=record_id, retries=retries)
+    if stream:
+        await stream_service.publish_done(task_id, record_id)
+
+async def _resume_generated(task_id: str, kind: str, record_id: str, checkpoint: TaskCheckpoint, stream: bool):
+    """Reuse the text an earlier attempt generated; a stream gets it as one chunk"""
+    print(f"[{datetime.now()}] Resuming {kind} {record_id} from its saved result (key {checkpoint.key})")
+    metrics_service.count_event("checkpoint_resumed", kind=kind, record_id=record_id)
+    on_chunk = await _start_stream(task_id, stream)
+    if on_chunk is not None:
+        await on_chunk(checkpoint.result)
+    return checkpoint.result
+
+async def _process_transcript(task_id: str, transcript_id: str, transcript_text: str, stream: bool = False,
+                              content_hash: str = None, retries: int = 0, preprocess: bool = None,
+                              idempotency_key: str = None):
+    await status_buffer.log_task(task_id, "transcript", transcript_id, "started")
+    checkpoint = await checkpoint_service.begin(idempotency_key)
+    if await _already_completed(checkpoint, transcript_id, supabase_service.get_transcript_by_id):
+        await _skip_completed(task_id, "transcript", transcript_id, checkpoint, stream, retries)
+        return
+
+    if checkpoint.result is not None:
+        # An earlier attempt got as far as generating: only persistence is left
+        insight = await _resume_generated(task_id, "transcript", transcript_id, checkpoint, stream)
+        if transcript_text is None:
+            with metrics_service.timed("load_input", kind="transcript"):
+                transcript_text = await _load_transcript_text(transcript_id, content_hash)
+    else:
+        # Don't start work the LLM can't take right now
+        await llm_circuit.check()
+
+        # Update status to processing
+        await status_buffer.set_status("transcript", transcript_id, "processing")
+        await task_event_service.publish(task_id, "processing", kind="transcript", record_id=transcript_id,
+                                         retries=retries)
+
+        if transcript_text is None:
+            with metrics_service.timed("load_input", kind="transcript"):
+                transcript_text = await _load_transcript_text(transcript_id, content_hash)
+
+        # Process with AI
+        on_chunk = await _start_stream(task_id, stream)
+        examples = await _similar_examples(transcript_id, transcript_text)
+        prompt_text = _prompt_transcript(transcript_text, preprocess)
+        with metrics_service.timed("llm_generate", kind="transcript"), deadline(TASK_LLM_DEADLINE):
+            insight = await groq_service.generate_transcript_insight(prompt_text, on_chunk=on_chunk, examples=examples)
+
+        # Keep the result before trying to persist it, so a failed write doesn't cost another generation
+        await checkpoint_service.save_result(checkpoint.key, insight)
+
+    # Store result and final status in one write (after any buffered transition, never before it)
+    await status_buffer.discard("transcript", transcript_id)
+    await supabase_service.complete_transcript(transcript_id, insight)
+    await checkpoint_service.mark_done(checkpoint.key)
+    await status_buffer.log_task(task_id, "transcript", transcript_id, "completed")
+    await similarity_index.add(transcript_id, transcript_text)
+    await dedup_service.release_record("transcript", transcript_id)
+    await task_event_service.publish(task_id, "completed", kind="transcript", record_id=transcript_id, retries=retries)
+    if stream:
+        await stream_service.publish_done(task_id, transcript_id)
+
+async def _process_linkedin(task_id: str, insight_id: str, linkedin_bio: str, pitch_deck: str, stream: bool = False,
+                            content_hash: str = None, retries: int = 0, idempotency_key: str = None):
+    await status_buffer.log_task(task_id, "linkedin", insight_id, "started")
+    checkpoint = await checkpoint_service.begin(idempotency_key)
+    if await _already_completed(checkpoint, insight_id, supabase_service.get_linkedin_insight_by_id):
+        await _skip_completed(task_id, "linkedin", insight_id, checkpoint, stream, retries)
+        return
+
+    if checkpoint.result is not None:
+        # An earlier attempt got as far as generating: only persistence is left
+        result = await _resume_generated(task_id, "linkedin", insight_id, checkpoint, stream)
+    else:
+        # Don't start work the LLM can't take right now
+        await llm_circuit.check()
+
+        # Update status to processing
+        await status_buffer.set_status("linkedin", insight_id, "processing")
+        await task_event_service.publish(task_id, "processing", kind="linkedin", record_id=insight_id, retries=retries)
+
+        if linkedin_bio is None or pitch_deck is None:
+            with metrics_service.timed("load_input", kind="linkedin"):
+                linkedin_bio, pitch_deck = await _load_linkedin_inputs(insight_id, content_hash)
+
+        # Process with AI
+        on_chunk = await _start_stream(task_id, stream)
+        with metrics_service.timed("llm_generate", kind="linkedin"), deadline(TASK_LLM_DEADLINE):
+            result = await groq_service.generate_linkedin_icebreaker(linkedin_bio, pitch_deck, on_chunk=on_chunk)
+
+        # Keep the result before trying to persist it, so a failed write doesn't cost another generation
+        await checkpoint_service.save_result(checkpoint.key, result)
+
+    # Store result and final status in one write (after any buffered transition, never before it)
+    await status_buffer.discard("linkedin", insight_id)
+    await supabase_service.complete_linkedin_insight(insight_id, result)
+    await checkpoint_service.mark_done(checkpoint.key)
+    await status_buffer.log_task(task_id, "linkedin", insight_id, "completed")
+    await dedup_service.release_record("linkedin", insight_id)
+    await task_event_service.publish(task_id, "completed", kind="linkedin", record_id=insight_id, retries=retries)
+    if stream:
+        await stream_service.publish_done(task_id, insight_id)
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def process_transcript_task(self, transcript_id: str, transcript_text: str, company_name: str):
+def process_transcript_task(self, transcript_id: str, transcript_text: str = None, company_name: str = None,
+                            stream: bool = False, content_hash: str = None, trace_id: str = None,
+                            enqueued_at: float = None, preprocess: bool = None, parked: int = 0,
+                            idempotency_key: str = None):
     """
     Celery task to process transcript with AI
+    transcript_text may be None (slim message); it is then loaded by id.
+    Retries and redeliveries with the same idempotency_key resume from the last checkpoint.
     """
+    trace_id = trace_id or self.request.id
+    idempotency_key = idempotency_key or checkpoint_service.make_key("transcript", transcript_id, content_hash)
+    _observe_queue_wait(enqueued_at, self.request.retries)
     try:
-        print(f"[{datetime.now()}] Starting transcript task for ID: {transcript_id}")
-        
-        # Update status to processing
-        asyncio.run(supabase_service.update_transcript_status(transcript_id, "processing"))
-        
-        # Process with AI
-        insight = asyncio.run(groq_service.generate_transcript_insight(transcript_text))
-        
-        # Update with result
-        asyncio.run(supabase_service.update_transcript_insight(transcript_id, insight))
-        asyncio.run(supabase_service.update_transcript_status(transcript_id, "completed"))
-        
+        print(f"[{datetime.now()}] Starting transcript task for ID: {transcript_id} (trace {trace_id})")
+
+        with metrics_service.timed("task_total", kind="transcript", task_id=self.request.id, trace_id=trace_id):
+            run_async(_traced(_process_transcript(self.request.id, transcript_id, transcript_text, stream,
+                                                  content_hash, self.request.retries - parked, preprocess,
+                                                  idempotency_key), trace_id))
+
         print(f"[{datetime.now()}] Completed transcript task for ID: {transcript_id}")
-        
+
         return {
             "task_id": self.request.id,
             "transcript_id": transcript_id,
             "status": "completed",
             "company_name": company_name
         }
-        
+
     except Exception as exc:
+        if isinstance(exc, CircuitOpenError) and parked < CIRCUIT_MAX_PARKS:
+            raise _park(self, "transcript", transcript_id, stream, exc, parked)
+
         print(f"[{datetime.now()}] Error in transcript task: {str(exc)}")
         print(traceback.format_exc())
-        
+
         # Update status to failed
-        asyncio.run(supabase_service.update_transcript_status(transcript_id, "failed"))
-        
+        run_async(status_buffer.set_status("transcript", transcript_id, "failed"))
+
+        # Parked retries don't count as attempts
+        attempts = self.request.retries - parked
+        will_retry = attempts < self.max_retries
+        run_async(_report_failure(self.request.id, "transcript", transcript_id, stream, exc, will_retry, attempts + 1))
+        run_async(status_buffer.log_task(self.request.id, "transcript", transcript_id,
+                                         "retrying" if will_retry else "failed", str(exc)))
+
         # Retry logic
-        if self.request.retries < self.max_retries:
-            print(f"Retrying transcript task... Attempt {self.request.retries + 1}")
-            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
-        
+        if will_retry:
+            print(f"Retrying transcript task... Attempt {attempts + 1}")
+            raise self.retry(exc=exc, countdown=_retry_countdown(exc, attempts), max_retries=self.request.retries + 1)
+
+        # Out of retries - let new identical submissions start fresh
+        run_async(dedup_service.release_record("transcript", transcript_id))
         raise exc
 
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def process_linkedin_task(self, insight_id: str, linkedin_bio: str, pitch_deck: str):
+def process_linkedin_task(self, insight_id: str, linkedin_bio: str = None, pitch_deck: str = None,
+                          stream: bool = False, content_hash: str = None, trace_id: str = None,
+                          enqueued_at: float = None, parked: int = 0, idempotency_key: str = None):
     """
     Celery task to process LinkedIn insight with AI
+    linkedin_bio/pitch_deck may be None (slim message); they are then loaded by id.
+    Retries and redeliveries with the same idempotency_key resume from the last checkpoint.
     """
+    trace_id = trace_id or self.request.id
+    idempotency_key = idempotency_key or checkpoint_service.make_key("linkedin", insight_id, content_hash)
+    _observe_queue_wait(enqueued_at, self.request.retries)
     try:
-        print(f"[{datetime.now()}] Starting LinkedIn task for ID: {insight_id}")
-        
-        # Update status to processing
-        asyncio.run(supabase_service.update_linkedin_status(insight_id, "processing"))
-        
-        # Process with AI
-        result = asyncio.run(groq_service.generate_linkedin_icebreaker(linkedin_bio, pitch_deck))
-        
-        # Update with result
-        asyncio.run(supabase_service.update_linkedin_insight(insight_id, result))
-        asyncio.run(supabase_service.update_linkedin_status(insight_id, "completed"))
-        
+        print(f"[{datetime.now()}] Starting LinkedIn task for ID: {insight_id} (trace {trace_id})")
+
+        with metrics_service.timed("task_total", kind="linkedin", task_id=self.request.id, trace_id=trace_id):
+            run_async(_traced(_process_linkedin(self.request.id, insight_id, linkedin_bio, pitch_deck, stream,
+                                                content_hash, self.request.retries - parked, idempotency_key),
+                                      trace_id))
+
         print(f"[{datetime.now()}] Completed LinkedIn task for ID: {insight_id}")
-        
+
         return {
             "task_id": self.request.id,
             "insight_id": insight_id,
             "status": "completed"
         }
-        
+
     except Exception as exc:
+        if isinstance(exc, CircuitOpenError) and parked < CIRCUIT_MAX_PARKS:
+            raise _park(self, "linkedin", insight_id, stream, exc, parked)
+
         print(f"[{datetime.now()}] Error in LinkedIn task: {str(exc)}")
         print(traceback.format_exc())
-        
+
         # Update status to failed
-        asyncio.run(supabase_service.update_linkedin_status(insight_id, "failed"))
-        
+        run_async(status_buffer.set_status("linkedin", insight_id, "failed"))
+
+        # Parked retries don't count as attempts
+        attempts = self.request.retries - parked
+        will_retry = attempts < self.max_retries
+        run_async(_report_failure(self.request.id, "linkedin", insight_id, stream, exc, will_retry, attempts + 1))
+        run_async(status_buffer.log_task(self.request.id, "linkedin", insight_id,
+                                         "retrying" if will_retry else "failed", str(exc)))
+
         # Retry logic
-        if self.request.retries < self.max_retries:
-            print(f"Retrying LinkedIn task... Attempt {self.request.retries + 1}")
-            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
-        
-        raise exc
\ No newline at end of file
+        if will_retry:
+            print(f"Retrying LinkedIn task... Attempt {attempts + 1}")
+            raise self.retry(exc=exc, countdown=_retry_countdown(exc, attempts), max_retries=self.request.retries + 1)
+
+        # Out of retries - let new identical submissions start fresh
+        run_async(dedup_service.release_record("linkedin", insight_id))
+        raise exc
@@ -1,10 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
 from dotenv import load_dotenv
 
 from routers import transcripts, linkedin, tasks  # Add tasks import
+from services.queue_monitor import queue_monitor
+from services.metrics_service import metrics_service, current_trace_id
+from services.similarity_index import similarity_index
+import asyncio
 import sys 
 
 load_dotenv()
@@ -21,17 +25,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Trace-Id", "ETag"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Tag each request with a trace id (kept if the client sent one) and time it"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    trace_id = request.headers.get("X-Trace-Id") or metrics_service.new_trace_id()
+    current_trace_id.set(trace_id)
+    with metrics_service.timed("api_request", method=request.method, path=request.url.path):
+        response = await call_next(request)
+    response.headers["X-Trace-Id"] = trace_id
+    return response
+
 # Include routers
 app.include_router(transcripts.router, prefix="/api/transcripts", tags=["transcripts"])
 app.include_router(linkedin.router, prefix="/api/linkedin", tags=["linkedin"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])  # New router
 
+@app.on_event("startup")
+async def start_queue_monitor():
+    queue_monitor.start()
+
+@app.on_event("startup")
+async def warm_similarity_index():
+    """Load the similarity vectors in the background so the first query is fast"""
+    async def load():
+        try:
+            await similarity_index.sync(force=True)
+        except Exception as e:
+            print(f"Similarity index warm-up failed: {str(e)}")
+    asyncio.create_task(load())
+
+@app.on_event("shutdown")
+async def stop_queue_monitor():
+    queue_monitor.stop()
+
 @app.get("/")
 async def root():
     return {"message": "AI Workflow API with Queue is running!"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = metrics_service.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "queue_enabled": True}
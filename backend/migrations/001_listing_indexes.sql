@@ -0,0 +1,14 @@
+-- Indexes backing keyset pagination on (created_at, id) for the listing endpoints.
+-- Run in the Supabase SQL editor.
+
+create index if not exists transcripts_created_at_id_idx
+    on transcripts (created_at desc, id desc);
+
+create index if not exists transcripts_status_created_at_id_idx
+    on transcripts (status, created_at desc, id desc);
+
+create index if not exists linkedin_insights_created_at_id_idx
+    on linkedin_insights (created_at desc, id desc);
+
+create index if not exists linkedin_insights_status_created_at_id_idx
+    on linkedin_insights (status, created_at desc, id desc);
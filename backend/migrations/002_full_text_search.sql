@@ -0,0 +1,90 @@
+-- Full-text search over transcripts and LinkedIn insights.
+-- Run in the Supabase SQL editor after 001_listing_indexes.sql.
+--
+-- The search vectors are stored generated columns, so Postgres keeps them up
+-- to date on every insert and on every worker write (status, insight,
+-- icebreaker) with no application code. GIN indexes make matching an index
+-- lookup; the RPC functions rank the matches and only build snippets for the
+-- requested page.
+
+-- array_to_string is only STABLE; generated columns need an IMMUTABLE expression
+create or replace function immutable_array_to_string(arr text[], sep text)
+returns text language sql immutable parallel safe as
+$$ select array_to_string(arr, sep) $$;
+
+alter table transcripts add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(company_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(immutable_array_to_string(attendees, ' '), '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(insight_result, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(transcript_text, '')), 'C')
+    ) stored;
+
+create index if not exists transcripts_search_vector_idx
+    on transcripts using gin (search_vector);
+
+alter table linkedin_insights add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(company_linkedin, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(company_website, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(icebreaker_result, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(linkedin_bio, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(pitch_deck_content, '')), 'C')
+    ) stored;
+
+create index if not exists linkedin_insights_search_vector_idx
+    on linkedin_insights using gin (search_vector);
+
+-- Ranked, paginated hits; query uses web search syntax ("quoted phrase", or, -exclude)
+create or replace function search_transcripts(query text, max_results int default 20, skip int default 0)
+returns table (
+    id uuid, company_name text, attendees text[], date date, status text, created_at timestamptz,
+    rank real, snippet text, total_count bigint
+)
+language sql stable as
+$$
+    with q as (select websearch_to_tsquery('english', query) as tsq),
+    hits as (
+        select t.id, t.company_name, t.attendees, t.date, t.status, t.created_at,
+               t.insight_result, t.transcript_text,
+               ts_rank_cd(t.search_vector, q.tsq) as rank,
+               count(*) over () as total_count
+        from transcripts t, q
+        where t.search_vector @@ q.tsq
+        order by rank desc, t.created_at desc
+        limit max_results offset skip
+    )
+    select h.id, h.company_name, h.attendees, h.date, h.status, h.created_at, h.rank,
+           ts_headline('english', coalesce(h.insight_result, '') || ' ' || h.transcript_text, q.tsq,
+                       'MaxFragments=2, MaxWords=20, MinWords=5, StartSel=<mark>, StopSel=</mark>') as snippet,
+           h.total_count
+    from hits h, q
+    order by h.rank desc, h.created_at desc
+$$;
+
+create or replace function search_linkedin_insights(query text, max_results int default 20, skip int default 0)
+returns table (
+    id uuid, company_linkedin text, company_website text, status text, created_at timestamptz,
+    rank real, snippet text, total_count bigint
+)
+language sql stable as
+$$
+    with q as (select websearch_to_tsquery('english', query) as tsq),
+    hits as (
+        select l.id, l.company_linkedin, l.company_website, l.status, l.created_at,
+               l.icebreaker_result, l.linkedin_bio, l.pitch_deck_content,
+               ts_rank_cd(l.search_vector, q.tsq) as rank,
+               count(*) over () as total_count
+        from linkedin_insights l, q
+        where l.search_vector @@ q.tsq
+        order by rank desc, l.created_at desc
+        limit max_results offset skip
+    )
+    select h.id, h.company_linkedin, h.company_website, h.status, h.created_at, h.rank,
+           ts_headline('english',
+                       concat_ws(' ', h.icebreaker_result, h.linkedin_bio, h.pitch_deck_content), q.tsq,
+                       'MaxFragments=2, MaxWords=20, MinWords=5, StartSel=<mark>, StopSel=</mark>') as snippet,
+           h.total_count
+    from hits h, q
+    order by h.rank desc, h.created_at desc
+$$;
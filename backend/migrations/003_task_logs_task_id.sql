@@ -0,0 +1,6 @@
+-- Task logs are written in bulk as upserts keyed by task_id
+-- (SupabaseService.upsert_task_logs), which needs a unique index on it.
+-- Run in the Supabase SQL editor after 002_full_text_search.sql.
+
+create unique index if not exists task_logs_task_id_idx
+    on task_logs (task_id);
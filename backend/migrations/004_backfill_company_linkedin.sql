@@ -0,0 +1,17 @@
+-- New LinkedIn insights get company_linkedin from the submission or from the first
+-- LinkedIn company page linked in the pitch deck or bio (services/company_links.py).
+-- This fills it in the same way for rows created before that, so the company filter
+-- on GET /api/linkedin/ matches them too. Run in the Supabase SQL editor.
+
+with found as (
+    select id, rtrim(coalesce(
+        substring(pitch_deck_content from '(?i)(?:https?://)?(?:[a-z0-9_-]+\.)?linkedin\.com/company/[a-z0-9_%.-]+'),
+        substring(linkedin_bio from '(?i)(?:https?://)?(?:[a-z0-9_-]+\.)?linkedin\.com/company/[a-z0-9_%.-]+')
+    ), '.') as url
+    from linkedin_insights
+    where company_linkedin is null
+)
+update linkedin_insights l
+set company_linkedin = case when found.url ~* '^https?://' then found.url else 'https://' || found.url end
+from found
+where l.id = found.id and found.url is not null;
@@ -1,12 +1,21 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import date
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Most items one /batch submission may carry (transcripts and LinkedIn alike)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
 
 class TranscriptInput(BaseModel):
     company_name: str
     attendees: List[str]
     date: date
     transcript_text: str
+    stream: bool = False  # Publish tokens to /api/tasks/stream/{task_id} while generating
+    preprocess: Optional[bool] = None  # Compact the transcript before the LLM call (None = server default)
 
 class TranscriptResponse(BaseModel):
     id: str
@@ -18,9 +27,28 @@ class TranscriptResponse(BaseModel):
     status: Optional[str] = "pending"  # New field
     created_at: str
 
+class TranscriptSummary(BaseModel):
+    id: str
+    company_name: str
+    attendees: List[str]
+    date: date
+    status: Optional[str] = "pending"
+    created_at: str
+
+class TranscriptSearchHit(TranscriptSummary):
+    rank: float
+    snippet: Optional[str] = None  # matched fragments, terms wrapped in <mark>
+
+class SimilarTranscript(TranscriptSummary):
+    score: float  # cosine similarity, 0..1
+    insight_result: Optional[str] = None
+
 class LinkedInInput(BaseModel):
     linkedin_bio: str
     pitch_deck_content: str
+    company_linkedin: Optional[str] = None  # Defaults to the first LinkedIn company page linked in the text
+    company_website: Optional[str] = None  # Defaults to the first other link in the text
+    stream: bool = False  # Publish tokens to /api/tasks/stream/{task_id} while generating
 
 class LinkedInResponse(BaseModel):
     id: str
@@ -32,6 +60,17 @@ class LinkedInResponse(BaseModel):
     status: Optional[str] = "pending"  # New field
     created_at: str
 
+class LinkedInSummary(BaseModel):
+    id: str
+    company_linkedin: Optional[str] = None
+    company_website: Optional[str] = None
+    status: Optional[str] = "pending"
+    created_at: str
+
+class LinkedInSearchHit(LinkedInSummary):
+    rank: float
+    snippet: Optional[str] = None  # matched fragments, terms wrapped in <mark>
+
 # New models for queue responses
 class QueueResponse(BaseModel):
     id: str
@@ -43,4 +82,24 @@ class TaskStatusResponse(BaseModel):
     task_id: str
     status: str
     result: Optional[dict] = None
-    info: Optional[str] = None
\ No newline at end of file
+    info: Optional[str] = None
+
+# Batch submission models
+class BatchItem(BaseModel):
+    id: str
+    task_id: str
+
+class BatchQueueResponse(BaseModel):
+    batch_id: str
+    status: str
+    message: str
+    items: List[BatchItem]
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    completed: int
+    failed: int
+    in_progress: int
+    pending: int
+    tasks: List[dict]
\ No newline at end of file
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
-from models import LinkedInInput, LinkedInResponse, QueueResponse
-from services.supabase_service import supabase_service
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from models import (
+    LinkedInInput, LinkedInResponse, LinkedInSummary, LinkedInSearchHit,
+    QueueResponse, BatchQueueResponse, BatchItem, BATCH_MAX_ITEMS
+)
+from services.supabase_service import supabase_service, LINKEDIN_COLUMNS, LINKEDIN_SUMMARY_COLUMNS
 from services.queue_service import queue_service
-from typing import List
+from services.dedup_service import dedup_service
+from services.task_event_service import task_event_service
+from services.record_cache import record_cache
+from services.export_service import export_service, MEDIA_TYPES
+from services.company_links import company_fields
+from typing import List, Optional, Union
+from datetime import date, timedelta
 import traceback
 
 router = APIRouter()
@@ -11,54 +21,199 @@ router = APIRouter()
 async def create_linkedin_insight(linkedin: LinkedInInput):
     """Create LinkedIn insight and queue for processing"""
     try:
-        # Create LinkedIn insight record with pending status
-        data = {
+        # Attach to an identical submission that is still in flight
+        dedup_key = dedup_service.make_key({
             "linkedin_bio": linkedin.linkedin_bio,
             "pitch_deck_content": linkedin.pitch_deck_content,
-            "status": "pending"
-        }
-        
-        result = await supabase_service.create_linkedin_insight(data)
-        if not result:
-            raise HTTPException(status_code=500, detail="Failed to create LinkedIn insight")
-        
-        # Queue the processing task
-        task_id = queue_service.enqueue_linkedin(
-            result["id"],
-            linkedin.linkedin_bio,
-            linkedin.pitch_deck_content
-        )
-        
+            # Only a streaming task publishes token events
+            "stream": linkedin.stream
+        })
+        existing = await dedup_service.claim("linkedin", dedup_key)
+        if existing:
+            return QueueResponse(
+                id=existing["id"],
+                task_id=existing["task_id"],
+                status="attached",
+                message="Identical LinkedIn analysis is already being processed"
+            )
+
+        task_id = None
+        try:
+            # Create LinkedIn insight record with pending status
+            data = {
+                "linkedin_bio": linkedin.linkedin_bio,
+                "pitch_deck_content": linkedin.pitch_deck_content,
+                **company_fields(linkedin.linkedin_bio, linkedin.pitch_deck_content,
+                                 linkedin.company_linkedin, linkedin.company_website),
+                "status": "pending"
+            }
+
+            result = await supabase_service.create_linkedin_insight(data)
+            if not result:
+                raise HTTPException(status_code=500, detail="Failed to create LinkedIn insight")
+
+            # The dedup entry and "queued" go out before the task exists, so a fast worker can't
+            # release the entry before it is registered or publish a state "queued" would overwrite
+            task_id = queue_service.new_task_id()
+            await dedup_service.register("linkedin", dedup_key, result["id"], task_id)
+            await task_event_service.publish(task_id, "queued", kind="linkedin", record_id=result["id"], retries=0)
+
+            # Queue the processing task
+            queue_service.enqueue_linkedin(
+                result["id"],
+                linkedin.linkedin_bio,
+                linkedin.pitch_deck_content,
+                stream=linkedin.stream,
+                task_id=task_id
+            )
+        except Exception as e:
+            await dedup_service.release("linkedin", dedup_key)
+            if task_id is not None:
+                # Listeners saw "queued" for a task that will never run
+                await task_event_service.publish(task_id, "failed", kind="linkedin", record_id=result["id"],
+                                                 retries=0, error=str(e))
+            raise
+
         return QueueResponse(
             id=result["id"],
             task_id=task_id,
             status="queued",
             message="LinkedIn icebreaker analysis queued for processing"
         )
-        
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch", response_model=BatchQueueResponse)
+async def create_linkedin_batch(insights: List[LinkedInInput]):
+    """Create many LinkedIn insights in one insert and queue them as one batch"""
+    if not insights:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(insights) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
+    try:
+        rows = [
+            {
+                "linkedin_bio": linkedin.linkedin_bio,
+                "pitch_deck_content": linkedin.pitch_deck_content,
+                **company_fields(linkedin.linkedin_bio, linkedin.pitch_deck_content,
+                                 linkedin.company_linkedin, linkedin.company_website),
+                "status": "pending"
+            }
+            for linkedin in insights
+        ]
+
+        results = await supabase_service.create_linkedin_insights(rows)
+        if len(results) != len(insights):
+            raise HTTPException(status_code=500, detail="Failed to create LinkedIn insights")
+
+        # "queued" goes out before the tasks exist, so it can't overwrite the state of a fast worker
+        task_ids = [queue_service.new_task_id() for _ in results]
+        await task_event_service.publish_many(
+            task_event_service.queued_events("linkedin", zip([result["id"] for result in results], task_ids))
+        )
+
+        batch_id, _ = queue_service.enqueue_linkedin_batch([
+            (result["id"], linkedin.linkedin_bio, linkedin.pitch_deck_content)
+            for result, linkedin in zip(results, insights)
+        ], task_ids)
+
+        return BatchQueueResponse(
+            batch_id=batch_id,
+            status="queued",
+            message=f"{len(task_ids)} LinkedIn analyses queued for processing",
+            items=[BatchItem(id=result["id"], task_id=task_id) for result, task_id in zip(results, task_ids)]
+        )
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=List[LinkedInResponse])
-async def get_linkedin_insights():
-    """Get all LinkedIn insights"""
+@router.get("/", response_model=Union[List[LinkedInResponse], List[LinkedInSummary]])
+async def get_linkedin_insights(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    company: Optional[str] = Query(None, description="Case-insensitive company LinkedIn URL, * as wildcard"),
+    fields: str = Query("full", pattern="^(full|summary)$")
+):
+    """Get a page of LinkedIn insights (newest first). Pass X-Next-Cursor back as ?cursor= for the next page."""
     try:
-        results = await supabase_service.get_linkedin_insights()
-        return [LinkedInResponse(**item) for item in results]
+        page = await supabase_service.get_linkedin_insights(
+            limit=limit, cursor=cursor, status=status, company=company, summary=fields == "summary"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if page["total"] is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    model = LinkedInSummary if fields == "summary" else LinkedInResponse
+    return [model(**item) for item in page["items"]]
+
+@router.get("/export")
+async def export_linkedin_insights(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[date] = Query(None, description="First creation date to include"),
+    created_to: Optional[date] = Query(None, description="Last creation date to include"),
+    fields: str = Query("full", pattern="^(full|summary)$")
+):
+    """Stream all matching LinkedIn insights (newest first) as NDJSON or CSV"""
+    summary = fields == "summary"
+    pages = supabase_service.iter_linkedin_insights(
+        status=status,
+        created_from=created_from.isoformat() if created_from else None,
+        created_to=(created_to + timedelta(days=1)).isoformat() if created_to else None,
+        summary=summary
+    )
+    columns = (LINKEDIN_SUMMARY_COLUMNS if summary else LINKEDIN_COLUMNS).split(",")
+    try:
+        body = await export_service.open(pages, format, columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="linkedin_insights.{format}"'}
+    )
+
+@router.get("/search", response_model=List[LinkedInSearchHit])
+async def search_linkedin_insights(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Words, \"quoted phrases\", or, -excluded"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search over LinkedIn insights (company, bio, pitch deck and icebreaker), best matches first"""
+    try:
+        page = await supabase_service.search_linkedin_insights(q, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    response.headers["X-Total-Count"] = str(page["total"])
+    return [LinkedInSearchHit(**item) for item in page["items"]]
+
 @router.get("/{insight_id}", response_model=LinkedInResponse)
-async def get_linkedin_insight(insight_id: str):
-    """Get specific LinkedIn insight by ID"""
+async def get_linkedin_insight(insight_id: str, request: Request, response: Response):
+    """Get specific LinkedIn insight by ID (supports ETag / If-Modified-Since)"""
     try:
-        # This would need to be implemented in supabase_service
         result = await supabase_service.get_linkedin_insight_by_id(insight_id)
-        if not result:
-            raise HTTPException(status_code=404, detail="LinkedIn insight not found")
-        return LinkedInResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="LinkedIn insight not found")
+
+    headers = record_cache.validators(result)
+    if record_cache.not_modified(request.headers, headers):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return LinkedInResponse(**result)
 
 # Keep test endpoints for debugging
 @router.post("/test-groq")
@@ -1,7 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from services.queue_service import queue_service
-from models import TaskStatusResponse
-from typing import Dict, Any
+from services.cache_service import llm_cache
+from services.stream_service import stream_service
+from services.rate_limiter import rate_limiter
+from services.model_router import model_router
+from services.resilience import llm_circuit
+from services.groq_service import groq_service
+from services.task_event_service import task_event_service, FINAL_STATES
+from models import TaskStatusResponse, BatchStatusResponse
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
 
 router = APIRouter()
 
@@ -14,11 +24,146 @@ async def get_task_status(task_id: str) -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str) -> Dict[str, Any]:
+    """Get aggregate progress of a batch submission"""
+    try:
+        status = queue_service.get_batch_status(batch_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
+
+@router.get("/stream/{task_id}")
+async def stream_task_output(task_id: str):
+    """Stream generated insight tokens for a task as Server-Sent Events"""
+    async def event_source():
+        async for event, data in stream_service.listen(task_id):
+            if event == "keepalive":
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/events")
+async def stream_task_events(task_id: Optional[List[str]] = Query(None)):
+    """
+    Server-Sent Events with task state transitions (queued, processing,
+    retrying, parked, completed, failed). Pass ?task_id= one or more times to follow
+    specific tasks (the stream ends once all of them finish), or omit it to
+    receive every event.
+    """
+    async def event_source():
+        queue = task_event_service.add_listener(task_id)
+        try:
+            pending = set(task_id or [])
+            # Current state first, so a client never misses a transition that already happened
+            for event in await task_event_service.snapshot(task_id or []):
+                yield f"event: {event['state']}\ndata: {json.dumps(event)}\n\n"
+                if event["state"] in FINAL_STATES:
+                    pending.discard(event["task_id"])
+            if task_id and not pending:
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['state']}\ndata: {json.dumps(event)}\n\n"
+                if task_id and event["state"] in FINAL_STATES:
+                    pending.discard(event["task_id"])
+                    if not pending:
+                        return
+        finally:
+            task_event_service.remove_listener(queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def task_events_websocket(websocket: WebSocket):
+    """
+    WebSocket with task state transitions. Send {"subscribe": [task_id, ...]}
+    at any time to follow more tasks; each subscription gets the current
+    state immediately, then live events.
+    """
+    await websocket.accept()
+    queue = task_event_service.add_listener([])
+
+    async def receive_subscriptions():
+        while True:
+            message = await websocket.receive_json()
+            task_ids = [str(t) for t in message.get("subscribe", [])]
+            task_event_service.watch(queue, task_ids)
+            for event in await task_event_service.snapshot(task_ids):
+                await websocket.send_json(event)
+
+    receiver = asyncio.create_task(receive_subscriptions())
+    try:
+        while not receiver.done():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        task_event_service.remove_listener(queue)
+        receiver.cancel()
+        # Collect the receiver's outcome (usually the disconnect) so it isn't reported as never retrieved
+        for result in await asyncio.gather(receiver, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, WebSocketDisconnect):
+                print(f"Task event WebSocket receiver failed: {str(result)}")
+
 @router.get("/queue/stats")
 async def get_queue_stats() -> Dict[str, Any]:
     """Get queue statistics"""
     try:
         stats = queue_service.get_queue_stats()
         return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> Dict[str, Any]:
+    """Get LLM result cache hit/miss counters"""
+    try:
+        return await llm_cache.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ratelimit")
+async def get_rate_limit_levels(model: Optional[str] = None) -> Dict[str, Any]:
+    """Get current Groq rate limit bucket levels (default model unless ?model= is given)"""
+    try:
+        return await rate_limiter.get_levels(model or groq_service.model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models")
+async def get_model_stats() -> Dict[str, Any]:
+    """Get model routing configuration and per-model rolling latency and success stats"""
+    try:
+        return await model_router.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/circuit")
+async def get_circuit_state() -> Dict[str, Any]:
+    """Get the Groq circuit breaker state (tasks are parked while it is open)"""
+    try:
+        return await llm_circuit.get_state()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
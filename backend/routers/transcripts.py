@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
-from models import TranscriptInput, TranscriptResponse, QueueResponse
-from services.supabase_service import supabase_service
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from models import (
+    TranscriptInput, TranscriptResponse, TranscriptSummary, TranscriptSearchHit, SimilarTranscript,
+    QueueResponse, BatchQueueResponse, BatchItem, BATCH_MAX_ITEMS
+)
+from services.supabase_service import supabase_service, TRANSCRIPT_COLUMNS, TRANSCRIPT_SUMMARY_COLUMNS
 from services.queue_service import queue_service
-from typing import List
+from services.dedup_service import dedup_service
+from services.task_event_service import task_event_service
+from services.record_cache import record_cache
+from services.export_service import export_service, MEDIA_TYPES
+from services.similarity_index import similarity_index
+from typing import List, Optional, Union
+from datetime import date, timedelta
 
 router = APIRouter()
 
@@ -10,53 +20,235 @@ router = APIRouter()
 async def create_transcript(transcript: TranscriptInput):
     """Create transcript and queue for processing"""
     try:
-        # Create transcript record with pending status
-        data = {
+        # Attach to an identical submission that is still in flight
+        dedup_key = dedup_service.make_key({
             "company_name": transcript.company_name,
             "attendees": transcript.attendees,
             "date": transcript.date.isoformat(),
             "transcript_text": transcript.transcript_text,
-            "status": "pending"
-        }
-        
-        result = await supabase_service.create_transcript(data)
-        if not result:
-            raise HTTPException(status_code=500, detail="Failed to create transcript")
-        
-        # Queue the processing task
-        task_id = queue_service.enqueue_transcript(
-            result["id"], 
-            transcript.transcript_text, 
-            transcript.company_name
-        )
-        
+            "preprocess": transcript.preprocess,
+            # Only a streaming task publishes token events
+            "stream": transcript.stream
+        })
+        existing = await dedup_service.claim("transcript", dedup_key)
+        if existing:
+            return QueueResponse(
+                id=existing["id"],
+                task_id=existing["task_id"],
+                status="attached",
+                message=f"Identical transcript is already being processed. Company: {transcript.company_name}"
+            )
+
+        task_id = None
+        try:
+            # Create transcript record with pending status
+            data = {
+                "company_name": transcript.company_name,
+                "attendees": transcript.attendees,
+                "date": transcript.date.isoformat(),
+                "transcript_text": transcript.transcript_text,
+                "status": "pending"
+            }
+
+            result = await supabase_service.create_transcript(data)
+            if not result:
+                raise HTTPException(status_code=500, detail="Failed to create transcript")
+
+            # The dedup entry and "queued" go out before the task exists, so a fast worker can't
+            # release the entry before it is registered or publish a state "queued" would overwrite
+            task_id = queue_service.new_task_id()
+            await dedup_service.register("transcript", dedup_key, result["id"], task_id)
+            await task_event_service.publish(task_id, "queued", kind="transcript", record_id=result["id"], retries=0)
+
+            # Queue the processing task
+            queue_service.enqueue_transcript(
+                result["id"],
+                transcript.transcript_text,
+                transcript.company_name,
+                stream=transcript.stream,
+                preprocess=transcript.preprocess,
+                task_id=task_id
+            )
+        except Exception as e:
+            await dedup_service.release("transcript", dedup_key)
+            if task_id is not None:
+                # Listeners saw "queued" for a task that will never run
+                await task_event_service.publish(task_id, "failed", kind="transcript", record_id=result["id"],
+                                                 retries=0, error=str(e))
+            raise
+
         return QueueResponse(
             id=result["id"],
             task_id=task_id,
             status="queued",
             message=f"Transcript analysis queued for processing. Company: {transcript.company_name}"
         )
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/", response_model=List[TranscriptResponse])
-async def get_transcripts():
-    """Get all transcripts"""
+@router.post("/batch", response_model=BatchQueueResponse)
+async def create_transcript_batch(transcripts: List[TranscriptInput]):
+    """Create many transcripts in one insert and queue them as one batch"""
+    if not transcripts:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(transcripts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
     try:
-        results = await supabase_service.get_transcripts()
-        return [TranscriptResponse(**item) for item in results]
+        rows = [
+            {
+                "company_name": transcript.company_name,
+                "attendees": transcript.attendees,
+                "date": transcript.date.isoformat(),
+                "transcript_text": transcript.transcript_text,
+                "status": "pending"
+            }
+            for transcript in transcripts
+        ]
+
+        results = await supabase_service.create_transcripts(rows)
+        if len(results) != len(transcripts):
+            raise HTTPException(status_code=500, detail="Failed to create transcripts")
+
+        # "queued" goes out before the tasks exist, so it can't overwrite the state of a fast worker
+        task_ids = [queue_service.new_task_id() for _ in results]
+        await task_event_service.publish_many(
+            task_event_service.queued_events("transcript", zip([result["id"] for result in results], task_ids))
+        )
+
+        batch_id, _ = queue_service.enqueue_transcript_batch([
+            (result["id"], transcript.transcript_text, transcript.company_name, transcript.preprocess)
+            for result, transcript in zip(results, transcripts)
+        ], task_ids)
+
+        return BatchQueueResponse(
+            batch_id=batch_id,
+            status="queued",
+            message=f"{len(task_ids)} transcripts queued for processing",
+            items=[BatchItem(id=result["id"], task_id=task_id) for result, task_id in zip(results, task_ids)]
+        )
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/", response_model=Union[List[TranscriptResponse], List[TranscriptSummary]])
+async def get_transcripts(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    company: Optional[str] = Query(None, description="Case-insensitive company name, * as wildcard"),
+    fields: str = Query("full", pattern="^(full|summary)$")
+):
+    """Get a page of transcripts (newest first). Pass X-Next-Cursor back as ?cursor= for the next page."""
+    try:
+        page = await supabase_service.get_transcripts(
+            limit=limit, cursor=cursor, status=status, company=company, summary=fields == "summary"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if page["total"] is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    model = TranscriptSummary if fields == "summary" else TranscriptResponse
+    return [model(**item) for item in page["items"]]
+
+@router.get("/export")
+async def export_transcripts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[date] = Query(None, description="First creation date to include"),
+    created_to: Optional[date] = Query(None, description="Last creation date to include"),
+    fields: str = Query("full", pattern="^(full|summary)$")
+):
+    """Stream all matching transcripts (newest first) as NDJSON or CSV"""
+    summary = fields == "summary"
+    pages = supabase_service.iter_transcripts(
+        status=status,
+        created_from=created_from.isoformat() if created_from else None,
+        created_to=(created_to + timedelta(days=1)).isoformat() if created_to else None,
+        summary=summary
+    )
+    columns = (TRANSCRIPT_SUMMARY_COLUMNS if summary else TRANSCRIPT_COLUMNS).split(",")
+    try:
+        body = await export_service.open(pages, format, columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transcripts.{format}"'}
+    )
+
+@router.get("/search", response_model=List[TranscriptSearchHit])
+async def search_transcripts(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Words, \"quoted phrases\", or, -excluded"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search over transcripts (company, attendees, transcript and insight), best matches first"""
+    try:
+        page = await supabase_service.search_transcripts(q, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    response.headers["X-Total-Count"] = str(page["total"])
+    return [TranscriptSearchHit(**item) for item in page["items"]]
+
 @router.get("/{transcript_id}", response_model=TranscriptResponse)
-async def get_transcript(transcript_id: str):
-    """Get specific transcript by ID"""
+async def get_transcript(transcript_id: str, request: Request, response: Response):
+    """Get specific transcript by ID (supports ETag / If-Modified-Since)"""
     try:
-        # This would need to be implemented in supabase_service
         result = await supabase_service.get_transcript_by_id(transcript_id)
-        if not result:
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+
+    headers = record_cache.validators(result)
+    if record_cache.not_modified(request.headers, headers):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return TranscriptResponse(**result)
+
+@router.get("/{transcript_id}/similar", response_model=List[SimilarTranscript])
+async def get_similar_transcripts(
+    transcript_id: str,
+    k: int = Query(5, ge=1, le=50),
+    min_score: float = Query(0.1, ge=0, le=1)
+):
+    """Most similar past transcripts (with their insights), best match first"""
+    try:
+        record = await supabase_service.get_transcript_by_id(transcript_id)
+        if not record:
             raise HTTPException(status_code=404, detail="Transcript not found")
-        return TranscriptResponse(**result)
+
+        hits = await similarity_index.similar(transcript_id, record.get("transcript_text"), k=k, min_score=min_score)
+        rows = await supabase_service.get_transcripts_by_ids(
+            [hit_id for hit_id, _ in hits],
+            columns=f"{TRANSCRIPT_SUMMARY_COLUMNS},insight_result"
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    by_id = {row["id"]: row for row in rows}
+    return [SimilarTranscript(**by_id[hit_id], score=score) for hit_id, score in hits if hit_id in by_id]
+
+@router.post("/similar/rebuild")
+async def rebuild_similarity_index():
+    """Re-index every completed transcript (e.g. after Redis lost the index)"""
+    try:
+        pages = supabase_service.iter_transcripts(status="completed")
+        indexed = await similarity_index.rebuild(pages)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "rebuilt", "indexed": indexed}
@@ -0,0 +1,146 @@
+from services.redis_service import redis_service
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM completions.
+
+    Tier 1 is an in-process LRU, tier 2 is the shared broker Redis. Both
+    tiers expire entries after a TTL; the LRU is also capped by entry count,
+    and Redis by the value size limit plus its own maxmemory eviction policy.
+    Redis failures degrade to a cache miss.
+    """
+
+    PREFIX = "llmcache:"
+    STATS_KEY = "llmcache:stats"
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.ttl = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_value_bytes = int(os.getenv("LLM_CACHE_MAX_VALUE_BYTES", str(64 * 1024)))
+        self.local = LRUCache(
+            max_size=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+            ttl=self.ttl,
+        )
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, inputs: Dict[str, Any], params: Dict[str, Any]) -> str:
+        """Hash of everything that determines the completion"""
+        payload = json.dumps(
+            {"model": model, "prompt_version": prompt_version, "inputs": inputs, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _count(self, field: str):
+        self.stats[field] += 1
+        try:
+            await redis_service.client.hincrby(self.STATS_KEY, field, 1)
+        except Exception:
+            pass
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            await self._count("local_hits")
+            return value
+
+        try:
+            raw = await redis_service.client.get(self.PREFIX + key)
+        except Exception as e:
+            print(f"LLM cache read failed: {str(e)}")
+            self.stats["errors"] += 1
+            raw = None
+
+        if raw is not None:
+            value = raw.decode("utf-8")
+            self.local.set(key, value)
+            await self._count("redis_hits")
+            return value
+
+        await self._count("misses")
+        return None
+
+    async def set(self, key: str, value: str):
+        if not self.enabled or not value:
+            return
+
+        self.local.set(key, value)
+        encoded = value.encode("utf-8")
+        if len(encoded) > self.max_value_bytes:
+            return
+        try:
+            await redis_service.client.set(self.PREFIX + key, encoded, ex=self.ttl)
+            self.stats["stores"] += 1
+        except Exception as e:
+            print(f"LLM cache write failed: {str(e)}")
+            self.stats["errors"] += 1
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Counters for this process plus the cluster-wide totals kept in Redis"""
+        cluster = {}
+        try:
+            raw = await redis_service.client.hgetall(self.STATS_KEY)
+            cluster = {k.decode(): int(v) for k, v in raw.items()}
+        except Exception as e:
+            cluster = {"error": str(e)}
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "local_entries": len(self.local),
+            "local_max_entries": self.local.max_size,
+            "process": dict(self.stats),
+            "cluster": cluster,
+        }
+
+llm_cache = LLMCache()
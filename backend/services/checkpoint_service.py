@@ -0,0 +1,88 @@
+from services.redis_service import redis_service
+from dataclasses import dataclass
+import os
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+@dataclass
+class TaskCheckpoint:
+    key: str
+    stage: str  # started, generated (result saved, not yet persisted) or persisted
+    result: Optional[str] = None
+    resumed: bool = False  # an earlier delivery of the same task got this far
+
+class CheckpointService:
+    """
+    Stage checkpoints for worker tasks, keyed by the task's idempotency key.
+
+    The generated text is saved in Redis before the database write, so a
+    retry or a redelivered message (acks are late) resumes at persistence
+    instead of paying for a second LLM generation, and a task whose result
+    already reached the database is skipped. Redis failures only lose the
+    checkpoint; the task itself goes on.
+    """
+
+    PREFIX = "checkpoint:"
+
+    def __init__(self):
+        self.enabled = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+        # Long enough to outlive every retry and park of a task
+        self.ttl = int(os.getenv("CHECKPOINT_TTL", str(3 * 24 * 3600)))
+        # Finished tasks keep a small marker so late redeliveries are skipped cheaply
+        self.done_ttl = int(os.getenv("CHECKPOINT_DONE_TTL", str(24 * 3600)))
+
+    @staticmethod
+    def make_key(kind: str, record_id: str, content_hash: Optional[str] = None) -> str:
+        """Idempotency key of the task processing this record (and this content)"""
+        return f"{kind}:{record_id}:{content_hash[:16]}" if content_hash else f"{kind}:{record_id}"
+
+    async def begin(self, key: str) -> TaskCheckpoint:
+        """Start (or resume) the task with this key"""
+        if not self.enabled:
+            return TaskCheckpoint(key, "started")
+        try:
+            pipe = redis_service.client.pipeline(transaction=True)
+            pipe.hsetnx(self.PREFIX + key, "stage", "started")
+            pipe.hincrby(self.PREFIX + key, "deliveries", 1)
+            pipe.hmget(self.PREFIX + key, "stage", "result")
+            pipe.expire(self.PREFIX + key, self.ttl)
+            created, _, (stage, result), _ = await pipe.execute()
+        except Exception as e:
+            print(f"Checkpoint read failed: {str(e)}")
+            return TaskCheckpoint(key, "started")
+        return TaskCheckpoint(
+            key,
+            stage.decode(),
+            result.decode("utf-8") if result is not None else None,
+            resumed=not created,
+        )
+
+    async def save_result(self, key: str, result: str):
+        """Keep the generated text until it has been persisted"""
+        if not self.enabled:
+            return
+        try:
+            pipe = redis_service.client.pipeline(transaction=True)
+            pipe.hset(self.PREFIX + key, mapping={"stage": "generated", "result": result, "generated_at": time.time()})
+            pipe.expire(self.PREFIX + key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Checkpoint write failed: {str(e)}")
+
+    async def mark_done(self, key: str):
+        """The result is in the database; drop the text and keep a short-lived marker"""
+        if not self.enabled:
+            return
+        try:
+            pipe = redis_service.client.pipeline(transaction=True)
+            pipe.hset(self.PREFIX + key, "stage", "persisted")
+            pipe.hdel(self.PREFIX + key, "result")
+            pipe.expire(self.PREFIX + key, self.done_ttl)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Checkpoint update failed: {str(e)}")
+
+checkpoint_service = CheckpointService()
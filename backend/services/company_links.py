@@ -0,0 +1,37 @@
+import re
+from typing import Dict, Optional
+
+# linkedin.com/company/acme, https://www.linkedin.com/company/acme-inc/
+COMPANY_LINKEDIN = re.compile(r"(?:https?://)?(?:[\w-]+\.)?linkedin\.com/company/[\w%.-]+", re.IGNORECASE)
+# https://acme.com/about, www.acme.io
+WEBSITE = re.compile(r"(?:https?://|\bwww\.)[\w-]+(?:\.[\w-]+)+(?:/[^\s)\]>\"']*)?", re.IGNORECASE)
+TRAILING_PUNCTUATION = ".,;:!?"
+
+def _normalize(url: str) -> str:
+    url = url.rstrip(TRAILING_PUNCTUATION).rstrip("/")
+    return url if re.match(r"https?://", url, re.IGNORECASE) else f"https://{url}"
+
+def find_company_linkedin(text: str) -> Optional[str]:
+    """First LinkedIn company page linked in the text"""
+    match = COMPANY_LINKEDIN.search(text or "")
+    return _normalize(match.group(0)) if match else None
+
+def find_company_website(text: str) -> Optional[str]:
+    """First link in the text that isn't a LinkedIn page"""
+    for match in WEBSITE.finditer(text or ""):
+        if "linkedin.com" not in match.group(0).lower():
+            return _normalize(match.group(0))
+    return None
+
+def company_fields(linkedin_bio: str, pitch_deck: str, company_linkedin: Optional[str] = None,
+                   company_website: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    company_linkedin and company_website for a new insight: the submitted
+    values, or else the first matching link in the pitch deck, then the bio
+    """
+    return {
+        "company_linkedin": company_linkedin
+        or find_company_linkedin(pitch_deck) or find_company_linkedin(linkedin_bio),
+        "company_website": company_website
+        or find_company_website(pitch_deck) or find_company_website(linkedin_bio),
+    }
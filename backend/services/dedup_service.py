@@ -0,0 +1,116 @@
+from services.redis_service import redis_service
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class DedupService:
+    """
+    Single-flight coalescing of identical submissions.
+
+    The first request for a given normalized input claims a Redis key and
+    later publishes the record id and task id under it. Identical requests
+    arriving while that task is pending or processing get the same ids back
+    instead of creating a new record and task. The worker releases the key
+    when the task reaches a final state; the TTL is a safety net.
+    """
+
+    PREFIX = "inflight:"
+    PENDING = b"__pending__"
+
+    def __init__(self):
+        self.enabled = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+        self.ttl = int(os.getenv("DEDUP_TTL", "1800"))
+        self.claim_wait = float(os.getenv("DEDUP_CLAIM_WAIT", "2"))
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        if isinstance(value, (list, tuple)):
+            return [DedupService._normalize(v) for v in value]
+        return str(value)
+
+    @classmethod
+    def make_key(cls, fields: Dict[str, Any]) -> str:
+        """Hash of the whitespace/case-normalized submission"""
+        normalized = {name: cls._normalize(value) for name, value in fields.items()}
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _key(self, kind: str, key: str) -> str:
+        return f"{self.PREFIX}{kind}:{key}"
+
+    def _record_key(self, kind: str, record_id: str) -> str:
+        return f"{self.PREFIX}{kind}:record:{record_id}"
+
+    async def claim(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim this content for a new submission.
+        Returns None if the caller should create and enqueue it, or the
+        {"id", "task_id"} of the identical submission already in flight.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            r = redis_service.client
+            redis_key = self._key(kind, key)
+            deadline = time.monotonic() + self.claim_wait
+            while True:
+                if await r.set(redis_key, self.PENDING, nx=True, ex=self.ttl):
+                    return None
+
+                raw = await r.get(redis_key)
+                if raw is not None and raw != self.PENDING:
+                    return json.loads(raw)
+
+                # The owner is still inserting the record - wait for its ids
+                if time.monotonic() > deadline:
+                    print(f"Dedup claim for {kind} timed out, submitting without coalescing")
+                    return None
+                await asyncio.sleep(0.05)
+        except Exception as e:
+            print(f"Dedup claim failed: {str(e)}")
+            return None
+
+    async def register(self, kind: str, key: str, record_id: str, task_id: str):
+        """Publish the ids of a claimed submission so duplicates can attach to it"""
+        if not self.enabled:
+            return
+        try:
+            pipe = redis_service.client.pipeline(transaction=True)
+            pipe.set(self._key(kind, key), json.dumps({"id": record_id, "task_id": task_id}), ex=self.ttl)
+            pipe.set(self._record_key(kind, record_id), key, ex=self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            print(f"Dedup register failed: {str(e)}")
+
+    async def release(self, kind: str, key: str):
+        """Drop a claim (e.g. when the submission failed before enqueueing)"""
+        if not self.enabled:
+            return
+        try:
+            await redis_service.client.delete(self._key(kind, key))
+        except Exception as e:
+            print(f"Dedup release failed: {str(e)}")
+
+    async def release_record(self, kind: str, record_id: str):
+        """Drop the claim for a record whose task reached a final state"""
+        if not self.enabled:
+            return
+        try:
+            r = redis_service.client
+            record_key = self._record_key(kind, record_id)
+            key = await r.get(record_key)
+            if key is not None:
+                await r.delete(self._key(kind, key.decode()), record_key)
+        except Exception as e:
+            print(f"Dedup release failed: {str(e)}")
+
+dedup_service = DedupService()
@@ -0,0 +1,66 @@
+import csv
+import io
+import orjson
+from typing import Any, AsyncIterator, Dict, List
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+class ExportService:
+    """
+    Streams pages of rows as NDJSON or CSV. Only the current page is held in
+    memory and rows go straight from the Supabase JSON to the output, without
+    building response models. A failure after the first page aborts the body.
+    """
+
+    async def open(self, pages: AsyncIterator[List[Dict[str, Any]]], fmt: str,
+                   columns: List[str]) -> AsyncIterator[bytes]:
+        """
+        Fetch the first page before the response starts, so query errors can
+        still become a proper HTTP error; returns the body iterator.
+        """
+        try:
+            first = await pages.__anext__()
+        except StopAsyncIteration:
+            first = []
+        return self._encode(first, pages, fmt, columns)
+
+    async def _encode(self, first: List[Dict[str, Any]], pages: AsyncIterator[List[Dict[str, Any]]],
+                      fmt: str, columns: List[str]) -> AsyncIterator[bytes]:
+        encode = self._ndjson if fmt == "ndjson" else self._csv
+        if fmt == "csv":
+            yield self._csv_line(columns)
+        if first:
+            yield encode(first, columns)
+        try:
+            async for page in pages:
+                yield encode(page, columns)
+        except Exception as e:
+            # Headers are already sent: NDJSON gets a last record saying the file is incomplete, and
+            # re-raising aborts the response so it never ends like a complete one (CSV has no such marker)
+            print(f"Export aborted: {str(e)}")
+            if fmt == "ndjson":
+                yield orjson.dumps({"error": f"Export aborted: {str(e)}"}, option=orjson.OPT_APPEND_NEWLINE)
+            raise
+
+    @staticmethod
+    def _ndjson(rows: List[Dict[str, Any]], columns: List[str]) -> bytes:
+        return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+    @staticmethod
+    def _csv_line(values: List[Any]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _csv(rows: List[Dict[str, Any]], columns: List[str]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                "; ".join(value) if isinstance(value, list) else ("" if value is None else value)
+                for value in (row.get(column) for column in columns)
+            ])
+        return buffer.getvalue().encode("utf-8")
+
+export_service = ExportService()
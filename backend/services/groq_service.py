@@ -1,79 +1,445 @@
-from groq import Groq
+from groq import AsyncGroq, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from services.cache_service import llm_cache
+from services.metrics_service import metrics_service
+from services.model_router import model_router
+from services.rate_limiter import rate_limiter, RateLimitTimeout
+from services.resilience import llm_circuit, call_timeout, hedged, DeadlineExceeded, LatencyTracker
+from services.transcript_chunker import chunk_transcript, estimate_tokens
+import asyncio
+import httpx
 import os
-from typing import Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables first
 load_dotenv()
 
+# Bump whenever a prompt template changes so cached completions are not reused
+PROMPT_VERSION = "v2"
+
+# Prompt templates are flush-left: indentation inside a prompt is sent (and billed) as tokens.
+# Filled with str.format, so braces inside the inserted text are safe.
+INSIGHT_FORMAT = """**What You Did Well:**
+- [Specific points about what went well and why]
+
+**Areas for Improvement:**
+- [Specific recommendations for improvement]
+
+**Things to Test Next Time:**
+- [Actionable suggestions for future conversations]"""
+
+TRANSCRIPT_INSIGHT_PROMPT = """Review this transcript and provide insights in the following format:
+
+{format}
+
+{examples}Transcript:
+{transcript}"""
+
+TRANSCRIPT_PART_PROMPT = """This is part {index} of {total} of a sales call transcript.
+Write concise notes on this part only, with specific examples:
+- What the seller did well
+- What the seller could improve
+- Ideas worth testing in future conversations
+
+Transcript part:
+{part}"""
+
+TRANSCRIPT_REDUCE_PROMPT = """Below are notes taken on consecutive parts of one sales call transcript.
+Combine them into insights for the whole call in the following format:
+
+{format}
+
+{examples}Notes:
+{notes}"""
+
+LINKEDIN_ICEBREAKER_PROMPT = """Based on this LinkedIn bio and pitch deck, provide a comprehensive analysis:
+
+LinkedIn Bio: {linkedin_bio}
+Pitch Deck Content: {pitch_deck}
+
+Please provide:
+1. **Company LinkedIn & Website** (if identifiable from bio)
+2. **Buying Signals** with explanations
+3. **Discovery Triggers** and smart questions
+4. **Preferred Buying Style** (inferred)
+5. **Top 5 Deck Highlights** for this person
+6. **Potential Issues** with deck relevance
+7. **Short Summary**
+8. **3 Reflection Questions** for meeting prep
+9. **Cold Outreach Icebreaker** (2-3 sentences)
+
+Format as a well-structured response with clear sections."""
+
+# Receives each generated text chunk when streaming
+ChunkCallback = Callable[[str], Awaitable[None]]
+
+def _usage_tokens(usage: Any, field: str) -> Optional[int]:
+    """A token count from a usage object, or from the dict a streamed chunk carries"""
+    return usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+
+class GroqRateLimitError(Exception):
+    """Groq is rate limiting us; retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 class GroqService:
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        # Updated to use a supported model
-        self.model = "llama-3.3-70b-versatile"  # Production-ready model with 128K context
+        self.api_key = os.getenv("GROQ_API_KEY")
+        # Any Groq-compatible endpoint (e.g. benchmarks/fake_groq.py); None means api.groq.com
+        self.base_url = os.getenv("GROQ_BASE_URL") or None
+        # Default model; each completion is routed across GROQ_MODELS / GROQ_FAST_MODELS
+        self.model = model_router.default_model
+        self.temperature = 0.7
+
+        # HTTP connection pool settings (shared by every completion in this process)
+        self.timeout = float(os.getenv("GROQ_TIMEOUT", "60"))
+        self.connect_timeout = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+        self.max_connections = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.keepalive_expiry = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+        self.max_retries = int(os.getenv("GROQ_MAX_RETRIES", "2"))
 
-    async def generate_transcript_insight(self, transcript: str) -> str:
-        prompt = f"""
-        Review this transcript and provide insights in the following format:
+        # Long transcripts are summarized in chunks (map) and then combined (reduce)
+        self.chunk_tokens = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "6000"))
+        self.chunk_concurrency = int(os.getenv("TRANSCRIPT_CHUNK_CONCURRENCY", "4"))
+        # Rounds of condensing notes that still don't fit one prompt, before giving up
+        self.max_condense_rounds = int(os.getenv("TRANSCRIPT_MAX_CONDENSE_ROUNDS", "3"))
+        self.default_retry_after = float(os.getenv("GROQ_DEFAULT_RETRY_AFTER", "10"))
 
-        **What You Did Well:**
-        - [Specific points about what went well and why]
+        # Wall-clock limit per model attempt (streaming included), capped by the task deadline
+        self.call_deadline = float(os.getenv("GROQ_CALL_DEADLINE", "60"))
+        # Hedging: when a non-streamed call runs past this latency percentile, send a second one
+        self.hedge_enabled = os.getenv("GROQ_HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_percentile = float(os.getenv("GROQ_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_delay = float(os.getenv("GROQ_HEDGE_MIN_DELAY", "1"))
+        self.latencies = LatencyTracker(
+            window=int(os.getenv("GROQ_HEDGE_WINDOW", "200")),
+            min_samples=int(os.getenv("GROQ_HEDGE_MIN_SAMPLES", "20")),
+        )
 
-        **Areas for Improvement:**
-        - [Specific recommendations for improvement]
+        self._client: Optional[AsyncGroq] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
 
-        **Things to Test Next Time:**
-        - [Actionable suggestions for future conversations]
+    @property
+    def client(self) -> AsyncGroq:
+        """Async Groq client with a pooled, keep-alive HTTP session.
 
-        Transcript:
-        {transcript}
+        Pooled connections belong to the event loop that opened them, so the
+        client is rebuilt if it is used from a different loop.
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                model=self.model,
-                max_tokens=1000,
-                temperature=0.7
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
-
-    async def generate_linkedin_icebreaker(self, linkedin_bio: str, pitch_deck: str) -> str:
-        prompt = f"""
-        Based on this LinkedIn bio and pitch deck, provide a comprehensive analysis:
-
-        LinkedIn Bio: {linkedin_bio}
-        Pitch Deck Content: {pitch_deck}
-
-        Please provide:
-        1. **Company LinkedIn & Website** (if identifiable from bio)
-        2. **Buying Signals** with explanations
-        3. **Discovery Triggers** and smart questions
-        4. **Preferred Buying Style** (inferred)
-        5. **Top 5 Deck Highlights** for this person
-        6. **Potential Issues** with deck relevance
-        7. **Short Summary**
-        8. **3 Reflection Questions** for meeting prep
-        9. **Cold Outreach Icebreaker** (2-3 sentences)
-
-        Format as a well-structured response with clear sections.
+            self._client = AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=self.max_retries,
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP session"""
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._client_loop = None
+
+    async def _complete(self, prompt: str, models: List[str], max_tokens: int, timeout: Optional[float] = None,
+                        on_chunk: Optional[ChunkCallback] = None) -> Tuple[str, str]:
+        """
+        Try the routed models in order; returns the text and the model that
+        produced it. A 429, timeout or server error moves on to the next model
+        unless output has already been streamed. Timeouts and server errors
+        count against the circuit breaker; waiting for rate limit capacity doesn't.
         """
-        
+        probe = await llm_circuit.before_call()
         try:
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                model=self.model,
-                max_tokens=2000,  # Increased for comprehensive response
-                temperature=0.7
-            )
+            streamed = False
+
+            async def forward(delta: str):
+                nonlocal streamed
+                streamed = True
+                await on_chunk(delta)
+
+            retry_afters = []
+            last_error: Optional[Exception] = None
+            for i, model in enumerate(models):
+                is_last = i == len(models) - 1
+                try:
+                    # Capacity is waited for before the attempt's deadline starts: a wait for our own
+                    # rate limit is not the model being slow, so it never counts as a timeout
+                    await self._acquire(model, prompt, max_tokens,
+                                        max_wait=0 if not is_last else call_timeout(rate_limiter.max_wait))
+                    attempt_timeout = call_timeout(self.call_deadline)
+                    result = await asyncio.wait_for(
+                        self._hedged_attempt(model, prompt, max_tokens, timeout, forward if on_chunk else None,
+                                             has_fallback=not is_last),
+                        attempt_timeout
+                    )
+                    await llm_circuit.record(failed=False)
+                    return result, model
+                except DeadlineExceeded:
+                    raise
+                except RateLimitTimeout as e:
+                    # Local capacity ran out, not the model: no health or circuit penalty
+                    retry_afters.append(e.retry_after)
+                    last_error = e
+                except RateLimitError as e:
+                    retry_after = self._retry_after(e)
+                    await rate_limiter.block(model, retry_after)
+                    await model_router.record(model, "rate_limited")
+                    retry_afters.append(retry_after)
+                    last_error = e
+                except asyncio.TimeoutError:
+                    metrics_service.count_event("llm_deadline_exceeded", model=model, seconds=round(attempt_timeout, 2))
+                    await model_router.record(model, "timeouts")
+                    await llm_circuit.record(failed=True)
+                    last_error = TimeoutError(f"{model} did not finish within {attempt_timeout:.0f}s")
+                except (APITimeoutError, httpx.TimeoutException) as e:
+                    await model_router.record(model, "timeouts")
+                    await llm_circuit.record(failed=True)
+                    last_error = e
+                except (APIConnectionError, InternalServerError, httpx.TransportError) as e:
+                    await model_router.record(model, "errors")
+                    await llm_circuit.record(failed=True)
+                    last_error = e
+                except Exception as e:
+                    raise Exception(f"Groq API error: {str(e)}")
+                if streamed:
+                    break
+                if not is_last:
+                    print(f"Groq model {model} failed ({type(last_error).__name__}), falling back to {models[i + 1]}")
+
+            if len(retry_afters) == len(models):
+                # Every model is rate limited - retry once the first one frees up
+                raise GroqRateLimitError(f"Groq API error: {str(last_error)}", min(retry_afters))
+            raise Exception(f"Groq API error: {str(last_error)}")
+        finally:
+            # A probe that ended without a verdict (a 429, no local capacity, a bad request)
+            # frees its slot now instead of blocking everyone until it expires
+            await llm_circuit.release(probe)
+
+    async def _hedged_attempt(self, model: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                              on_chunk: Optional[ChunkCallback], has_fallback: bool) -> str:
+        """
+        An attempt that, when hedging is on and nothing is streamed, sends a
+        second request if the first runs past the usual latency for this call
+        """
+        if not self.hedge_enabled or on_chunk is not None:
+            return await self._attempt(model, prompt, max_tokens, timeout, on_chunk, has_fallback)
+
+        usual = self.latencies.percentile(f"{model}:{max_tokens}", self.hedge_percentile)
+        delay = max(self.hedge_min_delay, usual) if usual is not None else None
+        hedges = iter([False, True])
+
+        def call():
+            # The hedge needs capacity of its own, but never waits for it (nor lets the SDK retry)
+            is_hedge = next(hedges)
+            return self._attempt(model, prompt, max_tokens, timeout, None, has_fallback or is_hedge, acquire=is_hedge)
+
+        return await hedged(
+            call,
+            delay,
+            on_hedge=lambda: metrics_service.count_event("llm_hedge_started", model=model, delay=round(delay, 2))
+        )
+
+    async def _acquire(self, model: str, prompt: str, max_tokens: int, max_wait: float):
+        """Wait for cluster-wide RPM/TPM capacity (prompt estimate + completion budget)"""
+        with metrics_service.timed("llm_rate_limit_wait", model=model):
+            await rate_limiter.acquire(model, estimate_tokens(prompt) + max_tokens, max_wait=max_wait)
+
+    async def _attempt(self, model: str, prompt: str, max_tokens: int, timeout: Optional[float],
+                       on_chunk: Optional[ChunkCallback], has_fallback: bool, acquire: bool = False) -> str:
+        """
+        One completion on one model (rate limit capacity is normally acquired by
+        the caller). With a fallback model left, don't let the SDK retry; move on instead.
+        """
+        if acquire:
+            await self._acquire(model, prompt, max_tokens, max_wait=0)
+
+        client = self.client.with_options(max_retries=0) if has_fallback else self.client
+        started = time.perf_counter()
+        response = await client.chat.completions.create(
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model=model,
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            timeout=timeout if timeout is not None else self.timeout,
+            stream=on_chunk is not None
+        )
+        if on_chunk is None:
+            await self._observe(model, max_tokens, started, None, getattr(response, "usage", None))
             return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
 
-groq_service = GroqService()
\ No newline at end of file
+        # Streaming: hand each delta to the callback and return the full text
+        parts = []
+        first_token_at = None
+        usage = None
+        async for chunk in response:
+            # Groq reports token usage on the final chunk. groq 0.4 keeps x_groq as a plain dict (extra field)
+            x_groq = getattr(chunk, "x_groq", None)
+            chunk_usage = x_groq.get("usage") if isinstance(x_groq, dict) else getattr(x_groq, "usage", None)
+            if chunk_usage is not None:
+                usage = chunk_usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(delta)
+                await on_chunk(delta)
+        await self._observe(model, max_tokens, started, first_token_at, usage)
+        return "".join(parts)
+
+    async def _observe(self, model: str, max_tokens: int, started: float, first_token_at: Optional[float],
+                       usage: Any):
+        """Record latency, time to first token and token usage of one completion"""
+        finished = time.perf_counter()
+        ttft = (first_token_at or finished) - started
+        self.latencies.observe(f"{model}:{max_tokens}", finished - started)
+        metrics_service.observe_llm(
+            model,
+            finished - started,
+            ttft,
+            _usage_tokens(usage, "prompt_tokens"),
+            _usage_tokens(usage, "completion_tokens"),
+        )
+        await model_router.record(model, "success", finished - started, ttft)
+
+    def _retry_after(self, error: RateLimitError) -> float:
+        """Seconds to back off after a 429, from the retry-after header when present"""
+        try:
+            return float(error.response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return self.default_retry_after
+
+    async def _cached_complete(self, template: str, inputs: Dict[str, Any], prompt: str, max_tokens: int,
+                               timeout: Optional[float] = None, use_cache: bool = True,
+                               on_chunk: Optional[ChunkCallback] = None) -> str:
+        """Serve the completion from the LLM cache, generating and storing it on a miss"""
+        prompt_tokens = estimate_tokens(prompt)
+        models = await model_router.candidates(prompt_tokens)
+        if not use_cache:
+            result, _ = await self._complete(prompt, models, max_tokens=max_tokens, timeout=timeout, on_chunk=on_chunk)
+            return result
+
+        def cache_key(model: str) -> str:
+            return llm_cache.make_key(
+                model,
+                f"{template}:{PROMPT_VERSION}",
+                inputs,
+                {"max_tokens": max_tokens, "temperature": self.temperature},
+            )
+
+        # Looked up under the route's first choice; a fallback completion is stored under the
+        # model that wrote it, so it is never served in place of the first choice's output
+        cached = await llm_cache.get(cache_key(model_router.preferred(prompt_tokens)))
+        if cached is not None:
+            if on_chunk is not None:
+                await on_chunk(cached)
+            return cached
+
+        result, model = await self._complete(prompt, models, max_tokens=max_tokens, timeout=timeout, on_chunk=on_chunk)
+        await llm_cache.set(cache_key(model), result)
+        return result
+
+    @staticmethod
+    def _examples_block(examples: Optional[List[str]]) -> str:
+        """Insights of similar past calls, placed before the transcript (empty without examples)"""
+        if not examples:
+            return ""
+        listed = "\n\n".join(f"Example {i}:\n{example}" for i, example in enumerate(examples, 1))
+        return f"Insights written for similar past calls, for reference only (do not copy them):\n{listed}\n\n"
+
+    async def generate_transcript_insight(self, transcript: str, timeout: Optional[float] = None,
+                                          use_cache: bool = True, on_chunk: Optional[ChunkCallback] = None,
+                                          examples: Optional[List[str]] = None) -> str:
+        if estimate_tokens(transcript) > self.chunk_tokens:
+            return await self._map_reduce_transcript_insight(transcript, timeout, use_cache, on_chunk, examples)
+
+        prompt = TRANSCRIPT_INSIGHT_PROMPT.format(
+            format=INSIGHT_FORMAT, examples=self._examples_block(examples), transcript=transcript
+        )
+
+        inputs = {"transcript": transcript, **({"examples": examples} if examples else {})}
+        return await self._cached_complete(
+            "transcript_insight", inputs, prompt,
+            max_tokens=1000, timeout=timeout, use_cache=use_cache, on_chunk=on_chunk
+        )
+
+    async def _summarize_transcript_part(self, part: str, index: int, total: int,
+                                         timeout: Optional[float], use_cache: bool) -> str:
+        prompt = TRANSCRIPT_PART_PROMPT.format(index=index, total=total, part=part)
+
+        return await self._cached_complete(
+            "transcript_part_notes", {"part": part, "index": index, "total": total}, prompt,
+            max_tokens=500, timeout=timeout, use_cache=use_cache
+        )
+
+    async def _map_reduce_transcript_insight(self, transcript: str, timeout: Optional[float],
+                                             use_cache: bool, on_chunk: Optional[ChunkCallback],
+                                             examples: Optional[List[str]] = None) -> str:
+        """Summarize chunks concurrently, then reduce the notes into the usual insight format"""
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def summarize_all(parts: List[str]) -> List[str]:
+            async def summarize(index: int, part: str) -> str:
+                async with semaphore:
+                    return await self._summarize_transcript_part(part, index, len(parts), timeout, use_cache)
+            return await asyncio.gather(*(summarize(i + 1, part) for i, part in enumerate(parts)))
+
+        notes = await summarize_all(chunk_transcript(transcript, self.chunk_tokens))
+
+        # Very long calls can produce more notes than fit in one prompt - condense them again
+        combined = "\n\n".join(notes)
+        rounds = 0
+        while estimate_tokens(combined) > self.chunk_tokens and len(notes) > 1:
+            parts = chunk_transcript(combined, self.chunk_tokens)
+            # Each round yields one note per part: without fewer parts than notes it would never converge
+            if len(parts) >= len(notes):
+                raise Exception(
+                    f"Transcript notes don't condense: {len(notes)} notes need {len(parts)} parts of "
+                    f"{self.chunk_tokens} tokens (raise TRANSCRIPT_CHUNK_TOKENS)"
+                )
+            if rounds >= self.max_condense_rounds:
+                raise Exception(f"Transcript notes still too long after {rounds} condense rounds")
+            notes = await summarize_all(parts)
+            combined = "\n\n".join(notes)
+            rounds += 1
+
+        prompt = TRANSCRIPT_REDUCE_PROMPT.format(
+            format=INSIGHT_FORMAT, examples=self._examples_block(examples), notes=combined
+        )
+
+        inputs = {"notes": combined, **({"examples": examples} if examples else {})}
+        return await self._cached_complete(
+            "transcript_insight_reduce", inputs, prompt,
+            max_tokens=1000, timeout=timeout, use_cache=use_cache, on_chunk=on_chunk
+        )
+
+    async def generate_linkedin_icebreaker(self, linkedin_bio: str, pitch_deck: str, timeout: Optional[float] = None,
+                                           use_cache: bool = True, on_chunk: Optional[ChunkCallback] = None) -> str:
+        prompt = LINKEDIN_ICEBREAKER_PROMPT.format(linkedin_bio=linkedin_bio, pitch_deck=pitch_deck)
+
+        # Increased max_tokens for comprehensive response
+        return await self._cached_complete(
+            "linkedin_icebreaker", {"linkedin_bio": linkedin_bio, "pitch_deck": pitch_deck}, prompt,
+            max_tokens=2000, timeout=timeout, use_cache=use_cache, on_chunk=on_chunk
+        )
+
+groq_service = GroqService()
@@ -0,0 +1,111 @@
+from prometheus_client import Counter, Histogram, generate_latest, start_http_server, CONTENT_TYPE_LATEST
+from contextlib import contextmanager
+import contextvars
+import json
+import os
+import time
+import uuid
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Trace id of the submission being handled (API request or worker task)
+current_trace_id: contextvars.ContextVar = contextvars.ContextVar("trace_id", default=None)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class MetricsService:
+    """
+    Per-stage timings and token usage, exposed in Prometheus text format.
+    The API serves them on /metrics; workers start their own HTTP exporter.
+    """
+
+    def __init__(self):
+        self.log_stages = os.getenv("METRICS_LOG_STAGES", "true").lower() == "true"
+
+        self.stage_seconds = Histogram(
+            "mybizsherpa_stage_seconds", "Duration of each processing stage", ["stage"], buckets=STAGE_BUCKETS
+        )
+        self.stage_errors = Counter(
+            "mybizsherpa_stage_errors_total", "Stages that raised an exception", ["stage"]
+        )
+        self.llm_ttft_seconds = Histogram(
+            "mybizsherpa_llm_time_to_first_token_seconds", "Time until the first generated token", ["model"],
+            buckets=STAGE_BUCKETS
+        )
+        self.llm_seconds = Histogram(
+            "mybizsherpa_llm_completion_seconds", "Total time of one completion", ["model"], buckets=STAGE_BUCKETS
+        )
+        self.llm_tokens = Counter(
+            "mybizsherpa_llm_tokens_total", "Tokens reported by Groq usage", ["model", "kind"]
+        )
+        self.resilience_events = Counter(
+            "mybizsherpa_llm_resilience_events_total", "Hedged requests, deadlines hit, circuit rejections, parked tasks, checkpoint resumes",
+            ["event"]
+        )
+        self.transcript_tokens = Counter(
+            "mybizsherpa_transcript_tokens_total", "Transcript tokens before and after preprocessing", ["stage"]
+        )
+
+    @staticmethod
+    def new_trace_id() -> str:
+        return uuid.uuid4().hex
+
+    def log(self, event: str, **fields):
+        """One structured log line tagged with the current trace id"""
+        if self.log_stages:
+            print(json.dumps({"event": event, "trace_id": current_trace_id.get(), "ts": time.time(), **fields}))
+
+    def observe_stage(self, stage: str, seconds: float, **fields):
+        self.stage_seconds.labels(stage).observe(seconds)
+        self.log("stage", stage=stage, duration_ms=round(seconds * 1000, 2), **fields)
+
+    @contextmanager
+    def timed(self, stage: str, **fields):
+        """Time a block (sync or async code) as one stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.stage_errors.labels(stage).inc()
+            self.observe_stage(stage, time.perf_counter() - started, error=True, **fields)
+            raise
+        self.observe_stage(stage, time.perf_counter() - started, **fields)
+
+    def observe_llm(self, model: str, total_seconds: float, ttft_seconds: Optional[float],
+                    prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        self.llm_seconds.labels(model).observe(total_seconds)
+        if ttft_seconds is not None:
+            self.llm_ttft_seconds.labels(model).observe(ttft_seconds)
+        if prompt_tokens:
+            self.llm_tokens.labels(model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            self.llm_tokens.labels(model, "completion").inc(completion_tokens)
+        self.log(
+            "llm_completion", model=model, duration_ms=round(total_seconds * 1000, 2),
+            ttft_ms=round(ttft_seconds * 1000, 2) if ttft_seconds is not None else None,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+
+    def count_event(self, event: str, **fields):
+        self.resilience_events.labels(event).inc()
+        self.log(event, **fields)
+
+    def observe_preprocess(self, tokens_before: int, tokens_after: int, tokenizer: str):
+        self.transcript_tokens.labels("raw").inc(tokens_before)
+        self.transcript_tokens.labels("sent").inc(tokens_after)
+        self.log(
+            "transcript_preprocessed", tokens_before=tokens_before, tokens_after=tokens_after,
+            tokens_saved=tokens_before - tokens_after, tokenizer=tokenizer
+        )
+
+    def render(self) -> Tuple[bytes, str]:
+        return generate_latest(), CONTENT_TYPE_LATEST
+
+    def start_exporter(self, port: int):
+        """Serve /metrics from a background thread (used by workers)"""
+        start_http_server(port)
+        print(f"Metrics exporter listening on :{port}")
+
+metrics_service = MetricsService()
@@ -0,0 +1,201 @@
+from services.redis_service import redis_service
+from services.rate_limiter import rate_limiter
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Update one model's rolling stats after a call. Latency, TTFT and success
+# rate are exponentially weighted moving averages; recent latencies are kept
+# in a capped list for percentiles.
+# KEYS: stats hash, latency list
+# ARGV: outcome (success | rate_limited | timeouts | errors), latency, ttft, alpha, window, now
+RECORD_SCRIPT = """
+local alpha = tonumber(ARGV[4])
+local function ewma(field, value)
+    local current = tonumber(redis.call('HGET', KEYS[1], field))
+    if current == nil then
+        current = value
+    else
+        current = current + alpha * (value - current)
+    end
+    redis.call('HSET', KEYS[1], field, current)
+end
+
+if ARGV[1] == 'success' then
+    ewma('latency', tonumber(ARGV[2]))
+    ewma('ttft', tonumber(ARGV[3]))
+    ewma('success_rate', 1)
+    redis.call('HINCRBY', KEYS[1], 'successes', 1)
+    redis.call('LPUSH', KEYS[2], ARGV[2])
+    redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[5]) - 1)
+else
+    ewma('success_rate', 0)
+    redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+end
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[6])
+return 0
+"""
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 3)
+
+class ModelRouter:
+    """
+    Picks the Groq models to try for a completion, in order.
+
+    Short inputs go to the fast (small) models first; everything else goes to
+    the main models. Models that are slow (rolling latency above
+    GROQ_SLOW_SECONDS) or failing are moved behind every healthy model,
+    whatever their tier, and models blocked after a 429 go last; otherwise
+    the tier and configured order win. Stats are shared by all processes
+    through Redis and cached locally for a second; Redis failures fall back
+    to the configured order.
+    """
+
+    PREFIX = "modelrouter:"
+
+    def __init__(self):
+        # Main models in order of preference; the first one is the default model
+        self.models = self._list(os.getenv("GROQ_MODELS", "llama-3.3-70b-versatile"))
+        self.fast_models = self._list(os.getenv("GROQ_FAST_MODELS", "llama-3.1-8b-instant"))
+        # Prompts up to this many (estimated) tokens may use the fast models
+        self.fast_max_tokens = int(os.getenv("GROQ_FAST_MAX_TOKENS", "1500"))
+        # Long prompts may still fall back to the fast models when every main model fails
+        self.fast_as_fallback = os.getenv("GROQ_FAST_AS_FALLBACK", "true").lower() == "true"
+
+        self.slow_seconds = float(os.getenv("GROQ_SLOW_SECONDS", "20"))
+        self.min_success_rate = float(os.getenv("GROQ_MIN_SUCCESS_RATE", "0.5"))
+        # An unhealthy model gets its normal place back after this long without new samples
+        self.unhealthy_cooldown = float(os.getenv("GROQ_UNHEALTHY_COOLDOWN", "60"))
+        self.alpha = float(os.getenv("GROQ_STATS_ALPHA", "0.2"))
+        self.window = int(os.getenv("GROQ_STATS_WINDOW", "200"))
+        self.refresh_interval = float(os.getenv("GROQ_STATS_REFRESH", "1"))
+
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._refreshed_at = 0.0
+
+    @staticmethod
+    def _list(value: str) -> List[str]:
+        return [model.strip() for model in value.split(",") if model.strip()]
+
+    @property
+    def default_model(self) -> str:
+        return self.models[0]
+
+    @property
+    def all_models(self) -> List[str]:
+        return list(dict.fromkeys(self.models + self.fast_models))
+
+    def _keys(self, model: str) -> List[str]:
+        return [f"{self.PREFIX}{model}", f"{self.PREFIX}{model}:latencies"]
+
+    # ROUTING
+    def is_unhealthy(self, stats: Dict[str, float]) -> bool:
+        """Recently too slow or failing too often, judged by the rolling averages"""
+        if time.time() - stats.get("updated_at", 0) > self.unhealthy_cooldown:
+            return False
+        return (
+            stats.get("latency", 0) > self.slow_seconds
+            or stats.get("success_rate", 1) < self.min_success_rate
+        )
+
+    def order(self, models: List[str], stats: Dict[str, Dict[str, float]]) -> List[str]:
+        """Available healthy models, then unhealthy ones, then models blocked after a 429 (stable otherwise)"""
+        def rank(model: str):
+            model_stats = stats.get(model, {})
+            return model_stats.get("blocked_for", 0) > 0, self.is_unhealthy(model_stats)
+        return sorted(models, key=rank)
+
+    def uses_fast_path(self, prompt_tokens: int) -> bool:
+        return bool(self.fast_models) and prompt_tokens <= self.fast_max_tokens
+
+    def preferred(self, prompt_tokens: int) -> str:
+        """Configured first choice for a prompt of this size, whatever its current health"""
+        return self.fast_models[0] if self.uses_fast_path(prompt_tokens) else self.default_model
+
+    async def candidates(self, prompt_tokens: int) -> List[str]:
+        """Models to try for a prompt of this size, best first"""
+        stats = await self._current_stats()
+        # A model listed in both tiers keeps its place in the first one
+        if self.uses_fast_path(prompt_tokens):
+            tiers = list(dict.fromkeys(self.fast_models + self.models))
+        elif self.fast_as_fallback:
+            tiers = list(dict.fromkeys(self.models + self.fast_models))
+        else:
+            tiers = list(self.models)
+        if not tiers:
+            raise ValueError("No Groq models configured: set GROQ_MODELS (or GROQ_FAST_MODELS)")
+        # Health is ranked across tiers, so a failing fast model doesn't stay first for short prompts
+        return self.order(tiers, stats)
+
+    async def _current_stats(self) -> Dict[str, Dict[str, float]]:
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return self._stats
+        self._refreshed_at = time.monotonic()
+        try:
+            pipe = redis_service.client.pipeline(transaction=False)
+            for model in self.all_models:
+                pipe.hgetall(self._keys(model)[0])
+                pipe.pttl(rate_limiter.blocked_key(model))
+            results = await pipe.execute()
+        except Exception as e:
+            print(f"Model stats unavailable, using configured order: {str(e)}")
+            return self._stats
+        stats = {}
+        for model, raw, blocked_ms in zip(self.all_models, results[::2], results[1::2]):
+            stats[model] = {key.decode(): float(value) for key, value in raw.items()}
+            stats[model]["blocked_for"] = max(0, blocked_ms) / 1000
+        self._stats = stats
+        return stats
+
+    # STATS
+    async def record(self, model: str, outcome: str, latency: float = 0.0, ttft: float = 0.0):
+        """Add one call's outcome: success, rate_limited, timeouts or errors"""
+        try:
+            script = redis_service.client.register_script(RECORD_SCRIPT)
+            await script(keys=self._keys(model), args=[outcome, latency, ttft, self.alpha, self.window, time.time()])
+        except Exception as e:
+            print(f"Model stats update failed: {str(e)}")
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Routing configuration and per-model rolling stats for monitoring"""
+        self._refreshed_at = 0.0
+        stats = await self._current_stats()
+        client = redis_service.client
+        latencies = await asyncio.gather(*(client.lrange(self._keys(model)[1], 0, -1) for model in self.all_models))
+
+        models = {}
+        for model, samples in zip(self.all_models, latencies):
+            model_stats = stats.get(model, {})
+            values = [float(sample) for sample in samples]
+            models[model] = {
+                "tier": "fast" if model in self.fast_models else "main",
+                "successes": int(model_stats.get("successes", 0)),
+                "rate_limited": int(model_stats.get("rate_limited", 0)),
+                "timeouts": int(model_stats.get("timeouts", 0)),
+                "errors": int(model_stats.get("errors", 0)),
+                "success_rate": round(model_stats.get("success_rate", 1), 3),
+                "latency_ewma": round(model_stats["latency"], 3) if "latency" in model_stats else None,
+                "ttft_ewma": round(model_stats["ttft"], 3) if "ttft" in model_stats else None,
+                "latency_p50": _percentile(values, 50),
+                "latency_p95": _percentile(values, 95),
+                "blocked_for_seconds": model_stats.get("blocked_for", 0),
+                "healthy": not self.is_unhealthy(model_stats),
+            }
+        return {
+            "models": self.models,
+            "fast_models": self.fast_models,
+            "fast_max_tokens": self.fast_max_tokens,
+            "slow_seconds": self.slow_seconds,
+            "stats": models,
+        }
+
+model_router = ModelRouter()
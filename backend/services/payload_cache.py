@@ -0,0 +1,37 @@
+from services.cache_service import LRUCache
+import hashlib
+import json
+import os
+import zlib
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class PayloadCache:
+    """
+    Worker-side cache of task input text, zlib-compressed and keyed by
+    content hash, so retries and redeliveries of slim task messages don't
+    reload the same text from Supabase.
+    """
+
+    def __init__(self):
+        self.cache = LRUCache(
+            max_size=int(os.getenv("PAYLOAD_CACHE_MAX_ENTRIES", "256")),
+            ttl=float(os.getenv("PAYLOAD_CACHE_TTL", "3600")),
+        )
+
+    @staticmethod
+    def content_hash(*parts: str) -> str:
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str) -> Optional[List[str]]:
+        compressed = self.cache.get(content_hash)
+        if compressed is None:
+            return None
+        return json.loads(zlib.decompress(compressed))
+
+    def set(self, content_hash: str, parts: List[str]):
+        self.cache.set(content_hash, zlib.compress(json.dumps(parts, ensure_ascii=False).encode("utf-8")))
+
+payload_cache = PayloadCache()
@@ -0,0 +1,227 @@
+from celery_app import celery_app
+from collections import deque
+import os
+import redis
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 3)
+
+class QueueMonitor:
+    """
+    Queue statistics built from Celery events instead of broadcast inspect().
+
+    One thread consumes worker/task events and updates in-memory state;
+    another polls queue depths from the broker's Redis list lengths and
+    rebuilds the snapshot. Readers get the last snapshot without any I/O.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = float(os.getenv("QUEUE_MONITOR_INTERVAL", "2"))
+        self.window = float(os.getenv("QUEUE_MONITOR_WINDOW", "300"))
+        self.worker_expiry = float(os.getenv("QUEUE_MONITOR_WORKER_EXPIRY", "15"))
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self._receiver = None
+        self._sent_at: Dict[str, float] = {}
+        self._queue_waits: Dict[str, float] = {}
+        self._received: Dict[str, float] = {}
+        self._active: Dict[str, str] = {}  # task uuid -> worker hostname
+        self._retrying: Dict[str, float] = {}
+        self._finished = deque()  # (timestamp, runtime, queue_wait, succeeded)
+        self._queue_depths: Dict[str, int] = {}
+        self._snapshot: Dict[str, Any] = self._build_snapshot()
+
+    # LIFECYCLE
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._consume_events, name="queue-monitor-events", daemon=True),
+            threading.Thread(target=self._poll, name="queue-monitor-poll", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._receiver is not None:
+            self._receiver.should_stop = True
+        self._threads = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+    # EVENT CONSUMER
+    def _consume_events(self):
+        handlers = {
+            "task-sent": self._on_task_sent,
+            "task-received": self._on_task_received,
+            "task-started": self._on_task_started,
+            "task-succeeded": lambda event: self._on_task_finished(event, True),
+            "task-failed": lambda event: self._on_task_finished(event, False),
+            "task-retried": self._on_task_retried,
+            "task-revoked": lambda event: self._on_task_finished(event, False),
+            "worker-online": self._on_worker_event,
+            "worker-heartbeat": self._on_worker_event,
+            "worker-offline": self._on_worker_offline,
+            "*": lambda event: None,
+        }
+        while not self._stop.is_set():
+            try:
+                with self.app.connection() as connection:
+                    self._receiver = self.app.events.Receiver(connection, handlers=handlers)
+                    self._receiver.capture(limit=None, timeout=None, wakeup=True)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                print(f"Queue monitor event stream lost, reconnecting: {str(e)}")
+                time.sleep(1)
+
+    def _on_task_sent(self, event):
+        with self._lock:
+            self._sent_at[event["uuid"]] = event["timestamp"]
+
+    def _on_task_received(self, event):
+        with self._lock:
+            self._received[event["uuid"]] = event["timestamp"]
+
+    def _on_task_started(self, event):
+        with self._lock:
+            uuid = event["uuid"]
+            self._received.pop(uuid, None)
+            self._retrying.pop(uuid, None)
+            self._active[uuid] = event["hostname"]
+            sent_at = self._sent_at.pop(uuid, None)
+            if sent_at is not None:
+                self._queue_waits[uuid] = event["timestamp"] - sent_at
+
+    def _on_task_retried(self, event):
+        with self._lock:
+            self._active.pop(event["uuid"], None)
+            self._retrying[event["uuid"]] = event["timestamp"]
+
+    def _on_task_finished(self, event, succeeded: bool):
+        with self._lock:
+            uuid = event["uuid"]
+            self._active.pop(uuid, None)
+            self._received.pop(uuid, None)
+            self._retrying.pop(uuid, None)
+            self._sent_at.pop(uuid, None)
+            queue_wait = self._queue_waits.pop(uuid, None)
+            self._finished.append((event["timestamp"], event.get("runtime"), queue_wait, succeeded))
+
+    def _on_worker_event(self, event):
+        with self._lock:
+            self._workers[event["hostname"]] = {
+                "last_seen": event["timestamp"],
+                "active": event.get("active", 0),
+                "processed": event.get("processed", 0),
+            }
+
+    def _on_worker_offline(self, event):
+        with self._lock:
+            self._workers.pop(event["hostname"], None)
+
+    # QUEUE DEPTH POLLER
+    def _queue_keys(self) -> Dict[str, List[str]]:
+        """Redis list keys per queue, one per priority step"""
+        options = self.app.conf.broker_transport_options or {}
+        steps = options.get("priority_steps", [0])
+        sep = options.get("sep", "\x06\x16")
+        keys = {}
+        for queue in self.app.conf.task_queues or []:
+            keys[queue.name] = [queue.name if step == 0 else f"{queue.name}{sep}{step}" for step in steps]
+        return keys
+
+    def _poll(self):
+        client = redis.Redis.from_url(self.app.conf.broker_url)
+        queue_keys = self._queue_keys()
+        while not self._stop.is_set():
+            try:
+                pipe = client.pipeline(transaction=False)
+                for keys in queue_keys.values():
+                    for key in keys:
+                        pipe.llen(key)
+                lengths = iter(pipe.execute())
+                depths = {name: sum(next(lengths) for _ in keys) for name, keys in queue_keys.items()}
+                with self._lock:
+                    self._queue_depths = depths
+            except Exception as e:
+                print(f"Queue monitor depth poll failed: {str(e)}")
+            self._snapshot = self._build_snapshot()
+            self._stop.wait(self.interval)
+
+    # SNAPSHOT
+    def _build_snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            while self._finished and self._finished[0][0] < now - self.window:
+                self._finished.popleft()
+            # Forget tasks whose later events we never saw
+            for store in (self._sent_at, self._received, self._retrying):
+                stale = [uuid for uuid, ts in store.items() if ts < now - 3600]
+                for uuid in stale:
+                    del store[uuid]
+            if len(self._queue_waits) > 10000:
+                self._queue_waits.clear()
+
+            workers = {
+                hostname: {
+                    "active": info["active"],
+                    "processed": info["processed"],
+                    "last_seen_seconds_ago": round(now - info["last_seen"], 1),
+                }
+                for hostname, info in self._workers.items()
+                if now - info["last_seen"] < self.worker_expiry
+            }
+            in_flight: Dict[str, int] = {}
+            for hostname in self._active.values():
+                in_flight[hostname] = in_flight.get(hostname, 0) + 1
+            for hostname, info in workers.items():
+                info["in_flight"] = in_flight.get(hostname, 0)
+
+            finished = list(self._finished)
+            queue_depths = dict(self._queue_depths)
+            active = len(self._active)
+            reserved = len(self._received)
+            retrying = len(self._retrying)
+
+        runtimes = [runtime for _, runtime, _, _ in finished if runtime is not None]
+        waits = [wait for _, _, wait, _ in finished if wait is not None]
+        succeeded = sum(1 for _, _, _, ok in finished if ok)
+        minutes = self.window / 60
+
+        return {
+            "active_tasks": active,
+            "scheduled_tasks": retrying,
+            "reserved_tasks": reserved,
+            "queued_tasks": sum(queue_depths.values()),
+            "queues": queue_depths,
+            "workers_online": len(workers),
+            "worker_names": list(workers),
+            "workers": workers,
+            "window_seconds": self.window,
+            "throughput_per_minute": round(succeeded / minutes, 2),
+            "failures_per_minute": round((len(finished) - succeeded) / minutes, 2),
+            "runtime_seconds": {"p50": _percentile(runtimes, 50), "p95": _percentile(runtimes, 95)},
+            "queue_wait_seconds": {"p50": _percentile(waits, 50), "p95": _percentile(waits, 95)},
+            "updated_at": now,
+        }
+
+queue_monitor = QueueMonitor(celery_app)
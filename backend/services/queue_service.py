@@ -1,35 +1,155 @@
-from celery_app import celery_app
+from celery_app import celery_app, PRIORITY_INTERACTIVE, PRIORITY_BULK
 from celery_worker import process_transcript_task, process_linkedin_task
-from celery.result import AsyncResult
-from typing import Dict, Any
+from celery import group
+from celery.utils import uuid
+from celery.result import AsyncResult, GroupResult
+from services.payload_cache import PayloadCache
+from services.checkpoint_service import checkpoint_service
+from services.queue_monitor import queue_monitor
+from services.metrics_service import metrics_service, current_trace_id
+from typing import Dict, Any, List, Optional, Tuple
+import os
 import socket
+import time
 
 class QueueService:
     def __init__(self):
         self.celery_app = celery_app
         # Get the actual worker name dynamically
         self.worker_name = f"celery@{socket.gethostname()}"
+        # Slim messages carry only the record id and a content hash; the worker
+        # loads the text from Supabase. Payloads above the threshold are always slim.
+        self.slim_messages = os.getenv("SLIM_TASK_MESSAGES", "false").lower() == "true"
+        self.inline_max_bytes = int(os.getenv("INLINE_PAYLOAD_MAX_BYTES", "8192"))
+
+    def _slim(self, *parts: str) -> Tuple[bool, str]:
+        """Whether to leave the text out of the message, and its content hash"""
+        size = sum(len(part.encode("utf-8")) for part in parts)
+        return self.slim_messages or size > self.inline_max_bytes, PayloadCache.content_hash(*parts)
+
+    def _task_kwargs(self, kind: str, record_id: str, content_hash: str) -> dict:
+        """
+        Keyword arguments every task gets: content hash, trace id, enqueue time (for queue wait)
+        and the idempotency key that retries and redeliveries resume under
+        """
+        return {
+            "content_hash": content_hash,
+            "trace_id": current_trace_id.get(),
+            "enqueued_at": time.time(),
+            "idempotency_key": checkpoint_service.make_key(kind, record_id, content_hash),
+        }
+
+    def _transcript_args(self, transcript_id: str, transcript_text: str, company_name: str,
+                         preprocess: Optional[bool] = None) -> Tuple[tuple, dict]:
+        slim, content_hash = self._slim(transcript_text)
+        kwargs = {**self._task_kwargs("transcript", transcript_id, content_hash), "preprocess": preprocess}
+        return (transcript_id, None if slim else transcript_text, company_name), kwargs
+
+    def _linkedin_args(self, insight_id: str, linkedin_bio: str, pitch_deck: str) -> Tuple[tuple, dict]:
+        slim, content_hash = self._slim(linkedin_bio, pitch_deck)
+        kwargs = self._task_kwargs("linkedin", insight_id, content_hash)
+        if slim:
+            return (insight_id, None, None), kwargs
+        return (insight_id, linkedin_bio, pitch_deck), kwargs
     
-    def enqueue_transcript(self, transcript_id: str, transcript_text: str, company_name: str) -> str:
+    @staticmethod
+    def new_task_id() -> str:
+        """
+        Id for a task that is about to be enqueued, so its "queued" event and
+        dedup entry can be written before a worker can pick the task up
+        """
+        return uuid()
+
+    def enqueue_transcript(self, transcript_id: str, transcript_text: str, company_name: str, stream: bool = False,
+                           preprocess: Optional[bool] = None, task_id: Optional[str] = None) -> str:
         """
         Add transcript processing task to queue
         Returns: task_id
         """
         print(f"Enqueueing transcript task for ID: {transcript_id}")
-        task = process_transcript_task.delay(transcript_id, transcript_text, company_name)
+        args, kwargs = self._transcript_args(transcript_id, transcript_text, company_name, preprocess)
+        with metrics_service.timed("enqueue", kind="transcript"):
+            task = process_transcript_task.apply_async(args, {**kwargs, "stream": stream}, task_id=task_id,
+                                                       priority=PRIORITY_INTERACTIVE)
         print(f"Task enqueued with ID: {task.id}")
         return task.id
     
-    def enqueue_linkedin(self, insight_id: str, linkedin_bio: str, pitch_deck: str) -> str:
+    def enqueue_linkedin(self, insight_id: str, linkedin_bio: str, pitch_deck: str, stream: bool = False,
+                         task_id: Optional[str] = None) -> str:
         """
         Add LinkedIn processing task to queue
         Returns: task_id
         """
         print(f"Enqueueing LinkedIn task for ID: {insight_id}")
-        task = process_linkedin_task.delay(insight_id, linkedin_bio, pitch_deck)
+        args, kwargs = self._linkedin_args(insight_id, linkedin_bio, pitch_deck)
+        with metrics_service.timed("enqueue", kind="linkedin"):
+            task = process_linkedin_task.apply_async(args, {**kwargs, "stream": stream}, task_id=task_id,
+                                                     priority=PRIORITY_INTERACTIVE)
         print(f"Task enqueued with ID: {task.id}")
         return task.id
     
+    def _enqueue_group(self, signatures, task_ids: List[str]) -> Tuple[str, List[str]]:
+        """Send signatures as one low-priority Celery group and persist it so progress can be looked up"""
+        with metrics_service.timed("enqueue_batch"):
+            result = group(
+                signature.set(priority=PRIORITY_BULK, task_id=task_id)
+                for signature, task_id in zip(signatures, task_ids)
+            ).apply_async()
+            result.save()
+        return result.id, [child.id for child in result.children]
+
+    def enqueue_transcript_batch(self, items: List[Tuple[str, str, str, Optional[bool]]],
+                                 task_ids: List[str]) -> Tuple[str, List[str]]:
+        """
+        Add many transcript tasks as one group
+        items: (transcript_id, transcript_text, company_name, preprocess)
+        task_ids: one new_task_id() per item
+        Returns: (batch_id, task_ids in item order)
+        """
+        print(f"Enqueueing transcript batch of {len(items)} tasks")
+        return self._enqueue_group(
+            (process_transcript_task.signature(*self._transcript_args(*item)) for item in items),
+            task_ids
+        )
+
+    def enqueue_linkedin_batch(self, items: List[Tuple[str, str, str]], task_ids: List[str]) -> Tuple[str, List[str]]:
+        """
+        Add many LinkedIn tasks as one group
+        items: (insight_id, linkedin_bio, pitch_deck)
+        task_ids: one new_task_id() per item
+        Returns: (batch_id, task_ids in item order)
+        """
+        print(f"Enqueueing LinkedIn batch of {len(items)} tasks")
+        return self._enqueue_group(
+            (process_linkedin_task.signature(*self._linkedin_args(insight_id, linkedin_bio, pitch_deck))
+             for insight_id, linkedin_bio, pitch_deck in items),
+            task_ids
+        )
+
+    def get_batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Aggregate progress of a batch submission
+        Returns None if the batch is unknown (or expired from the result backend)
+        """
+        result = GroupResult.restore(batch_id, app=self.celery_app)
+        if result is None:
+            return None
+
+        tasks = [{"task_id": child.id, "status": child.state} for child in result.results]
+        counts = {"SUCCESS": 0, "FAILURE": 0, "PENDING": 0}
+        for task in tasks:
+            counts[task["status"]] = counts.get(task["status"], 0) + 1
+
+        return {
+            "batch_id": batch_id,
+            "total": len(tasks),
+            "completed": counts["SUCCESS"],
+            "failed": counts["FAILURE"],
+            "pending": counts["PENDING"],
+            "in_progress": len(tasks) - counts["SUCCESS"] - counts["FAILURE"] - counts["PENDING"],
+            "tasks": tasks
+        }
+
     def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """
         Get status of a specific task
@@ -53,57 +173,9 @@ class QueueService:
     
     def get_queue_stats(self) -> Dict[str, Any]:
         """
-        Get overall queue statistics
+        Get overall queue statistics from the event-driven monitor snapshot
         """
-        try:
-            inspect = self.celery_app.control.inspect()
-            
-            active_tasks = inspect.active()
-            scheduled_tasks = inspect.scheduled()
-            reserved_tasks = inspect.reserved()
-            
-            # Debug: Print what workers are available
-            print(f"Available workers: {list(active_tasks.keys()) if active_tasks else 'None'}")
-            print(f"Looking for worker: {self.worker_name}")
-            
-            # Calculate stats using actual worker names
-            total_active = 0
-            total_scheduled = 0
-            total_reserved = 0
-            workers_online = 0
-            
-            if active_tasks:
-                workers_online = len(active_tasks)
-                for worker_tasks in active_tasks.values():
-                    total_active += len(worker_tasks)
-            
-            if scheduled_tasks:
-                for worker_tasks in scheduled_tasks.values():
-                    total_scheduled += len(worker_tasks)
-            
-            if reserved_tasks:
-                for worker_tasks in reserved_tasks.values():
-                    total_reserved += len(worker_tasks)
-            
-            stats = {
-                "active_tasks": total_active,
-                "scheduled_tasks": total_scheduled,
-                "reserved_tasks": total_reserved,
-                "workers_online": workers_online,
-                "worker_names": list(active_tasks.keys()) if active_tasks else []
-            }
-            
-            return stats
-            
-        except Exception as e:
-            print(f"Error getting queue stats: {str(e)}")
-            return {
-                "error": str(e),
-                "active_tasks": 0,
-                "scheduled_tasks": 0,
-                "reserved_tasks": 0,
-                "workers_online": 0,
-                "worker_names": []
-            }
+        queue_monitor.start()
+        return queue_monitor.snapshot()
 
 queue_service = QueueService()
\ No newline at end of file
@@ -0,0 +1,153 @@
+from services.redis_service import redis_service
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Two token buckets per model (requests/min and tokens/min) refilled
+# continuously. Takes from both atomically or from neither, and returns how
+# long the caller should wait (ms) when there isn't enough capacity.
+# KEYS: request bucket, token bucket, blocked-until key
+# ARGV: rpm, tpm, tokens requested
+ACQUIRE_SCRIPT = """
+pcall(redis.replicate_commands)
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local blocked_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if blocked_until > now then
+    return blocked_until - now
+end
+
+local function level(key, capacity)
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local current = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, current + (now - ts) * capacity / 60000)
+end
+
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local tokens = math.min(tonumber(ARGV[3]), tpm)
+
+local requests_left = level(KEYS[1], rpm)
+local tokens_left = level(KEYS[2], tpm)
+
+local wait = 0
+if requests_left < 1 then
+    wait = math.max(wait, (1 - requests_left) * 60000 / rpm)
+end
+if tokens_left < tokens then
+    wait = math.max(wait, (tokens - tokens_left) * 60000 / tpm)
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+
+redis.call('HSET', KEYS[1], 'level', requests_left - 1, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', tokens_left - tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return 0
+"""
+
+class RateLimitTimeout(Exception):
+    """Capacity did not free up within the allowed wait"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """
+    Cluster-wide Groq rate limiter shared by all workers through Redis.
+    Callers wait just long enough for request and token capacity; a 429
+    from Groq blocks the model for everyone until its retry-after passes.
+    Redis failures let the call through rather than stalling the worker.
+    """
+
+    PREFIX = "ratelimit:"
+
+    def __init__(self):
+        self.enabled = os.getenv("GROQ_RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.rpm = int(os.getenv("GROQ_RPM_LIMIT", "30"))
+        self.tpm = int(os.getenv("GROQ_TPM_LIMIT", "12000"))
+        self.max_wait = float(os.getenv("GROQ_RATE_LIMIT_MAX_WAIT", "120"))
+
+    def _keys(self, model: str):
+        return [
+            f"{self.PREFIX}{model}:requests",
+            f"{self.PREFIX}{model}:tokens",
+            f"{self.PREFIX}{model}:blocked_until",
+        ]
+
+    def blocked_key(self, model: str) -> str:
+        """Key that exists (with a TTL) while the model is blocked after a 429"""
+        return self._keys(model)[2]
+
+    async def acquire(self, model: str, tokens: int, max_wait: Optional[float] = None):
+        """Wait until one request and `tokens` tokens are available for this model"""
+        if not self.enabled:
+            return
+
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                script = redis_service.client.register_script(ACQUIRE_SCRIPT)
+                wait_ms = await script(keys=self._keys(model), args=[self.rpm, self.tpm, tokens])
+            except Exception as e:
+                print(f"Rate limiter unavailable, proceeding: {str(e)}")
+                return
+
+            if not wait_ms:
+                return
+
+            wait = wait_ms / 1000
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitTimeout(f"Rate limit capacity for {model} not available within {max_wait}s", wait)
+            await asyncio.sleep(wait)
+
+    async def block(self, model: str, retry_after: float):
+        """Stop all workers from calling this model until retry_after seconds have passed"""
+        if not self.enabled:
+            return
+        try:
+            r = redis_service.client
+            now_s, now_us = await r.time()
+            until = now_s * 1000 + now_us // 1000 + int(retry_after * 1000)
+            await r.set(self._keys(model)[2], until, px=int(retry_after * 1000))
+        except Exception as e:
+            print(f"Rate limiter block failed: {str(e)}")
+
+    async def get_levels(self, model: str) -> Dict[str, Any]:
+        """Current bucket levels for monitoring"""
+        requests_key, tokens_key, blocked_key = self._keys(model)
+        r = redis_service.client
+        now_s, now_us = await r.time()
+        now = now_s * 1000 + now_us // 1000
+
+        def level(state, capacity):
+            current, ts = state
+            if current is None:
+                return capacity
+            return min(capacity, float(current) + (now - float(ts)) * capacity / 60000)
+
+        requests_state = await r.hmget(requests_key, "level", "ts")
+        tokens_state = await r.hmget(tokens_key, "level", "ts")
+        blocked_until = int(await r.get(blocked_key) or 0)
+        return {
+            "model": model,
+            "enabled": self.enabled,
+            "requests_per_minute": self.rpm,
+            "tokens_per_minute": self.tpm,
+            "requests_available": round(level(requests_state, self.rpm), 2),
+            "tokens_available": round(level(tokens_state, self.tpm), 2),
+            "blocked_for_seconds": max(0, (blocked_until - now) / 1000),
+        }
+
+rate_limiter = RateLimiter()
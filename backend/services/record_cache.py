@@ -0,0 +1,128 @@
+from services.cache_service import LRUCache
+from services.redis_service import redis_service
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class RecordCache:
+    """
+    Read-through cache for single transcript / LinkedIn records.
+
+    Completed records never change, so they are kept long, both in Redis and
+    in an in-process LRU. Anything else is kept in Redis only, briefly, and
+    is dropped whenever the record is written (status, result, completion),
+    so a stale pending row can outlive a write by at most the short TTL.
+    Redis failures degrade to reading from Supabase.
+    """
+
+    PREFIX = "record:"
+
+    def __init__(self):
+        self.enabled = os.getenv("RECORD_CACHE_ENABLED", "true").lower() == "true"
+        self.completed_ttl = int(os.getenv("RECORD_CACHE_COMPLETED_TTL", "86400"))
+        self.pending_ttl = int(os.getenv("RECORD_CACHE_PENDING_TTL", "5"))
+        self.local = LRUCache(
+            max_size=int(os.getenv("RECORD_CACHE_MAX_ENTRIES", "1000")),
+            ttl=self.completed_ttl,
+        )
+
+    def _key(self, table: str, record_id: str) -> str:
+        return f"{self.PREFIX}{table}:{record_id}"
+
+    async def get_or_fetch(self, table: str, record_id: str,
+                           fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return await fetch()
+
+        key = self._key(table, record_id)
+        row = self.local.get(key)
+        if row is not None:
+            return row
+
+        try:
+            raw = await redis_service.client.get(key)
+            if raw is not None:
+                row = json.loads(raw)
+                if row.get("status") == "completed":
+                    self.local.set(key, row)
+                return row
+        except Exception as e:
+            print(f"Record cache read failed: {str(e)}")
+
+        row = await fetch()
+        if row is not None:
+            await self._store(key, row)
+        return row
+
+    async def _store(self, key: str, row: Dict[str, Any]):
+        completed = row.get("status") == "completed"
+        if completed:
+            self.local.set(key, row)
+        try:
+            await redis_service.client.set(
+                key, json.dumps(row, default=str), ex=self.completed_ttl if completed else self.pending_ttl
+            )
+        except Exception as e:
+            print(f"Record cache write failed: {str(e)}")
+
+    async def invalidate(self, table: str, record_id: str):
+        """Drop a record after it was written"""
+        if not self.enabled:
+            return
+        key = self._key(table, record_id)
+        self.local.delete(key)
+        try:
+            await redis_service.client.delete(key)
+        except Exception as e:
+            print(f"Record cache invalidation failed: {str(e)}")
+
+    # HTTP VALIDATORS
+    @staticmethod
+    def validators(row: Dict[str, Any]) -> Dict[str, str]:
+        """ETag, Last-Modified and Cache-Control headers for a record"""
+        payload = json.dumps(row, sort_keys=True, default=str)
+        headers = {
+            "ETag": f'"{hashlib.sha1(payload.encode("utf-8")).hexdigest()}"',
+            # Completed records are final; anything else must be revalidated
+            "Cache-Control": "private, max-age=86400" if row.get("status") == "completed" else "no-cache",
+        }
+        modified = _parse_timestamp(row.get("updated_at") or row.get("created_at"))
+        if modified is not None:
+            headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+        return headers
+
+    @staticmethod
+    def not_modified(request_headers: Mapping[str, str], headers: Dict[str, str]) -> bool:
+        """Whether the client's cached copy (If-None-Match / If-Modified-Since) is current"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or headers["ETag"] in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since and "Last-Modified" in headers:
+            try:
+                return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return parsed.astimezone(timezone.utc).replace(microsecond=0)
+
+record_cache = RecordCache()
@@ -0,0 +1,73 @@
+import redis.asyncio as aioredis
+import asyncio
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class RedisService:
+    """
+    Shared async Redis clients (same Redis instance as the Celery broker).
+
+    `client` serves the request path (dedup, caching, rate limiting, events).
+    `reader_client` has its own pool for long blocking reads (token stream
+    XREADs, the task event subscription), so many connected listeners can't
+    take every connection away from the request path.
+    """
+
+    def __init__(self):
+        self.url = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+        self.max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+        self.reader_max_connections = int(os.getenv("REDIS_READER_MAX_CONNECTIONS", "200"))
+        self.pool_timeout = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+
+        self._client: Optional[aioredis.Redis] = None
+        self._reader: Optional[aioredis.Redis] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build(self, max_connections: int) -> aioredis.Redis:
+        # Blocking pool: callers wait for a free connection instead of erroring right away
+        pool = aioredis.BlockingConnectionPool.from_url(
+            self.url,
+            max_connections=max_connections,
+            timeout=self.pool_timeout,
+            socket_keepalive=True,
+        )
+        return aioredis.Redis(connection_pool=pool)
+
+    def _check_loop(self):
+        """Pooled connections belong to the event loop that opened them, so clients are rebuilt on a new loop"""
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not loop:
+            self._client = None
+            self._reader = None
+            self._client_loop = loop
+
+    @property
+    def client(self) -> aioredis.Redis:
+        """Async Redis client for short commands, with a pooled connection set"""
+        self._check_loop()
+        if self._client is None:
+            self._client = self._build(self.max_connections)
+        return self._client
+
+    @property
+    def reader_client(self) -> aioredis.Redis:
+        """Async Redis client for blocking reads and subscriptions, with its own pool"""
+        self._check_loop()
+        if self._reader is None:
+            self._reader = self._build(self.reader_max_connections)
+        return self._reader
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        for client in (self._client, self._reader):
+            if client is not None:
+                await client.close()
+                await client.connection_pool.disconnect()
+        self._client = None
+        self._reader = None
+        self._client_loop = None
+
+redis_service = RedisService()
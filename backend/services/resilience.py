@@ -0,0 +1,283 @@
+from services.redis_service import redis_service
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# Monotonic time by which the current task's LLM work must be done (None = no task deadline)
+current_deadline: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The task's time budget ran out before the call could start or finish"""
+
+class CircuitOpenError(Exception):
+    """The upstream is considered unhealthy; try again after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# DEADLINES
+@contextmanager
+def deadline(seconds: float):
+    """Give the LLM calls made inside the block (and tasks they spawn) a shared time budget"""
+    token = current_deadline.set(time.monotonic() + seconds if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+def call_timeout(per_call: float) -> float:
+    """Timeout for the next call: the per-call deadline, capped by what is left of the task's budget"""
+    deadline_at = current_deadline.get()
+    if deadline_at is None:
+        return per_call
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Task deadline exceeded")
+    return min(per_call, remaining)
+
+# HEDGING
+class LatencyTracker:
+    """Recent latencies per key (e.g. model and completion budget), kept in this process"""
+
+    def __init__(self, window: int, min_samples: int):
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, key: str, seconds: float):
+        self._samples[key].append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """None until there are enough samples to trust"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float],
+                 on_hedge: Optional[Callable[[], None]] = None) -> T:
+    """
+    Run call(); if it hasn't finished after `delay` seconds, start a second
+    identical call and return whichever succeeds first (the other is cancelled).
+    """
+    if delay is None:
+        return await call()
+
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            tasks.append(asyncio.ensure_future(call()))
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Both failed: the original call's error is the meaningful one
+        raise tasks[0].exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+# CIRCUIT BREAKER
+# Returns ms until the caller may try (0 = go ahead, -1 = go ahead as the
+# probe). While open, everyone waits; once the open period ends, one caller
+# at a time gets to probe and the others are told to come back shortly,
+# since the probe usually settles the state well before its slot would expire.
+# KEYS: open key, tripped key, probe key
+# ARGV: probe ttl (ms), half-open retry (ms), probe token
+ALLOW_SCRIPT = """
+local open_ms = redis.call('PTTL', KEYS[1])
+if open_ms > 0 then
+    return open_ms
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    if redis.call('SET', KEYS[3], ARGV[3], 'NX', 'PX', ARGV[1]) then
+        return -1
+    end
+    return math.max(math.min(redis.call('PTTL', KEYS[3]), tonumber(ARGV[2])), 1)
+end
+return 0
+"""
+
+# Frees the probe slot if this caller still holds it.
+# KEYS: probe key
+# ARGV: probe token
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Counts calls and failures in a fixed window and opens the circuit when the
+# failure ratio crosses the threshold. A call finishing while half-open
+# closes the circuit on success and re-opens it on failure.
+# KEYS: open key, tripped key, probe key, calls key, failures key
+# ARGV: failed (0/1), window (ms), min calls, failure ratio, open duration (ms)
+RECORD_SCRIPT = """
+local failed = tonumber(ARGV[1]) == 1
+local open_ms = tonumber(ARGV[5])
+
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    if redis.call('PTTL', KEYS[1]) > 0 then
+        return 0
+    end
+    if failed then
+        redis.call('SET', KEYS[1], '1', 'PX', open_ms)
+        redis.call('DEL', KEYS[3])
+        return open_ms
+    end
+    redis.call('DEL', KEYS[2], KEYS[3], KEYS[4], KEYS[5])
+    return -1
+end
+
+local calls = redis.call('INCR', KEYS[4])
+if calls == 1 then
+    redis.call('PEXPIRE', KEYS[4], ARGV[2])
+end
+if not failed then
+    return 0
+end
+local failures = redis.call('INCR', KEYS[5])
+if failures == 1 then
+    redis.call('PEXPIRE', KEYS[5], ARGV[2])
+end
+if calls >= tonumber(ARGV[3]) and failures / calls >= tonumber(ARGV[4]) then
+    redis.call('SET', KEYS[1], '1', 'PX', open_ms)
+    redis.call('SET', KEYS[2], '1', 'PX', 86400000)
+    redis.call('DEL', KEYS[4], KEYS[5])
+    return open_ms
+end
+return 0
+"""
+
+class CircuitBreaker:
+    """
+    Cluster-wide circuit breaker kept in Redis, so every worker stops calling
+    an unhealthy upstream at the same time. Closed: calls go through and
+    failures are counted. Open: calls fail fast with CircuitOpenError. After
+    the open period, one probe call at a time decides whether to close it
+    again. Redis failures keep the circuit closed.
+    """
+
+    PREFIX = "circuit:"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.enabled = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+        self.window = float(os.getenv("CIRCUIT_WINDOW", "30"))
+        self.min_calls = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+        self.failure_ratio = float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5"))
+        self.open_seconds = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+        # A probe that never reports back frees the slot after this long: one call's deadline plus a margin
+        self.probe_timeout = float(os.getenv(
+            "CIRCUIT_PROBE_TIMEOUT", str(float(os.getenv("GROQ_CALL_DEADLINE", "60")) + 5)
+        ))
+        # While a probe is running, other callers retry after at most this long
+        self.half_open_retry = float(os.getenv("CIRCUIT_HALF_OPEN_RETRY", "5"))
+
+    def _keys(self):
+        return [f"{self.PREFIX}{self.name}:{part}" for part in ("open", "tripped", "probe", "calls", "failures")]
+
+    async def check(self):
+        """Raise CircuitOpenError while the circuit is open (without taking the half-open probe slot)"""
+        if not self.enabled:
+            return
+        try:
+            open_ms = await redis_service.client.pttl(self._keys()[0])
+        except Exception as e:
+            print(f"Circuit breaker unavailable, proceeding: {str(e)}")
+            return
+        if open_ms > 0:
+            raise CircuitOpenError(f"Circuit {self.name} is open", open_ms / 1000)
+
+    async def before_call(self) -> Optional[str]:
+        """
+        Raise CircuitOpenError instead of calling an upstream that is known to be
+        down. Returns a probe token when this call is the half-open probe; pass it
+        to release() once the call is over.
+        """
+        if not self.enabled:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            script = redis_service.client.register_script(ALLOW_SCRIPT)
+            wait_ms = await script(keys=self._keys()[:3],
+                                   args=[int(self.probe_timeout * 1000), int(self.half_open_retry * 1000), token])
+        except Exception as e:
+            print(f"Circuit breaker unavailable, proceeding: {str(e)}")
+            return None
+        if wait_ms > 0:
+            raise CircuitOpenError(f"Circuit {self.name} is open", wait_ms / 1000)
+        return token if wait_ms < 0 else None
+
+    async def release(self, token: Optional[str]):
+        """Free the probe slot of a call that ended without a verdict (a recorded outcome frees it already)"""
+        if not self.enabled or token is None:
+            return
+        try:
+            script = redis_service.client.register_script(RELEASE_SCRIPT)
+            await script(keys=[self._keys()[2]], args=[token])
+        except Exception as e:
+            print(f"Circuit breaker probe release failed: {str(e)}")
+
+    async def record(self, failed: bool):
+        """Count one call's outcome (logs when the circuit opens or closes)"""
+        if not self.enabled:
+            return
+        try:
+            script = redis_service.client.register_script(RECORD_SCRIPT)
+            result = await script(
+                keys=self._keys(),
+                args=[int(failed), int(self.window * 1000), self.min_calls, self.failure_ratio,
+                      int(self.open_seconds * 1000)],
+            )
+        except Exception as e:
+            print(f"Circuit breaker update failed: {str(e)}")
+            return
+        if result > 0:
+            print(f"Circuit {self.name} opened for {result / 1000:.0f}s")
+        elif result < 0:
+            print(f"Circuit {self.name} closed")
+
+    async def get_state(self) -> Dict[str, object]:
+        """Current state for monitoring"""
+        open_key, tripped_key, _, calls_key, failures_key = self._keys()
+        pipe = redis_service.client.pipeline(transaction=False)
+        pipe.pttl(open_key)
+        pipe.exists(tripped_key)
+        pipe.get(calls_key)
+        pipe.get(failures_key)
+        open_ms, tripped, calls, failures = await pipe.execute()
+        if open_ms > 0:
+            state = "open"
+        elif tripped:
+            state = "half_open"
+        else:
+            state = "closed"
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "state": state,
+            "open_for_seconds": max(0, open_ms) / 1000,
+            "window_calls": int(calls or 0),
+            "window_failures": int(failures or 0),
+        }
+
+llm_circuit = CircuitBreaker("groq")
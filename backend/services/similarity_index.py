@@ -0,0 +1,223 @@
+from services.redis_service import redis_service
+from collections import Counter
+import asyncio
+import math
+import numpy as np
+import os
+import re
+import time
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9']+")
+STOP_WORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have he her his i if in into is it "
+    "its just me my no not of on or our so that the their them then there they this to us was we were what when "
+    "which who will with would yeah yes you your okay ok um uh like know think right well".split()
+)
+
+# Swap a rebuilt index in for the live one. Vectors added to the live index
+# while the rebuild ran (log entries after the offset it started at) are
+# copied over first, so they aren't lost.
+# KEYS: live vectors, live log, rebuilt vectors, rebuilt log, generation
+# ARGV: live log length when the rebuild started
+SWAP_SCRIPT = """
+for _, record_id in ipairs(redis.call('LRANGE', KEYS[2], ARGV[1], -1)) do
+    local vector = redis.call('HGET', KEYS[1], record_id)
+    if vector then
+        redis.call('HSET', KEYS[3], record_id, vector)
+        redis.call('RPUSH', KEYS[4], record_id)
+    end
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('RENAME', KEYS[3], KEYS[1])
+    redis.call('RENAME', KEYS[4], KEYS[2])
+    redis.call('PERSIST', KEYS[1])
+    redis.call('PERSIST', KEYS[2])
+else
+    redis.call('DEL', KEYS[1], KEYS[2])
+end
+return redis.call('INCR', KEYS[5])
+"""
+
+class SimilarityIndex:
+    """
+    "Similar past meetings" over completed transcripts.
+
+    Each transcript becomes a signed feature-hashing vector of its words and
+    word pairs (sublinear term frequency, L2-normalized), computed locally.
+    Vectors are stored in Redis as float16 bytes in one hash, and every add
+    is appended to a log list. Each process keeps the vectors in one float32
+    NumPy matrix and catches up from the log at most once per sync interval,
+    so a query is a single matrix product plus a partial sort.
+    """
+
+    VECTORS_KEY = "similarity:vectors"
+    LOG_KEY = "similarity:log"
+    GENERATION_KEY = "similarity:generation"  # bumped by rebuild()
+    REBUILD_TTL = 3600  # a rebuild that dies part-way leaves its keys behind for at most this long
+
+    def __init__(self):
+        self.dimensions = int(os.getenv("SIMILARITY_DIMENSIONS", "512"))
+        self.sync_interval = float(os.getenv("SIMILARITY_SYNC_INTERVAL", "1"))
+
+        self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._log_offset = 0
+        self._generation = None
+        self._synced_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    # VECTORIZER
+    def vectorize(self, text: str) -> np.ndarray:
+        words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if not features:
+            return vector
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint64,
+                             count=len(features))
+        weights = np.fromiter((1 + math.log(count) for count in features.values()), dtype=np.float32,
+                              count=len(features))
+        # The top hash bit picks the sign so colliding features tend to cancel out
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, (hashes % self.dimensions).astype(np.intp), signs * weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # WRITES (worker)
+    async def add(self, record_id: str, text: str):
+        """Index (or re-index) a completed transcript; failures only cost recall"""
+        try:
+            await self._store([(record_id, self.vectorize(text))])
+        except Exception as e:
+            print(f"Similarity index update failed: {str(e)}")
+
+    async def _store(self, items: List[Tuple[str, np.ndarray]], vectors_key: str = None, log_key: str = None,
+                     ttl: int = None):
+        vectors_key, log_key = vectors_key or self.VECTORS_KEY, log_key or self.LOG_KEY
+        pipe = redis_service.client.pipeline(transaction=False)
+        pipe.hset(vectors_key, mapping={record_id: vector.astype(np.float16).tobytes() for record_id, vector in items})
+        pipe.rpush(log_key, *[record_id for record_id, _ in items])
+        if ttl:
+            pipe.expire(vectors_key, ttl)
+            pipe.expire(log_key, ttl)
+        await pipe.execute()
+
+    async def rebuild(self, pages: AsyncIterator[List[Dict[str, Any]]]) -> int:
+        """
+        Re-index everything from pages of {"id", "transcript_text"} rows. The new
+        index is built under temporary keys and only replaces the live one once
+        every page has been read, so a failed rebuild leaves the index as it was.
+        """
+        client = redis_service.client
+        suffix = f":rebuild:{uuid.uuid4().hex}"
+        vectors_key, log_key = self.VECTORS_KEY + suffix, self.LOG_KEY + suffix
+        started_at = await client.llen(self.LOG_KEY)
+        total = 0
+        try:
+            async for page in pages:
+                items = [(row["id"], self.vectorize(row["transcript_text"] or "")) for row in page]
+                if items:
+                    await self._store(items, vectors_key, log_key, ttl=self.REBUILD_TTL)
+                    total += len(items)
+            swap = client.register_script(SWAP_SCRIPT)
+            await swap(keys=[self.VECTORS_KEY, self.LOG_KEY, vectors_key, log_key, self.GENERATION_KEY],
+                       args=[started_at])
+        except Exception:
+            await client.delete(vectors_key, log_key)
+            raise
+        await self.sync(force=True)
+        return total
+
+    # LOCAL MATRIX
+    def _reset(self):
+        self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._rows = {}
+        self._log_offset = 0
+
+    def _put(self, record_id: str, vector: np.ndarray):
+        row = self._rows.get(record_id)
+        if row is None:
+            if self._size == len(self._matrix):
+                # Grow geometrically so appends stay amortized O(1)
+                grown = np.zeros((max(1024, 2 * len(self._matrix)), self.dimensions), dtype=np.float32)
+                grown[:self._size] = self._matrix[:self._size]
+                self._matrix = grown
+            row = self._size
+            self._size += 1
+            self._ids.append(record_id)
+            self._rows[record_id] = row
+        self._matrix[row] = vector
+
+    async def sync(self, force: bool = False):
+        """Catch up with vectors other processes added since the last sync"""
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            client = redis_service.client
+            pipe = client.pipeline(transaction=True)
+            pipe.get(self.GENERATION_KEY)
+            pipe.llen(self.LOG_KEY)
+            generation, length = await pipe.execute()
+            if generation != self._generation:
+                # First load, or the index was rebuilt since
+                self._reset()
+                self._generation = generation
+            if length > self._log_offset:
+                new_ids = [raw.decode() for raw in await client.lrange(self.LOG_KEY, self._log_offset, length - 1)]
+                unique_ids = list(dict.fromkeys(new_ids))
+                for start in range(0, len(unique_ids), 1000):
+                    part = unique_ids[start:start + 1000]
+                    for record_id, raw in zip(part, await client.hmget(self.VECTORS_KEY, part)):
+                        if raw is not None:
+                            self._put(record_id, np.frombuffer(raw, dtype=np.float16).astype(np.float32))
+                self._log_offset = length
+            self._synced_at = time.monotonic()
+
+    # QUERIES
+    def query_many(self, vectors: np.ndarray, k: int, exclude: Optional[List[Optional[str]]] = None,
+                   min_score: float = 0.0) -> List[List[Tuple[str, float]]]:
+        """Cosine top-k for a batch of normalized query vectors (one row each)"""
+        if self._size == 0 or len(vectors) == 0:
+            return [[] for _ in range(len(vectors))]
+        scores = vectors @ self._matrix[:self._size].T  # (queries, records)
+        results = []
+        for i, row_scores in enumerate(scores):
+            skip = self._rows.get(exclude[i]) if exclude else None
+            if skip is not None:
+                row_scores[skip] = -np.inf
+            count = min(k, self._size)
+            top = np.argpartition(-row_scores, count - 1)[:count]
+            top = top[np.argsort(-row_scores[top])]
+            results.append([
+                (self._ids[row], float(row_scores[row])) for row in top if row_scores[row] > min_score
+            ])
+        return results
+
+    async def similar(self, record_id: str, text: Optional[str], k: int = 5,
+                      min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Most similar indexed transcripts (id, cosine score), excluding the record itself"""
+        await self.sync()
+        row = self._rows.get(record_id)
+        if row is not None:
+            vector = self._matrix[row].copy()
+        elif text:
+            vector = self.vectorize(text)
+        else:
+            return []
+        return self.query_many(vector[np.newaxis, :], k, [record_id], min_score)[0]
+
+similarity_index = SimilarityIndex()
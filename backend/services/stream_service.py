@@ -0,0 +1,84 @@
+from services.redis_service import redis_service
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class StreamService:
+    """
+    Relays generated tokens from workers to API listeners.
+
+    Each task gets a Redis stream. Workers append chunks as they arrive from
+    Groq; listeners read from the beginning, so a client that connects late
+    still receives the full text followed by live chunks.
+    """
+
+    PREFIX = "insight_stream:"
+
+    def __init__(self):
+        self.ttl = int(os.getenv("STREAM_TTL", "900"))
+        self.block_ms = int(os.getenv("STREAM_BLOCK_MS", "15000"))
+        self.idle_timeout = float(os.getenv("STREAM_IDLE_TIMEOUT", "300"))
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.PREFIX}{task_id}"
+
+    async def _publish(self, task_id: str, event: str, data: Dict):
+        key = self._key(task_id)
+        try:
+            pipe = redis_service.client.pipeline(transaction=False)
+            pipe.xadd(key, {"event": event, "data": json.dumps(data)})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        except Exception as e:
+            # Non-critical: the result is still persisted through Supabase
+            print(f"Stream publish failed: {str(e)}")
+
+    async def reset(self, task_id: str):
+        """Start a fresh stream for a new attempt of the task"""
+        try:
+            await redis_service.client.delete(self._key(task_id))
+        except Exception as e:
+            print(f"Stream reset failed: {str(e)}")
+        await self._publish(task_id, "reset", {})
+
+    async def publish_chunk(self, task_id: str, text: str):
+        await self._publish(task_id, "chunk", {"text": text})
+
+    async def publish_done(self, task_id: str, record_id: str):
+        await self._publish(task_id, "done", {"id": record_id})
+
+    async def publish_retry(self, task_id: str, error: str, attempt: int):
+        await self._publish(task_id, "retrying", {"error": error, "attempt": attempt})
+
+    async def publish_error(self, task_id: str, error: str):
+        await self._publish(task_id, "error", {"error": error})
+
+    async def listen(self, task_id: str) -> AsyncIterator[Tuple[str, str]]:
+        """Yield (event, json data) pairs until the task finishes or goes idle"""
+        key = self._key(task_id)
+        last_id = "0-0"
+        last_event_at = time.monotonic()
+        while True:
+            # Blocking read on the reader pool, so open streams can't starve the request path
+            response = await redis_service.reader_client.xread({key: last_id}, block=self.block_ms)
+            if not response:
+                if time.monotonic() - last_event_at > self.idle_timeout:
+                    yield "timeout", "{}"
+                    return
+                yield "keepalive", ""
+                continue
+
+            last_event_at = time.monotonic()
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    event = fields[b"event"].decode()
+                    yield event, fields[b"data"].decode()
+                    if event in ("done", "error"):
+                        return
+
+stream_service = StreamService()
@@ -1,105 +1,405 @@
-from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
+from postgrest.types import CountMethod
+from services.metrics_service import metrics_service
+from services.record_cache import record_cache
+import asyncio
+import base64
+import httpx
+import json
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple, AsyncIterator
 from dotenv import load_dotenv
 
 load_dotenv()
+
+# Full-record projections; they leave out derived columns such as search_vector
+TRANSCRIPT_COLUMNS = "id,company_name,attendees,date,status,created_at,updated_at,transcript_text,insight_result"
+LINKEDIN_COLUMNS = (
+    "id,company_linkedin,company_website,status,created_at,updated_at,linkedin_bio,pitch_deck_content,icebreaker_result"
+)
+
+# Listing projections that leave out the large text columns
+TRANSCRIPT_SUMMARY_COLUMNS = "id,company_name,attendees,date,status,created_at"
+LINKEDIN_SUMMARY_COLUMNS = "id,company_linkedin,company_website,status,created_at"
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just after this row"""
+    raw = json.dumps([row["created_at"], str(row["id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return created_at, row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
 class SupabaseService:
     def __init__(self):
         url = os.getenv("SUPABASE_URL")
         key = os.getenv("SUPABASE_ANON_KEY")
         if not url or not key:
             raise ValueError("Missing Supabase credentials")
-        self.client: Client = create_client(url, key)
-    
+        self.rest_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+
+        # Connection pool / concurrency settings
+        self.timeout = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+        self.max_connections = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.max_concurrency = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "10"))
+
+        self._client: Optional[AsyncPostgrestClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        """Async PostgREST client with a pooled, keep-alive HTTP session.
+
+        Pooled connections belong to the event loop that opened them, so the
+        client is rebuilt if it is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            client = AsyncPostgrestClient(self.rest_url, headers=self.headers)
+            # Swap the default session for one with a bounded connection pool
+            client.session = httpx.AsyncClient(
+                base_url=client.session.base_url,
+                headers=client.session.headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
+            self._client = client
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP session"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+        self._client_loop = None
+
+    async def _execute(self, operation: str, build: Callable[[AsyncPostgrestClient], Any]):
+        """Build a query against the pooled client and run it under the concurrency limit"""
+        client = self.client
+        async with self._semaphore:
+            with metrics_service.timed(f"supabase.{operation}"):
+                query = build(client)
+                if asyncio.iscoroutine(query):
+                    # rpc() is a coroutine in postgrest-py 0.10
+                    query = await query
+                return await query.execute()
+
+    async def _list_page(self, table: str, columns: str, limit: int, cursor: Optional[str],
+                         filters: Dict[str, Any], ilike_filters: Dict[str, Any],
+                         created_from: Optional[str] = None, created_to: Optional[str] = None,
+                         count: bool = True) -> Dict[str, Any]:
+        """
+        One page of rows, newest first, using keyset pagination on (created_at, id).
+        Returns {"items", "total", "next_cursor"}; total is PostgREST's estimated count
+        (None when count=False). created_from/created_to bound created_at as [from, to).
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        def build(db):
+            query = db.table(table).select(columns, count=CountMethod.estimated if count else None)
+            for column, value in filters.items():
+                if value is not None:
+                    query = query.eq(column, value)
+            for column, value in ilike_filters.items():
+                if value is not None:
+                    query = query.ilike(column, value)
+            if created_from:
+                query = query.gte("created_at", created_from)
+            if created_to:
+                query = query.lt("created_at", created_to)
+            if after:
+                created_at, row_id = after
+                # postgrest-py 0.10 has no or_(), so the logic tree goes in as a raw "or" param
+                query.params = query.params.add(
+                    "or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}"))'
+                )
+            query = query.order("created_at", desc=True).order("id", desc=True)
+            # Each order() adds its own "order" param and PostgREST reads only one, so merge them
+            query.params = query.params.set("order", ",".join(query.params.get_list("order")))
+            return query.limit(limit + 1)
+
+        result = await self._execute(f"list_{table}", build)
+        rows = result.data or []
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return {"items": rows[:limit], "total": result.count, "next_cursor": next_cursor}
+
+    async def _iter_pages(self, table: str, columns: str, page_size: int, status: Optional[str],
+                          created_from: Optional[str], created_to: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every matching row, newest first, one keyset page at a time (only one page held in memory)"""
+        cursor = None
+        while True:
+            try:
+                page = await self._list_page(
+                    table, columns, page_size, cursor,
+                    filters={"status": status}, ilike_filters={},
+                    created_from=created_from, created_to=created_to, count=False
+                )
+            except Exception as e:
+                raise Exception(f"Supabase error: {str(e)}")
+            if page["items"]:
+                yield page["items"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return
+
+    @staticmethod
+    def _search_page(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Split the window-count column off the search RPC rows"""
+        total = rows[0]["total_count"] if rows else 0
+        for row in rows:
+            row.pop("total_count", None)
+        return {"items": rows, "total": total}
+
     # TRANSCRIPT METHODS
     async def create_transcript(self, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            result = self.client.table("transcripts").insert(data).execute()
+            result = await self._execute("create_transcript", lambda db: db.table("transcripts").insert(data))
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
-    async def get_transcripts(self) -> List[Dict[str, Any]]:
+
+    async def create_transcripts(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert many transcripts in one request; rows come back in input order"""
         try:
-            result = self.client.table("transcripts").select("*").order("created_at", desc=True).execute()
-            return result.data
+            result = await self._execute("create_transcripts", lambda db: db.table("transcripts").insert(rows))
+            return result.data or []
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
-    async def get_transcript_by_id(self, transcript_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific transcript by ID"""
+
+    async def get_transcripts(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                              company: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+        """Get a page of transcripts, newest first"""
+        columns = TRANSCRIPT_SUMMARY_COLUMNS if summary else TRANSCRIPT_COLUMNS
         try:
-            result = self.client.table("transcripts").select("*").eq("id", transcript_id).execute()
+            return await self._list_page(
+                "transcripts", columns, limit, cursor,
+                filters={"status": status},
+                ilike_filters={"company_name": company}
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    def iter_transcripts(self, status: Optional[str] = None, created_from: Optional[str] = None,
+                         created_to: Optional[str] = None, summary: bool = False,
+                         page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Pages of transcripts for export, newest first"""
+        columns = TRANSCRIPT_SUMMARY_COLUMNS if summary else TRANSCRIPT_COLUMNS
+        return self._iter_pages("transcripts", columns, page_size, status, created_from, created_to)
+
+    async def search_transcripts(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Ranked full-text search (see migrations/002_full_text_search.sql); returns {"items", "total"}"""
+        try:
+            result = await self._execute("search_transcripts", lambda db: db.rpc("search_transcripts", {
+                "query": query, "max_results": limit, "skip": offset
+            }))
+            return self._search_page(result.data or [])
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    async def get_transcript_by_id(self, transcript_id: str) -> Optional[Dict[str, Any]]:
+        """Get a specific transcript by ID (read-through cached)"""
+        async def fetch():
+            result = await self._execute("get_transcript_by_id", lambda db: db.table("transcripts").select(TRANSCRIPT_COLUMNS).eq("id", transcript_id))
             return result.data[0] if result.data else None
+
+        try:
+            return await record_cache.get_or_fetch("transcripts", transcript_id, fetch)
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
+
+    async def get_transcripts_by_ids(self, transcript_ids: List[str], columns: str = TRANSCRIPT_COLUMNS) -> List[Dict[str, Any]]:
+        """Several transcripts in one request (in no particular order)"""
+        if not transcript_ids:
+            return []
+        try:
+            result = await self._execute("get_transcripts_by_ids", lambda db: db.table("transcripts").select(columns).in_("id", transcript_ids))
+            return result.data or []
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    async def get_transcript_text(self, transcript_id: str) -> Optional[str]:
+        """Get only the transcript text (for slim task messages)"""
+        try:
+            result = await self._execute("get_transcript_text", lambda db: db.table("transcripts").select("transcript_text").eq("id", transcript_id))
+            return result.data[0]["transcript_text"] if result.data else None
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
     async def update_transcript_insight(self, transcript_id: str, insight: str) -> Dict[str, Any]:
         try:
-            result = self.client.table("transcripts").update({"insight_result": insight}).eq("id", transcript_id).execute()
+            result = await self._execute("update_transcript_insight", lambda db: db.table("transcripts").update({"insight_result": insight}).eq("id", transcript_id))
+            await record_cache.invalidate("transcripts", transcript_id)
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
+
     async def update_transcript_status(self, transcript_id: str, status: str) -> Dict[str, Any]:
         """Update transcript processing status"""
         try:
-            result = self.client.table("transcripts").update({
+            result = await self._execute("update_transcript_status", lambda db: db.table("transcripts").update({
                 "status": status,
                 "updated_at": "now()"
-            }).eq("id", transcript_id).execute()
+            }).eq("id", transcript_id))
+            await record_cache.invalidate("transcripts", transcript_id)
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error updating transcript status: {str(e)}")
-    
+
+    async def complete_transcript(self, transcript_id: str, insight: str) -> Dict[str, Any]:
+        """Store the insight and mark the transcript completed in a single write"""
+        try:
+            result = await self._execute("complete_transcript", lambda db: db.table("transcripts").update({
+                "insight_result": insight,
+                "status": "completed",
+                "updated_at": "now()"
+            }).eq("id", transcript_id))
+            await record_cache.invalidate("transcripts", transcript_id)
+            return result.data[0] if result.data else None
+        except Exception as e:
+            raise Exception(f"Supabase error completing transcript: {str(e)}")
+
+    async def update_transcript_statuses(self, transcript_ids: List[str], status: str) -> int:
+        """Set one status on many transcripts in a single write; completed transcripts are left alone"""
+        return await self._update_statuses("transcripts", transcript_ids, status)
+
     # LINKEDIN METHODS
     async def create_linkedin_insight(self, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            result = self.client.table("linkedin_insights").insert(data).execute()
+            result = await self._execute("create_linkedin_insight", lambda db: db.table("linkedin_insights").insert(data))
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
-    async def get_linkedin_insights(self) -> List[Dict[str, Any]]:
+
+    async def create_linkedin_insights(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert many LinkedIn insights in one request; rows come back in input order"""
+        try:
+            result = await self._execute("create_linkedin_insights", lambda db: db.table("linkedin_insights").insert(rows))
+            return result.data or []
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    async def get_linkedin_insights(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                                    company: Optional[str] = None, summary: bool = False) -> Dict[str, Any]:
+        """Get a page of LinkedIn insights, newest first"""
+        columns = LINKEDIN_SUMMARY_COLUMNS if summary else LINKEDIN_COLUMNS
+        try:
+            return await self._list_page(
+                "linkedin_insights", columns, limit, cursor,
+                filters={"status": status},
+                ilike_filters={"company_linkedin": company}
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    def iter_linkedin_insights(self, status: Optional[str] = None, created_from: Optional[str] = None,
+                               created_to: Optional[str] = None, summary: bool = False,
+                               page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Pages of LinkedIn insights for export, newest first"""
+        columns = LINKEDIN_SUMMARY_COLUMNS if summary else LINKEDIN_COLUMNS
+        return self._iter_pages("linkedin_insights", columns, page_size, status, created_from, created_to)
+
+    async def search_linkedin_insights(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Ranked full-text search (see migrations/002_full_text_search.sql); returns {"items", "total"}"""
         try:
-            result = self.client.table("linkedin_insights").select("*").order("created_at", desc=True).execute()
-            return result.data
+            result = await self._execute("search_linkedin_insights", lambda db: db.rpc("search_linkedin_insights", {
+                "query": query, "max_results": limit, "skip": offset
+            }))
+            return self._search_page(result.data or [])
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
+
     async def get_linkedin_insight_by_id(self, insight_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific LinkedIn insight by ID"""
+        """Get a specific LinkedIn insight by ID (read-through cached)"""
+        async def fetch():
+            result = await self._execute("get_linkedin_insight_by_id", lambda db: db.table("linkedin_insights").select(LINKEDIN_COLUMNS).eq("id", insight_id))
+            return result.data[0] if result.data else None
+
+        try:
+            return await record_cache.get_or_fetch("linkedin_insights", insight_id, fetch)
+        except Exception as e:
+            raise Exception(f"Supabase error: {str(e)}")
+
+    async def get_linkedin_inputs(self, insight_id: str) -> Optional[Dict[str, Any]]:
+        """Get only the bio and pitch deck (for slim task messages)"""
         try:
-            result = self.client.table("linkedin_insights").select("*").eq("id", insight_id).execute()
+            result = await self._execute("get_linkedin_inputs", lambda db: db.table("linkedin_insights").select("linkedin_bio,pitch_deck_content").eq("id", insight_id))
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error: {str(e)}")
-    
+
     async def update_linkedin_insight(self, insight_id: str, icebreaker_result: str) -> bool:
         """Update LinkedIn insight with AI result"""
         try:
-            response = self.client.table("linkedin_insights").update({
+            response = await self._execute("update_linkedin_insight", lambda db: db.table("linkedin_insights").update({
                 "icebreaker_result": icebreaker_result
-            }).eq("id", insight_id).execute()
-            
+            }).eq("id", insight_id))
+            await record_cache.invalidate("linkedin_insights", insight_id)
+
             return bool(response.data)
-        
+
         except Exception as e:
             print(f"Supabase update error: {str(e)}")
             raise Exception(f"Supabase error: {str(e)}")
-    
+
     async def update_linkedin_status(self, insight_id: str, status: str) -> Dict[str, Any]:
         """Update LinkedIn insight processing status"""
         try:
-            result = self.client.table("linkedin_insights").update({
+            result = await self._execute("update_linkedin_status", lambda db: db.table("linkedin_insights").update({
                 "status": status,
                 "updated_at": "now()"
-            }).eq("id", insight_id).execute()
+            }).eq("id", insight_id))
+            await record_cache.invalidate("linkedin_insights", insight_id)
             return result.data[0] if result.data else None
         except Exception as e:
             raise Exception(f"Supabase error updating LinkedIn status: {str(e)}")
-    
+
+    async def complete_linkedin_insight(self, insight_id: str, icebreaker_result: str) -> Dict[str, Any]:
+        """Store the icebreaker and mark the LinkedIn insight completed in a single write"""
+        try:
+            result = await self._execute("complete_linkedin_insight", lambda db: db.table("linkedin_insights").update({
+                "icebreaker_result": icebreaker_result,
+                "status": "completed",
+                "updated_at": "now()"
+            }).eq("id", insight_id))
+            await record_cache.invalidate("linkedin_insights", insight_id)
+            return result.data[0] if result.data else None
+        except Exception as e:
+            raise Exception(f"Supabase error completing LinkedIn insight: {str(e)}")
+
+    async def update_linkedin_statuses(self, insight_ids: List[str], status: str) -> int:
+        """Set one status on many LinkedIn insights in a single write; completed insights are left alone"""
+        return await self._update_statuses("linkedin_insights", insight_ids, status)
+
+    async def _update_statuses(self, table: str, record_ids: List[str], status: str) -> int:
+        # Buffered transitions may land after the final write, so they never overwrite "completed"
+        try:
+            result = await self._execute(f"update_{table}_statuses", lambda db: db.table(table).update({
+                "status": status,
+                "updated_at": "now()"
+            }).in_("id", record_ids).neq("status", "completed"))
+            for record_id in record_ids:
+                await record_cache.invalidate(table, record_id)
+            return len(result.data or [])
+        except Exception as e:
+            raise Exception(f"Supabase error updating {table} statuses: {str(e)}")
+
     # TASK TRACKING METHODS (Optional - for advanced queue monitoring)
     async def create_task_log(self, task_id: str, task_type: str, record_id: str, status: str = "started") -> Dict[str, Any]:
         """Log task execution for monitoring"""
@@ -111,12 +411,12 @@ class SupabaseService:
                 "status": status,
                 "started_at": "now()"
             }
-            result = self.client.table("task_logs").insert(data).execute()
+            result = await self._execute("create_task_log", lambda db: db.table("task_logs").insert(data))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"Task log creation failed: {str(e)}")
             return None  # Non-critical, don't raise
-    
+
     async def update_task_log(self, task_id: str, status: str, error_message: str = None) -> bool:
         """Update task log status"""
         try:
@@ -126,11 +426,19 @@ class SupabaseService:
             }
             if error_message:
                 update_data["error_message"] = error_message
-            
-            result = self.client.table("task_logs").update(update_data).eq("task_id", task_id).execute()
+
+            result = await self._execute("update_task_log", lambda db: db.table("task_logs").update(update_data).eq("task_id", task_id))
             return bool(result.data)
         except Exception as e:
             print(f"Task log update failed: {str(e)}")
             return False  # Non-critical, don't raise
 
-supabase_service = SupabaseService()
\ No newline at end of file
+    async def upsert_task_logs(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or update many task logs in one write, keyed by task_id (see migrations/003_task_logs_task_id.sql)"""
+        try:
+            result = await self._execute("upsert_task_logs", lambda db: db.table("task_logs").upsert(rows, on_conflict="task_id"))
+            return len(result.data or [])
+        except Exception as e:
+            raise Exception(f"Supabase error upserting task logs: {str(e)}")
+
+supabase_service = SupabaseService()
@@ -0,0 +1,117 @@
+from services.redis_service import redis_service
+from collections import defaultdict
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FINAL_STATES = {"completed", "failed"}
+
+class TaskEventService:
+    """
+    Push-based task state updates.
+
+    Workers (and the API on enqueue) publish state transitions on one Redis
+    channel and keep the latest state per task as a snapshot. Each API
+    process holds a single subscription to that channel and fans events out
+    to any number of in-process listeners (SSE/WebSocket clients).
+    """
+
+    CHANNEL = "task_events"
+    STATE_PREFIX = "task_state:"
+
+    def __init__(self):
+        self.state_ttl = int(os.getenv("TASK_STATE_TTL", "86400"))
+        self.listener_queue_size = int(os.getenv("TASK_EVENT_QUEUE_SIZE", "100"))
+        self._listeners: Dict[Optional[str], Set[asyncio.Queue]] = defaultdict(set)
+        self._reader: Optional[asyncio.Task] = None
+
+    # PUBLISHING (workers and API)
+    def _event(self, task_id: str, state: str, **info: Any) -> Dict[str, Any]:
+        return {"task_id": task_id, "state": state, "ts": time.time(), **info}
+
+    async def publish(self, task_id: str, state: str, **info: Any):
+        """Publish a state transition (queued, processing, retrying, parked, completed, failed)"""
+        await self.publish_many([self._event(task_id, state, **info)])
+
+    async def publish_many(self, events: List[Dict[str, Any]]):
+        try:
+            pipe = redis_service.client.pipeline(transaction=False)
+            for event in events:
+                payload = json.dumps(event)
+                pipe.set(f"{self.STATE_PREFIX}{event['task_id']}", payload, ex=self.state_ttl)
+                pipe.publish(self.CHANNEL, payload)
+            await pipe.execute()
+        except Exception as e:
+            # Non-critical: status is still in Supabase and the result backend
+            print(f"Task event publish failed: {str(e)}")
+
+    def queued_events(self, kind: str, items: Iterable[tuple]) -> List[Dict[str, Any]]:
+        """Build "queued" events for (record_id, task_id) pairs"""
+        return [self._event(task_id, "queued", kind=kind, record_id=record_id, retries=0) for record_id, task_id in items]
+
+    # SUBSCRIBING (API)
+    async def snapshot(self, task_ids: List[str]) -> List[Dict[str, Any]]:
+        """Latest known state of each task"""
+        if not task_ids:
+            return []
+        raw = await redis_service.client.mget([f"{self.STATE_PREFIX}{task_id}" for task_id in task_ids])
+        return [json.loads(item) for item in raw if item]
+
+    def _ensure_reader(self):
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        while True:
+            pubsub = redis_service.reader_client.pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    self._dispatch(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Task event subscription lost, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def _dispatch(self, event: Dict[str, Any]):
+        queues = self._listeners.get(event["task_id"], set()) | self._listeners.get(None, set())
+        for queue in queues:
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block the fan-out
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def add_listener(self, task_ids: Optional[List[str]] = None) -> asyncio.Queue:
+        """Register a listener for these tasks (all tasks if None)"""
+        self._ensure_reader()
+        queue = asyncio.Queue(maxsize=self.listener_queue_size)
+        for task_id in [None] if task_ids is None else task_ids:
+            self._listeners[task_id].add(queue)
+        return queue
+
+    def watch(self, queue: asyncio.Queue, task_ids: List[str]):
+        """Add tasks to an existing listener"""
+        for task_id in task_ids:
+            self._listeners[task_id].add(queue)
+
+    def remove_listener(self, queue: asyncio.Queue):
+        for task_id in list(self._listeners):
+            self._listeners[task_id].discard(queue)
+            if not self._listeners[task_id]:
+                del self._listeners[task_id]
+
+task_event_service = TaskEventService()
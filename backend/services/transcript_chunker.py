@@ -0,0 +1,64 @@
+import re
+from typing import List
+
+# "Name:" / "[00:01:02] Name:" / "SPEAKER 1:" at the start of a line
+SPEAKER_TURN = re.compile(r"^\s*(?:\[[^\]\n]*\]\s*)?[A-Za-z][\w .'&()-]{0,40}:(?!//)", re.MULTILINE)
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (words and punctuation), close enough for budgeting"""
+    return len(TOKEN_PATTERN.findall(text))
+
+def split_turns(transcript: str) -> List[str]:
+    """Split a transcript into speaker turns, falling back to paragraphs/lines"""
+    starts = [m.start() for m in SPEAKER_TURN.finditer(transcript)]
+    if len(starts) >= 2:
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        bounds = starts + [len(transcript)]
+        turns = [transcript[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+    elif "\n\n" in transcript:
+        turns = [p.strip() for p in transcript.split("\n\n")]
+    else:
+        turns = [line.strip() for line in transcript.splitlines()]
+    return [turn for turn in turns if turn]
+
+def _split_oversized(turn: str, max_tokens: int) -> List[str]:
+    """Break a single turn that exceeds the budget on sentence, then word, boundaries"""
+    pieces, current, current_tokens = [], [], 0
+    for sentence in SENTENCE_END.split(turn):
+        sentence_tokens = estimate_tokens(sentence)
+        if sentence_tokens > max_tokens:
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // sentence_tokens)
+            parts = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            parts = [sentence]
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def chunk_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Pack whole speaker turns into chunks of at most max_tokens"""
+    chunks, current, current_tokens = [], [], 0
+    for turn in split_turns(transcript):
+        turn_tokens = estimate_tokens(turn)
+        pieces = _split_oversized(turn, max_tokens) if turn_tokens > max_tokens else [turn]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
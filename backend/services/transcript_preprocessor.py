@@ -0,0 +1,140 @@
+from services.transcript_chunker import estimate_tokens
+from dataclasses import dataclass
+import os
+import re
+import unicodedata
+from typing import Callable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 00:01, 1:02:03, 00:01:02.500, 12:03 PM
+TS = r"\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?:\s*[AaPp][Mm])?"
+# Capitalized words or numbers: "Alice", "Dr. Mary O'Neil", "SPEAKER 2"
+NAME = r"[A-Z][\w.'&-]*(?: [A-Z0-9][\w.'&-]*){0,3}"
+
+# Timestamps only count at the start of a line or next to a speaker label, so
+# times mentioned in the conversation ("at 3:30 PM") are kept
+LEADING_TIMESTAMP = re.compile(rf"^\s*[\[(]?{TS}[\])]?\s*[-|]?\s*")
+CUE_TIMING = re.compile(rf"^\s*{TS}\s*-->\s*{TS}\s*$")  # WebVTT/SRT cue lines
+CAPTION_HEADER = re.compile(r"^\s*(?:WEBVTT\b.*|\d+)\s*$")  # WebVTT header, SRT cue numbers
+# "Alice: ...", "Alice (00:12): ...", "Alice [00:12:03]: ..."
+SPEAKER = re.compile(rf"^({NAME})\s*(?:[\[(]{TS}[\])])?\s*:(?!//)\s*(.*)$")
+# Zoom/Otter style "Alice  00:12" header line, with the words on the following lines
+SPEAKER_HEADER = re.compile(rf"^({NAME})\s+[\[(]?{TS}[\])]?\s*$")
+# Vocal fillers only; phrases like "you know" or "kind of" often carry meaning
+# "but, uh, the" -> "but, the"; "six, uh." -> "six."; "Um, hi" -> "hi"
+FILLERS = re.compile(r"(,\s*)?(?<![\w'-])(?:u+h+m*|u+m+|e+r+m+|h+m+)(?![\w'-])([,.!?]?)", re.IGNORECASE)
+STUTTER = re.compile(r"(?<![\w'])([\w']+)(?:[\s,]+\1(?![\w']))+", re.IGNORECASE)
+BACKCHANNEL = re.compile(
+    r"^(?:yeah|yep|yes|ok(?:ay)?|right|sure|mm-?hmm|uh-?huh|got it|i see|cool|great|nice|exactly|totally|"
+    r"absolutely|sounds good|makes sense)(?:[\s,.!]+(?:yeah|yep|yes|ok(?:ay)?|right|sure|got it|great|cool))*[\s.!]*$",
+    re.IGNORECASE,
+)
+SPACES = re.compile(r"[ \t ]+")
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.!?;:])")
+SENTENCE_START = re.compile(r"(^|[.!?]\s+)([a-z])")
+
+def _load_counter() -> Tuple[Callable[[str], int], str]:
+    """Exact BPE token counts when tiktoken is installed, the chunker's estimate otherwise"""
+    encoding_name = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+        return (lambda text: len(encoding.encode(text, disallowed_special=()))), f"tiktoken:{encoding_name}"
+    except Exception:
+        # Not installed, or the encoding file can't be fetched offline
+        return estimate_tokens, "estimate"
+
+count_tokens, TOKENIZER = _load_counter()
+
+@dataclass
+class PreprocessResult:
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+def _drop_filler(match: re.Match) -> str:
+    comma_before, punctuation = match.groups()
+    before = match.string[:match.start()].rstrip()
+    # A comma after the filler only stays if it replaces the one before it, and
+    # a sentence end only if the text before doesn't already end in punctuation
+    if punctuation == "," and not comma_before:
+        punctuation = ""
+    elif punctuation and (not before or before[-1] in ",.!?:;"):
+        punctuation = ""
+    return f"{punctuation} "
+
+def _clean(utterance: str) -> str:
+    utterance, fillers = FILLERS.subn(_drop_filler, utterance)
+    utterance = STUTTER.sub(r"\1", utterance)
+    utterance = SPACES.sub(" ", utterance)
+    utterance = SPACE_BEFORE_PUNCTUATION.sub(r"\1", utterance).strip(" ,")
+    if fillers:
+        # Fillers removed at the start of a sentence leave it lower-case
+        utterance = SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), utterance)
+    return utterance
+
+def _interrupts(turns: List[List[Optional[str]]], i: int) -> bool:
+    """Whether turn i is only a backchannel dropped into the middle of another speaker's turn"""
+    if not 0 < i < len(turns) - 1 or not BACKCHANNEL.match(turns[i][1]):
+        return False
+    before, after = turns[i - 1], turns[i + 1]
+    # A short answer to a question ("Can we meet Thursday?" "Absolutely.") is kept
+    return before[0] is not None and before[0] == after[0] != turns[i][0] and not before[1].endswith("?")
+
+def normalize_transcript(transcript: str) -> str:
+    """
+    Strip timestamps, caption cues, filler words and stutters, collapse
+    whitespace and merge consecutive turns of the same speaker (so each
+    speaker label appears once per turn). A turn that is only a backchannel
+    ("Mm-hmm.", "Right.") is dropped when it interrupts the other speaker,
+    who then goes on; answers and reactions between turns are kept.
+    """
+    text = unicodedata.normalize("NFKC", transcript).replace("\r\n", "\n").replace("\r", "\n")
+
+    turns: List[List[Optional[str]]] = []  # [speaker, utterance]
+    for line in text.split("\n"):
+        if CUE_TIMING.match(line) or CAPTION_HEADER.match(line):
+            continue
+        line = LEADING_TIMESTAMP.sub("", line).strip()
+        if not line:
+            continue
+        header = SPEAKER_HEADER.match(line)
+        match = None if header else SPEAKER.match(line)
+        if header:
+            speaker, utterance = header.group(1).strip(), ""
+        elif match:
+            speaker, utterance = match.group(1).strip(), _clean(match.group(2))
+        else:
+            speaker, utterance = None, _clean(line)
+        if turns and (speaker is None or speaker == turns[-1][0]):
+            # Continuation line, or the same speaker again
+            turns[-1][1] = f"{turns[-1][1]} {utterance}".strip()
+        else:
+            turns.append([speaker, utterance])
+
+    turns = [turn for turn in turns if turn[1]]
+    kept: List[List[Optional[str]]] = []
+    for i, turn in enumerate(turns):
+        if _interrupts(turns, i):
+            continue
+        if kept and turn[0] == kept[-1][0]:
+            # The same speaker again after a dropped backchannel
+            kept[-1][1] = f"{kept[-1][1]} {turn[1]}"
+        else:
+            kept.append(turn)
+
+    return "\n".join(f"{speaker}: {utterance}" if speaker else utterance for speaker, utterance in kept)
+
+def preprocess_transcript(transcript: str) -> PreprocessResult:
+    """Normalize a transcript for the LLM and count the tokens it saves"""
+    compacted = normalize_transcript(transcript)
+    # Never send less than nothing: fall back to the original if cleaning emptied it
+    if not compacted:
+        compacted = transcript.strip()
+    return PreprocessResult(compacted, count_tokens(transcript), count_tokens(compacted))
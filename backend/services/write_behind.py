@@ -0,0 +1,147 @@
+from services.supabase_service import supabase_service
+from services.metrics_service import metrics_service
+from collections import defaultdict
+from datetime import datetime, timezone
+import asyncio
+import os
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class WriteBehindBuffer:
+    """
+    Write-behind buffer for the worker's status transitions and task logs.
+
+    Updates are coalesced per record (only the latest status of a record is
+    written) and flushed as bulk writes, one per (table, status) plus one task
+    log upsert, every STATUS_FLUSH_INTERVAL seconds or as soon as
+    STATUS_FLUSH_MAX_PENDING records are waiting. Final writes go straight to
+    Supabase: call discard() first so an older transition can't land after
+    them. Failed flushes are retried on the next round.
+    """
+
+    UPDATERS = {
+        "transcript": lambda ids, status: supabase_service.update_transcript_statuses(ids, status),
+        "linkedin": lambda ids, status: supabase_service.update_linkedin_statuses(ids, status),
+    }
+
+    def __init__(self):
+        self.enabled = os.getenv("STATUS_WRITE_BEHIND", "true").lower() == "true"
+        self.flush_interval = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.5"))
+        self.max_pending = int(os.getenv("STATUS_FLUSH_MAX_PENDING", "200"))
+        # task_logs is optional (see migrations/003_task_logs_task_id.sql)
+        self.task_logs_enabled = os.getenv("TASK_LOGS_ENABLED", "false").lower() == "true"
+
+        self._statuses: Dict[Tuple[str, str], str] = {}  # (kind, record id) -> latest status
+        self._task_logs: Dict[str, Dict[str, Any]] = {}  # task id -> merged row
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._statuses) + len(self._task_logs)
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Like the pooled clients, the lock belongs to the loop that uses it (one per worker process)
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+            self._flusher = None
+        return self._lock
+
+    async def set_status(self, kind: str, record_id: str, status: str):
+        """Queue a status transition (replaces any unwritten one for the same record)"""
+        if not self.enabled:
+            await self._write_statuses(kind, [record_id], status)
+            return
+        self._statuses[(kind, record_id)] = status
+        await self._schedule()
+
+    async def log_task(self, task_id: str, kind: str, record_id: str, status: str, error_message: str = None):
+        """Queue a task log update: started, retrying, completed or failed (TASK_LOGS_ENABLED only)"""
+        if not self.task_logs_enabled:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        row = self._task_logs.setdefault(task_id, {"task_id": task_id, "task_type": kind, "record_id": record_id})
+        row["status"] = status
+        if status in ("completed", "failed"):
+            row["completed_at"] = now
+        elif status == "started":
+            row["started_at"] = now
+        if error_message:
+            row["error_message"] = error_message
+        await self._schedule()
+
+    async def discard(self, kind: str, record_id: str):
+        """Drop the record's unwritten transition and wait out a flush that may be writing it"""
+        self._statuses.pop((kind, record_id), None)
+        async with self._get_lock():
+            self._statuses.pop((kind, record_id), None)
+
+    async def _schedule(self):
+        self._get_lock()
+        if self.pending >= self.max_pending:
+            await self.flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+        if self.pending:
+            # Failed writes (or updates that arrived during the flush) go out next round
+            self._flusher = asyncio.ensure_future(self._flush_later())
+
+    async def flush(self):
+        """Write everything that is pending: one bulk update per (kind, status), one task log upsert"""
+        async with self._get_lock():
+            statuses, self._statuses = self._statuses, {}
+            task_logs, self._task_logs = self._task_logs, {}
+            if not statuses and not task_logs:
+                return
+
+            groups = defaultdict(list)
+            for (kind, record_id), status in statuses.items():
+                groups[(kind, status)].append(record_id)
+            with metrics_service.timed("status_flush", records=len(statuses), task_logs=len(task_logs)):
+                for (kind, status), record_ids in groups.items():
+                    try:
+                        await self._write_statuses(kind, record_ids, status)
+                    except Exception as e:
+                        print(f"Status flush failed, will retry: {str(e)}")
+                        for record_id in record_ids:
+                            self._statuses.setdefault((kind, record_id), status)
+                if task_logs:
+                    await self._write_task_logs(task_logs)
+
+    async def _write_statuses(self, kind: str, record_ids, status: str):
+        await self.UPDATERS[kind](record_ids, status)
+
+    async def _write_task_logs(self, task_logs: Dict[str, Dict[str, Any]]):
+        # A bulk upsert sets every column named in any row, so rows are grouped by the columns they carry
+        by_columns = defaultdict(list)
+        for row in task_logs.values():
+            by_columns[tuple(sorted(row))].append(row)
+        for rows in by_columns.values():
+            try:
+                await supabase_service.upsert_task_logs(rows)
+            except Exception as e:
+                print(f"Task log flush failed, will retry: {str(e)}")
+                for row in rows:
+                    newer = self._task_logs.get(row["task_id"])
+                    self._task_logs[row["task_id"]] = {**row, **newer} if newer else row
+
+    async def aclose(self):
+        """Write whatever is still pending and stop the timer (worker shutdown)"""
+        await self.flush()
+        # Cancelled only after the flush, so a round already writing isn't cut short
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        self._flusher = None
+        if self.pending:
+            print(f"Warning: {self.pending} buffered status updates could not be written")
+
+status_buffer = WriteBehindBuffer()
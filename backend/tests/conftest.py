@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The services read their configuration at import time
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-key")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ.setdefault("METRICS_LOG_STAGES", "false")
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh loop, with the shared Redis clients swapped for fakeredis"""
+    import fakeredis
+    from services.redis_service import redis_service
+
+    server = fakeredis.FakeServer()
+
+    def run(coro):
+        async def main():
+            redis_service._client = fakeredis.aioredis.FakeRedis(server=server)
+            redis_service._reader = fakeredis.aioredis.FakeRedis(server=server)
+            redis_service._client_loop = asyncio.get_running_loop()
+            return await coro
+        return asyncio.run(main())
+
+    yield run
+    redis_service._client = None
+    redis_service._reader = None
+    redis_service._client_loop = None
+
+@pytest.fixture
+def postgrest():
+    """Point supabase_service at a handler(request) -> httpx.Response instead of PostgREST"""
+    import httpx
+    from services.supabase_service import supabase_service
+
+    def mock(handler):
+        client = supabase_service.client
+        client.session = httpx.AsyncClient(
+            base_url=client.session.base_url,
+            headers=client.session.headers,
+            transport=httpx.MockTransport(handler),
+        )
+        return supabase_service
+
+    yield mock
+    supabase_service._client = None
+    supabase_service._client_loop = None
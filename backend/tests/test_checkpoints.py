@@ -0,0 +1,83 @@
+import pytest
+
+import celery_worker
+from services.checkpoint_service import checkpoint_service
+
+TRANSCRIPT_ID = "t1"
+KEY = checkpoint_service.make_key("transcript", TRANSCRIPT_ID, "0123456789abcdef")
+
+@pytest.fixture
+def worker(monkeypatch):
+    """The transcript pipeline with the LLM and Supabase writes replaced by recorders"""
+    calls = {"generate": 0, "complete": [], "fail_complete": 0, "events": [], "record_reads": 0}
+
+    async def generate(transcript, on_chunk=None, examples=None):
+        calls["generate"] += 1
+        return f"insight #{calls['generate']}"
+
+    async def complete(record_id, insight):
+        if calls["fail_complete"]:
+            calls["fail_complete"] -= 1
+            raise Exception("Supabase error: connection reset")
+        calls["complete"].append((record_id, insight))
+
+    async def get_transcript(record_id):
+        calls["record_reads"] += 1
+        return {"id": record_id, "status": "completed"} if calls["complete"] else {"id": record_id, "status": "pending"}
+
+    async def publish(task_id, state, **info):
+        calls["events"].append(state)
+
+    async def set_status(kind, record_id, status):
+        pass
+
+    monkeypatch.setattr(celery_worker.groq_service, "generate_transcript_insight", generate)
+    monkeypatch.setattr(celery_worker.supabase_service, "complete_transcript", complete)
+    monkeypatch.setattr(celery_worker.supabase_service, "get_transcript_by_id", get_transcript)
+    monkeypatch.setattr(celery_worker.task_event_service, "publish", publish)
+    monkeypatch.setattr(celery_worker.status_buffer, "set_status", set_status)
+    monkeypatch.setattr(checkpoint_service, "enabled", True)
+    return calls
+
+def process(task_id: str = "task-1"):
+    return celery_worker._process_transcript(task_id, TRANSCRIPT_ID, "Seller: Hello", idempotency_key=KEY)
+
+def test_retry_after_generate_resumes_from_the_saved_result(run, worker):
+    worker["fail_complete"] = 1
+
+    async def scenario():
+        with pytest.raises(Exception, match="connection reset"):
+            await process()  # generated, then the write failed
+        await process()  # the retry
+
+    run(scenario())
+    assert worker["generate"] == 1
+    assert worker["complete"] == [(TRANSCRIPT_ID, "insight #1")]
+    assert worker["events"] == ["processing", "completed"]
+
+def test_redelivery_after_persist_is_skipped(run, worker):
+    async def scenario():
+        await process()
+        await process()  # redelivered after the result reached the database
+        return await checkpoint_service.begin(KEY)
+
+    checkpoint = run(scenario())
+    assert worker["generate"] == 1
+    assert len(worker["complete"]) == 1
+    assert worker["events"] == ["processing", "completed", "completed"]
+    assert worker["record_reads"] == 0  # the checkpoint alone was enough
+    assert checkpoint.stage == "persisted" and checkpoint.result is None
+
+def test_redelivery_without_persisted_marker_checks_the_record(run, worker):
+    from services.redis_service import redis_service
+
+    async def scenario():
+        await process()
+        # As if the "persisted" marker was never written: the record decides
+        await redis_service.client.hset(checkpoint_service.PREFIX + KEY, "stage", "started")
+        await process()
+
+    run(scenario())
+    assert worker["generate"] == 1
+    assert len(worker["complete"]) == 1
+    assert worker["record_reads"] == 1
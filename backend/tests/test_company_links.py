@@ -0,0 +1,22 @@
+from services.company_links import company_fields
+
+BIO = "Jane Doe, VP Sales. linkedin.com/in/janedoe - previously at www.oldcorp.com."
+DECK = "Acme Inc. Series A deck (https://www.linkedin.com/company/acme-inc/). More at https://acme.io/about."
+
+def test_links_are_taken_from_the_pitch_deck_first():
+    assert company_fields(BIO, DECK) == {
+        "company_linkedin": "https://www.linkedin.com/company/acme-inc",
+        "company_website": "https://acme.io/about",
+    }
+
+def test_bio_is_used_when_the_deck_has_no_links():
+    assert company_fields(BIO + " Works at linkedin.com/company/acme.", "Acme Inc. Series A deck") == {
+        "company_linkedin": "https://linkedin.com/company/acme",
+        "company_website": "https://www.oldcorp.com",
+    }
+
+def test_submitted_values_win_and_missing_links_stay_empty():
+    assert company_fields("No links", "None here", company_website="https://acme.io") == {
+        "company_linkedin": None,
+        "company_website": "https://acme.io",
+    }
@@ -0,0 +1,68 @@
+import asyncio
+
+from services.dedup_service import DedupService
+
+SUBMISSION = {"company_name": "Acme", "transcript_text": "Seller: Hello", "stream": False}
+
+def make_dedup() -> DedupService:
+    dedup = DedupService()
+    dedup.enabled, dedup.claim_wait = True, 0.5
+    return dedup
+
+def test_duplicate_submission_attaches_to_the_first(run):
+    dedup = make_dedup()
+    key = dedup.make_key(SUBMISSION)
+
+    async def scenario():
+        first = await dedup.claim("transcript", key)
+        await dedup.register("transcript", key, "rec-1", "task-1")
+        # Whitespace and case don't make a different submission
+        duplicate = await dedup.claim("transcript", dedup.make_key({**SUBMISSION, "company_name": " ACME "}))
+        return first, duplicate
+
+    assert run(scenario()) == (None, {"id": "rec-1", "task_id": "task-1"})
+
+def test_duplicate_waits_for_the_owner_to_register(run):
+    dedup = make_dedup()
+    key = dedup.make_key(SUBMISSION)
+
+    async def scenario():
+        await dedup.claim("transcript", key)
+
+        async def register_soon():
+            await asyncio.sleep(0.1)
+            await dedup.register("transcript", key, "rec-1", "task-1")
+
+        registering = asyncio.ensure_future(register_soon())
+        duplicate = await dedup.claim("transcript", key)
+        await registering
+        return duplicate
+
+    assert run(scenario()) == {"id": "rec-1", "task_id": "task-1"}
+
+def test_streamed_and_non_streamed_requests_do_not_attach(run):
+    dedup = make_dedup()
+    plain, streamed = dedup.make_key(SUBMISSION), dedup.make_key({**SUBMISSION, "stream": True})
+
+    async def scenario():
+        await dedup.claim("transcript", plain)
+        await dedup.register("transcript", plain, "rec-1", "task-1")
+        return await dedup.claim("transcript", streamed)
+
+    assert plain != streamed
+    assert run(scenario()) is None
+
+def test_release_lets_the_next_submission_run(run):
+    dedup = make_dedup()
+    key = dedup.make_key(SUBMISSION)
+
+    async def scenario():
+        await dedup.claim("transcript", key)
+        await dedup.register("transcript", key, "rec-1", "task-1")
+        await dedup.release_record("transcript", "rec-1")  # the task finished
+        after_finish = await dedup.claim("transcript", key)
+        await dedup.release("transcript", key)  # that submission failed before enqueueing
+        after_failure = await dedup.claim("transcript", key)
+        return after_finish, after_failure
+
+    assert run(scenario()) == (None, None)
@@ -0,0 +1,27 @@
+import asyncio
+
+import orjson
+import pytest
+
+from services.export_service import export_service
+
+async def failing_pages():
+    yield [{"id": "a"}, {"id": "b"}]
+    yield [{"id": "c"}]
+    raise Exception("page 3 failed")
+
+async def read(fmt):
+    body = await export_service.open(failing_pages(), fmt, ["id"])
+    chunks = []
+    with pytest.raises(Exception, match="page 3 failed"):
+        async for chunk in body:
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+def test_ndjson_failure_ends_with_error_record_and_aborts():
+    lines = asyncio.run(read("ndjson")).splitlines()
+    assert [orjson.loads(line) for line in lines[:3]] == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert orjson.loads(lines[3]) == {"error": "Export aborted: page 3 failed"}
+
+def test_csv_failure_aborts():
+    assert asyncio.run(read("csv")) == b"id\r\na\r\nb\r\nc\r\n"
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from groq import AsyncGroq
+
+from services.groq_service import groq_service, GroqRateLimitError
+from services.metrics_service import metrics_service
+
+MODEL = "test-model"
+
+def sse(*events):
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body.encode())
+
+def chunk(choices, **extra):
+    return {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 1, "model": MODEL,
+            "choices": choices, **extra}
+
+def completion(text):
+    return httpx.Response(200, json={
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 1, "model": MODEL,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    })
+
+def tokens(kind):
+    return metrics_service.llm_tokens.labels(MODEL, kind)._value.get()
+
+async def with_groq(handler, call):
+    """Await call() with the Groq client answering through handler(request)"""
+    groq_service._client = AsyncGroq(
+        api_key="test-key", base_url="http://groq.test", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    groq_service._client_loop = asyncio.get_running_loop()
+    try:
+        return await call()
+    finally:
+        groq_service._client = None
+        groq_service._client_loop = None
+
+def test_streamed_completion_records_usage_from_x_groq_dict(run):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return sse(
+            chunk([{"index": 0, "delta": {"role": "assistant", "content": "Hello"}, "finish_reason": None}]),
+            chunk([{"index": 0, "delta": {"content": " there"}, "finish_reason": None}]),
+            chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                  x_groq={"id": "req_1", "usage": {"prompt_tokens": 147, "completion_tokens": 300,
+                                                   "total_tokens": 447}}),
+        )
+
+    streamed = []
+
+    async def on_chunk(text):
+        streamed.append(text)
+
+    before = tokens("prompt"), tokens("completion")
+    complete = lambda: groq_service._attempt(MODEL, "prompt", 300, None, on_chunk, has_fallback=False)
+    assert run(with_groq(handler, complete)) == "Hello there"
+    assert streamed == ["Hello", " there"]
+    assert (tokens("prompt") - before[0], tokens("completion") - before[1]) == (147, 300)
+
+def test_fallback_completion_is_not_served_for_the_first_choice(run, monkeypatch):
+    from services.model_router import model_router
+
+    preferred = model_router.preferred(10)
+    fallback = "fallback-model"
+    answers = [("from fallback", fallback), ("from first choice", preferred)]
+    calls = []
+
+    async def complete(prompt, models, max_tokens, timeout=None, on_chunk=None):
+        calls.append(prompt)
+        return answers.pop(0)
+
+    monkeypatch.setattr(groq_service, "_complete", complete)
+
+    async def scenario():
+        inputs = {"bio": "cache test bio"}
+        return [await groq_service._cached_complete("cache_test", inputs, "short prompt", 100) for _ in range(3)]
+
+    assert run(scenario()) == ["from fallback", "from first choice", "from first choice"]
+    assert len(calls) == 2
+
+def test_map_reduce_stops_when_notes_do_not_condense(run, monkeypatch):
+    monkeypatch.setattr(groq_service, "chunk_tokens", 50)
+    calls = []
+
+    async def summarize(part, index, total, timeout, use_cache):
+        calls.append(index)
+        return " ".join(["note"] * 60)  # every note is longer than a chunk
+
+    monkeypatch.setattr(groq_service, "_summarize_transcript_part", summarize)
+    transcript = "\n\n".join(f"Speaker {i}: " + " ".join(["word"] * 40) for i in range(6))
+
+    with pytest.raises(Exception, match="don't condense"):
+        run(groq_service.generate_transcript_insight(transcript, use_cache=False))
+    assert len(calls) == 6  # only the first round of summaries was paid for
+
+def test_waiting_for_rate_limit_capacity_is_not_a_timeout(run, monkeypatch):
+    from services.rate_limiter import rate_limiter
+    from services.redis_service import redis_service
+    from services.resilience import llm_circuit
+
+    async def acquire(model, tokens, max_wait=None):
+        await asyncio.sleep(0.3)  # longer than the attempt's deadline
+
+    monkeypatch.setattr(groq_service, "call_deadline", 0.1)
+    monkeypatch.setattr(rate_limiter, "acquire", acquire)
+
+    async def scenario():
+        result = await with_groq(lambda request: completion("ok"),
+                                 lambda: groq_service._complete("prompt", [MODEL], 100))
+        timeouts = await redis_service.client.hget(f"modelrouter:{MODEL}", "timeouts")
+        return result, timeouts, (await llm_circuit.get_state())["window_failures"]
+
+    assert run(scenario()) == (("ok", MODEL), None, 0)
+
+def test_rate_limited_probe_frees_the_half_open_slot(run, monkeypatch):
+    from services.resilience import llm_circuit
+
+    monkeypatch.setattr(llm_circuit, "enabled", True)
+    monkeypatch.setattr(llm_circuit, "min_calls", 1)
+    monkeypatch.setattr(llm_circuit, "open_seconds", 0.05)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"retry-after": "1"}, json={"error": {"message": "Rate limit reached"}})
+
+    async def scenario():
+        await llm_circuit.record(failed=True)
+        await asyncio.sleep(0.1)  # half-open: the next call is the probe
+        with pytest.raises(GroqRateLimitError):
+            await with_groq(handler, lambda: groq_service._complete("prompt", ["limited-model"], 100))
+        return await llm_circuit.before_call()
+
+    assert run(scenario()) is not None  # the next caller gets to probe
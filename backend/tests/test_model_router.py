@@ -0,0 +1,52 @@
+import pytest
+
+from services.model_router import ModelRouter
+
+FAST, MAIN = "llama-3.1-8b-instant", "llama-3.3-70b-versatile"
+
+def make_router() -> ModelRouter:
+    router = ModelRouter()
+    router.models, router.fast_models = [MAIN], [FAST]
+    router.refresh_interval = 0
+    return router
+
+def test_short_prompts_use_the_fast_model_first(run):
+    assert run(make_router().candidates(100)) == [FAST, MAIN]
+
+def test_failing_fast_model_is_demoted_behind_healthy_main_model(run):
+    router = make_router()
+
+    async def scenario():
+        for _ in range(5):
+            await router.record(FAST, "errors")
+        await router.record(MAIN, "success", 2.0, 0.3)
+        return await router.candidates(100), await router.candidates(5000)
+
+    short, long = run(scenario())
+    assert short == [MAIN, FAST]
+    assert long == [MAIN, FAST]
+
+def test_slow_main_model_falls_behind_fast_fallback(run):
+    router = make_router()
+
+    async def scenario():
+        await router.record(MAIN, "success", router.slow_seconds + 10, 1.0)
+        return await router.candidates(5000)
+
+    assert run(scenario()) == [FAST, MAIN]
+
+def test_model_in_both_tiers_is_kept(run):
+    router = make_router()
+    router.models, router.fast_models = ["a", "b"], ["b"]
+    assert run(router.candidates(100)) == ["b", "a"]
+    assert run(router.candidates(5000)) == ["a", "b"]
+    assert router.preferred(100) == "b"
+
+    router.models, router.fast_models = ["a"], ["a"]
+    assert run(router.candidates(100)) == ["a"]
+
+def test_no_models_is_a_configuration_error(run):
+    router = make_router()
+    router.models, router.fast_models = [], []
+    with pytest.raises(ValueError, match="GROQ_MODELS"):
+        run(router.candidates(100))
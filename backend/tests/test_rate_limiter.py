@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+from services.rate_limiter import RateLimiter, RateLimitTimeout
+
+MODEL = "test-model"
+
+def make_limiter() -> RateLimiter:
+    limiter = RateLimiter()
+    limiter.enabled = True
+    # 100 tokens a second: waits in these tests stay well under a second
+    limiter.rpm, limiter.tpm, limiter.max_wait = 600, 6000, 5
+    return limiter
+
+def test_bucket_refills_over_time(run):
+    limiter = make_limiter()
+
+    async def scenario():
+        await limiter.acquire(MODEL, 6000)
+        drained = await limiter.get_levels(MODEL)
+        await asyncio.sleep(0.3)
+        return drained, await limiter.get_levels(MODEL)
+
+    drained, refilled = run(scenario())
+    assert drained["tokens_available"] < 5
+    assert drained["requests_available"] == pytest.approx(599, abs=1)
+    assert 25 <= refilled["tokens_available"] <= 45
+
+def test_empty_bucket_waits_for_capacity(run):
+    limiter = make_limiter()
+
+    async def scenario():
+        await limiter.acquire(MODEL, 6000)
+        started = time.monotonic()
+        await limiter.acquire(MODEL, 30)
+        return time.monotonic() - started
+
+    assert 0.2 <= run(scenario()) < 1.5
+
+def test_no_wait_allowed_raises_with_retry_after(run):
+    limiter = make_limiter()
+
+    async def scenario():
+        await limiter.acquire(MODEL, 6000)
+        started = time.monotonic()
+        with pytest.raises(RateLimitTimeout) as timeout:
+            await limiter.acquire(MODEL, 50, max_wait=0)
+        return timeout.value.retry_after, time.monotonic() - started, await limiter.get_levels(MODEL)
+
+    retry_after, elapsed, levels = run(scenario())
+    assert 0.3 < retry_after <= 0.5  # 50 tokens at 100 tokens/s
+    assert elapsed < 0.2
+    # Nothing was taken by the refused call
+    assert levels["requests_available"] == pytest.approx(599, abs=1)
+
+def test_blocked_model_waits_out_the_block(run):
+    limiter = make_limiter()
+
+    async def scenario():
+        await limiter.block(MODEL, 10)
+        with pytest.raises(RateLimitTimeout) as timeout:
+            await limiter.acquire(MODEL, 1, max_wait=1)
+        return timeout.value.retry_after
+
+    assert 9 < run(scenario()) <= 10
@@ -0,0 +1,28 @@
+import asyncio
+
+from services.redis_service import RedisService
+from services.redis_service import redis_service
+from services.stream_service import stream_service
+
+def test_blocking_readers_have_their_own_pool():
+    async def main():
+        service = RedisService()
+        service.max_connections, service.reader_max_connections = 5, 20
+        client, reader = service.client, service.reader_client
+        assert client.connection_pool is not reader.connection_pool
+        assert client.connection_pool.max_connections == 5
+        assert reader.connection_pool.max_connections == 20
+        await service.aclose()
+    asyncio.run(main())
+
+def test_stream_listener_does_not_use_request_pool(run):
+    class Exhausted:
+        def __getattr__(self, name):
+            raise AssertionError("request pool used for a blocking read")
+
+    async def main():
+        await stream_service.publish_done("task-1", "record-1")
+        redis_service._client = Exhausted()
+        return [event async for event, _ in stream_service.listen("task-1")]
+
+    assert run(main()) == ["done"]
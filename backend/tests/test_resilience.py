@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from services.resilience import CircuitBreaker, CircuitOpenError
+
+def make_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test")
+    breaker.enabled = True
+    breaker.min_calls, breaker.failure_ratio = 2, 0.5
+    breaker.open_seconds = 0.05
+    breaker.probe_timeout, breaker.half_open_retry = 90, 2
+    return breaker
+
+def test_half_open_callers_retry_soon_and_probe_closes_circuit(run):
+    breaker = make_breaker()
+
+    async def scenario():
+        await breaker.record(failed=True)
+        await breaker.record(failed=True)
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call()
+        await asyncio.sleep(0.1)
+
+        await breaker.before_call()  # takes the probe slot
+        with pytest.raises(CircuitOpenError) as waiting:
+            await breaker.before_call()
+        await breaker.record(failed=False)
+        await breaker.before_call()
+        return waiting.value.retry_after, (await breaker.get_state())["state"]
+
+    retry_after, state = run(scenario())
+    assert 0 < retry_after <= 2
+    assert state == "closed"
+
+def test_released_probe_lets_the_next_caller_probe(run):
+    breaker = make_breaker()
+
+    async def scenario():
+        await breaker.record(failed=True)
+        await breaker.record(failed=True)
+        await asyncio.sleep(0.1)
+
+        probe = await breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call()
+        await breaker.release("someone else's probe")
+        with pytest.raises(CircuitOpenError):
+            await breaker.before_call()
+        await breaker.release(probe)
+        return probe, await breaker.before_call(), (await breaker.get_state())["state"]
+
+    probe, next_probe, state = run(scenario())
+    assert probe is not None and next_probe is not None
+    assert state == "half_open"
@@ -0,0 +1,46 @@
+import pytest
+
+from services.redis_service import redis_service
+from services.similarity_index import SimilarityIndex
+
+async def indexed_ids(index):
+    return sorted(raw.decode() for raw in await redis_service.client.hkeys(index.VECTORS_KEY))
+
+def test_failed_rebuild_keeps_live_index(run):
+    index = SimilarityIndex()
+
+    async def pages():
+        yield [{"id": "new-1", "transcript_text": "pricing and renewal"}]
+        raise Exception("page 2 failed")
+
+    async def scenario():
+        await index.add("old-1", "security review")
+        await index.add("old-2", "pilot timeline")
+        with pytest.raises(Exception, match="page 2 failed"):
+            await index.rebuild(pages())
+        leftovers = await redis_service.client.keys("similarity:*:rebuild:*")
+        return await indexed_ids(index), leftovers
+
+    ids, leftovers = run(scenario())
+    assert ids == ["old-1", "old-2"]
+    assert leftovers == []
+
+def test_rebuild_swaps_in_new_index_and_keeps_concurrent_adds(run):
+    index = SimilarityIndex()
+
+    async def scenario():
+        async def pages():
+            yield [{"id": "new-1", "transcript_text": "pricing and renewal"}]
+            # A worker completes a transcript while the rebuild is running
+            await index.add("live-1", "onboarding budget")
+            yield [{"id": "new-2", "transcript_text": "integration roadmap"}]
+
+        await index.add("old-1", "security review")
+        total = await index.rebuild(pages())
+        hits = await index.similar("probe", "integration roadmap", k=1)
+        return total, await indexed_ids(index), hits
+
+    total, ids, hits = run(scenario())
+    assert total == 2
+    assert ids == ["live-1", "new-1", "new-2"]
+    assert hits[0][0] == "new-2"
@@ -0,0 +1,62 @@
+import httpx
+
+ROWS = [
+    {"id": f"id-{index}", "created_at": f"2024-01-0{9 - index}T10:00:00+00:00", "status": "completed"}
+    for index in range(5)
+]
+
+def keyset_handler(requests):
+    """Serve ROWS newest first, honouring limit and the keyset "or" filter"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        rows = ROWS
+        if "or" in request.url.params:
+            # (created_at.lt."X",and(created_at.eq."X",id.lt."Y"))
+            created_at = request.url.params["or"].split('"')[1]
+            rows = [row for row in rows if row["created_at"] < created_at]
+        return httpx.Response(200, json=rows[:int(request.url.params["limit"])])
+    return handler
+
+def test_get_transcripts_second_page(run, postgrest):
+    requests = []
+
+    async def pages():
+        service = postgrest(keyset_handler(requests))
+        first = await service.get_transcripts(limit=2)
+        second = await service.get_transcripts(limit=2, cursor=first["next_cursor"])
+        return first, second
+
+    first, second = run(pages())
+    assert [row["id"] for row in first["items"]] == ["id-0", "id-1"]
+    assert [row["id"] for row in second["items"]] == ["id-2", "id-3"]
+    assert second["next_cursor"]
+
+    params = requests[1].url.params
+    assert params["order"] == "created_at.desc,id.desc"
+    assert params["or"] == (
+        '(created_at.lt."2024-01-08T10:00:00+00:00",'
+        'and(created_at.eq."2024-01-08T10:00:00+00:00",id.lt."id-1"))'
+    )
+
+def test_iter_transcripts_reads_every_page(run, postgrest):
+    async def collect():
+        service = postgrest(keyset_handler([]))
+        return [page async for page in service.iter_transcripts(page_size=2)]
+
+    pages = run(collect())
+    assert [[row["id"] for row in page] for page in pages] == [["id-0", "id-1"], ["id-2", "id-3"], ["id-4"]]
+
+def test_search_transcripts_calls_rpc(run, postgrest):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=[{"id": "id-0", "rank": 0.5, "total_count": 7}])
+
+    async def search():
+        return await postgrest(handler).search_transcripts("pricing", limit=1)
+
+    result = run(search())
+    assert result == {"items": [{"id": "id-0", "rank": 0.5}], "total": 7}
+    assert requests[0].method == "POST"
+    assert requests[0].url.path.endswith("/rpc/search_transcripts")
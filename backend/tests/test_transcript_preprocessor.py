@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+
+from services.transcript_preprocessor import normalize_transcript, preprocess_transcript
+
+SAMPLE_DIR = Path(__file__).parent.parent / "benchmarks" / "sample_transcripts"
+
+def sample(name: str) -> str:
+    return normalize_transcript((SAMPLE_DIR / name).read_text(encoding="utf-8"))
+
+def test_backchannel_interrupting_the_other_speaker_is_dropped():
+    text = normalize_transcript(
+        "Seller: Our pilot takes four weeks\n"
+        "Buyer: Mm-hmm.\n"
+        "Seller: and covers ten reps."
+    )
+    assert text == "Seller: Our pilot takes four weeks and covers ten reps."
+
+def test_answers_and_reactions_between_turns_are_kept():
+    text = normalize_transcript(
+        "Seller: Can we start the pilot Monday?\n"
+        "Buyer: Yes.\n"
+        "Seller: Great, I'll send the contract.\n"
+        "Buyer: Absolutely.\n"
+        "Other: One more thing."
+    )
+    assert text.splitlines() == [
+        "Seller: Can we start the pilot Monday?",
+        "Buyer: Yes.",
+        "Seller: Great, I'll send the contract.",
+        "Buyer: Absolutely.",
+        "Other: One more thing.",
+    ]
+
+def test_discovery_call_keeps_the_prospects_answers():
+    lines = sample("discovery_call_bracketed.txt").splitlines()
+    assert "Marcus Webb: Yeah, sure. Can we do that, Thursday at 2:30 PM?" in lines
+    assert "Dana Lee: Absolutely. I'll send an invite. Should I, include anyone from finance?" in lines
+    assert lines[-1] == "Marcus Webb: Thanks, talk soon."
+    # Speakers alternate: nobody's turns were merged across the other's answer
+    speakers = [line.split(":")[0] for line in lines]
+    assert all(a != b for a, b in zip(speakers, speakers[1:]))
+
+def test_demo_call_keeps_short_answers_and_signals():
+    lines = sample("demo_call_zoom.txt").splitlines()
+    assert lines[:3] == [
+        "Sam Ortiz: Okay, can everyone see my screen?",
+        "Jordan Kim: Yep.",
+        "Sam Ortiz: Great. So, this is the dashboard your reps would see every morning. "
+        "Each card is an open deal, and, the color shows how long since the last touch.",
+    ]
+    assert "Jordan Kim: Okay, yeah." in lines
+    assert "Avery Patel: That works for me." in lines
+
+def test_renewal_call_strips_captions_and_keeps_the_close():
+    text = sample("renewal_call_vtt.txt")
+    assert "WEBVTT" not in text and "-->" not in text
+    assert text.splitlines()[-1] == "Elena Ruiz: Sounds good."
+
+@pytest.mark.parametrize("path", sorted(SAMPLE_DIR.glob("*.txt")), ids=lambda path: path.name)
+def test_samples_get_shorter(path):
+    result = preprocess_transcript(path.read_text(encoding="utf-8"))
+    assert 0 < result.tokens_after < result.tokens_before
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import httpx
+
+from services.write_behind import WriteBehindBuffer
+
+class FakeTables:
+    """Minimal PostgREST for status PATCHes (id=in.(...), status=neq.X) and task log upserts"""
+
+    def __init__(self, **tables):
+        self.tables = tables
+        self.requests = []
+        self.fail_next = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.fail_next:
+            self.fail_next -= 1
+            return httpx.Response(503, json={"message": "unavailable"})
+        table = request.url.path.rsplit("/", 1)[-1]
+        body = json.loads(request.content)
+        if request.method == "POST":
+            rows = self.tables.setdefault(table, {})
+            for row in body:
+                rows[row["task_id"]] = {**rows.get(row["task_id"], {}), **row}
+            return httpx.Response(201, json=body)
+
+        params = request.url.params
+        ids = params["id"].removeprefix("in.(").removesuffix(")").split(",")
+        excluded = params.get("status", "").removeprefix("neq.")
+        updated = []
+        for record_id in ids:
+            row = self.tables[table].get(record_id)
+            if row is not None and row["status"] != excluded:
+                row["status"] = body["status"]
+                updated.append({"id": record_id, **row})
+        return httpx.Response(200, json=updated)
+
+def make_buffer(**settings) -> WriteBehindBuffer:
+    buffer = WriteBehindBuffer()
+    buffer.enabled, buffer.flush_interval, buffer.max_pending = True, 60, 100
+    for name, value in settings.items():
+        setattr(buffer, name, value)
+    return buffer
+
+def patches(tables: FakeTables):
+    return [request for request in tables.requests if request.method == "PATCH"]
+
+def test_transitions_are_coalesced_and_flushed_in_bulk(run, postgrest):
+    tables = FakeTables(transcripts={f"t{i}": {"status": "pending"} for i in range(3)},
+                        linkedin_insights={"l1": {"status": "pending"}})
+    buffer = make_buffer()
+
+    async def scenario():
+        postgrest(tables)
+        for record_id in ("t0", "t1", "t2"):
+            await buffer.set_status("transcript", record_id, "processing")
+        await buffer.set_status("transcript", "t2", "failed")  # replaces the unwritten "processing"
+        await buffer.set_status("linkedin", "l1", "processing")
+        written_before_flush = len(tables.requests)
+        await buffer.flush()
+        return written_before_flush
+
+    assert run(scenario()) == 0
+    assert buffer.pending == 0
+    requests = patches(tables)
+    assert len(requests) == 3  # one per (kind, status)
+    assert sorted(request.url.params["id"] for request in requests) == ["in.(l1)", "in.(t0,t1)", "in.(t2)"]
+    assert {record_id: row["status"] for record_id, row in tables.tables["transcripts"].items()} == {
+        "t0": "processing", "t1": "processing", "t2": "failed"
+    }
+
+def test_late_transition_does_not_overwrite_completed(run, postgrest):
+    tables = FakeTables(transcripts={"t1": {"status": "pending"}})
+    buffer = make_buffer()
+
+    async def scenario():
+        postgrest(tables)
+        await buffer.set_status("transcript", "t1", "processing")
+        tables.tables["transcripts"]["t1"]["status"] = "completed"  # the final write went straight through
+        await buffer.flush()
+
+    run(scenario())
+    assert patches(tables)[0].url.params["status"] == "neq.completed"
+    assert tables.tables["transcripts"]["t1"]["status"] == "completed"
+
+def test_discarded_transition_is_never_written(run, postgrest):
+    tables = FakeTables(transcripts={"t1": {"status": "pending"}})
+    buffer = make_buffer()
+
+    async def scenario():
+        postgrest(tables)
+        await buffer.set_status("transcript", "t1", "processing")
+        await buffer.discard("transcript", "t1")
+        await buffer.flush()
+
+    run(scenario())
+    assert tables.requests == []
+
+def test_failed_flush_is_retried(run, postgrest):
+    tables = FakeTables(transcripts={"t1": {"status": "pending"}})
+    tables.fail_next = 1
+    buffer = make_buffer()
+
+    async def scenario():
+        postgrest(tables)
+        await buffer.set_status("transcript", "t1", "processing")
+        await buffer.flush()
+        pending_after_failure = buffer.pending
+        await buffer.flush()
+        return pending_after_failure
+
+    assert run(scenario()) == 1
+    assert buffer.pending == 0
+    assert tables.tables["transcripts"]["t1"]["status"] == "processing"
+
+def test_buffer_flushes_on_timer_and_when_full(run, postgrest):
+    tables = FakeTables(transcripts={f"t{i}": {"status": "pending"} for i in range(3)})
+
+    async def scenario():
+        postgrest(tables)
+        full = make_buffer(max_pending=2)
+        await full.set_status("transcript", "t0", "processing")
+        await full.set_status("transcript", "t1", "processing")  # reaches max_pending
+        written_when_full = len(patches(tables))
+
+        timed = make_buffer(flush_interval=0.05)
+        await timed.set_status("transcript", "t2", "processing")
+        await asyncio.sleep(0.2)
+        return written_when_full, full.pending + timed.pending
+
+    assert run(scenario()) == (1, 0)
+    assert all(row["status"] == "processing" for row in tables.tables["transcripts"].values())
+
+def test_task_logs_are_merged_into_one_row_per_task(run, postgrest):
+    tables = FakeTables()
+    buffer = make_buffer(task_logs_enabled=True)
+
+    async def scenario():
+        postgrest(tables)
+        await buffer.log_task("task-1", "transcript", "t1", "started")
+        await buffer.log_task("task-1", "transcript", "t1", "completed")
+        await buffer.flush()
+
+    run(scenario())
+    upserts = [request for request in tables.requests if request.method == "POST"]
+    assert len(upserts) == 1
+    assert upserts[0].url.params["on_conflict"] == "task_id"
+    row = tables.tables["task_logs"]["task-1"]
+    assert row["status"] == "completed" and row["started_at"] and row["completed_at"]
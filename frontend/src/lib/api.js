@@ -35,6 +35,26 @@
 // }
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+// List endpoints return one page at a time (newest first); this is the largest page they serve
+const PAGE_SIZE = 200
+
+// Follow X-Next-Cursor until the last page, so callers get the complete list
+async function fetchAllPages(path, errorMessage) {
+  const items = []
+  let cursor = null
+  do {
+    const params = new URLSearchParams({ limit: PAGE_SIZE })
+    if (cursor) params.set('cursor', cursor)
+    const response = await fetch(`${API_BASE}${path}?${params}`)
+    if (!response.ok) throw new Error(errorMessage)
+    items.push(...(await response.json()))
+    cursor = response.headers.get('X-Next-Cursor')
+    // X-Total-Count is a safety stop in case a cursor keeps coming back
+    const total = Number(response.headers.get('X-Total-Count'))
+    if (total && items.length >= total) break
+  } while (cursor)
+  return items
+}
 
 export const api = {
   // TRANSCRIPT METHODS
@@ -49,9 +69,7 @@ export const api = {
   },
 
   async getTranscripts() {
-    const response = await fetch(`${API_BASE}/api/transcripts/`)
-    if (!response.ok) throw new Error('Failed to fetch transcripts')
-    return response.json()
+    return fetchAllPages('/api/transcripts/', 'Failed to fetch transcripts')
   },
 
   async getTranscript(id) {
@@ -72,9 +90,7 @@ export const api = {
   },
 
   async getLinkedInInsights() {
-    const response = await fetch(`${API_BASE}/api/linkedin/`)
-    if (!response.ok) throw new Error('Failed to fetch LinkedIn insights')
-    return response.json()
+    return fetchAllPages('/api/linkedin/', 'Failed to fetch LinkedIn insights')
   },
 
   async getLinkedInInsight(id) {